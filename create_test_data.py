@@ -34,7 +34,8 @@ def main():
         # List the files
         data_dir = 'data'
         if os.path.exists(data_dir):
-            files = [f for f in os.listdir(data_dir) if f.endswith(('.npz', '.pkl', '.csv'))]
+            files = [f for f in os.listdir(data_dir) if f.endswith(('.npz', '.pkl', '.csv'))
+                     or os.path.isfile(os.path.join(data_dir, f, 'metadata.json'))]
             for i, file in enumerate(files, 1):
                 print(f"   {i}. {file}")
         
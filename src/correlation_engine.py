@@ -0,0 +1,192 @@
+"""
+Pairwise Correlation Engine
+===========================
+
+Summary statistics of the pairwise correlations of binned spike trains,
+without materializing the (n_neurons x n_neurons) correlation matrix.
+
+Binned trains are kept as a scipy.sparse CSR matrix. The centered
+cross-products of a block of neuron pairs are a sparse-sparse product minus
+the rank-one mean correction, so correlations are produced one tile of
+pairs at a time; each tile updates running count, mean, variance and
+maximum (and optionally a top-k of pairs) and is then discarded. Memory is
+bounded by the tile size rather than by the square of the population size.
+
+Where correlations are averaged over a fixed pair set per trial (decoder
+features), stratified_pairs gives a deterministic pair sample for large
+populations.
+"""
+
+import numpy as np
+from scipy import sparse
+
+from spike_train_set import as_trial_spikes, bin_indices
+
+
+def binned_csr(trial_spikes, edges):
+    """
+    Spike counts per neuron and time bin of one trial as a CSR matrix
+
+    Binned straight from the spike times (np.histogram semantics), so no
+    dense (n_neurons, n_bins) array is built.
+
+    Returns:
+    --------
+    scipy.sparse.csr_matrix : shape (n_neurons, len(edges) - 1)
+    """
+    trial_spikes = as_trial_spikes(trial_spikes)
+    n_bins = len(edges) - 1
+    bin_idx = bin_indices(trial_spikes.spike_times, edges)
+    inside = bin_idx >= 0
+    counts = sparse.csr_matrix(
+        (np.ones(inside.sum()), (trial_spikes.neuron_ids[inside], bin_idx[inside])),
+        shape=(trial_spikes.n_neurons, n_bins)
+    )
+    counts.sum_duplicates()
+    return counts
+
+
+def stratified_pairs(n_neurons, max_pairs, seed=0):
+    """
+    All neuron pairs, or a deterministic sample of at most max_pairs of them
+
+    The sample is stratified by neuron: pairs (i, (i + d) mod n) are taken
+    for every neuron i and a seeded choice of distinct offsets d <= (n - 1) / 2,
+    so each neuron is in the same number of pairs and no pair repeats. With
+    fewer than n_neurons pairs allowed, a seeded subset of max_pairs neurons
+    starts one pair each, with a single offset.
+
+    Returns:
+    --------
+    first, second : np.ndarray
+        Neuron indices of each pair
+    """
+    if n_neurons * (n_neurons - 1) // 2 <= max_pairs:
+        return np.triu_indices(n_neurons, k=1)
+    if max_pairs <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    n_offsets = max_pairs // n_neurons
+    if n_offsets == 0:
+        first = np.sort(rng.choice(n_neurons, max_pairs, replace=False))
+        offset = rng.integers(1, (n_neurons - 1) // 2 + 1)
+        return first, (first + offset) % n_neurons
+    offsets = np.sort(rng.choice(np.arange(1, (n_neurons - 1) // 2 + 1), n_offsets, replace=False))
+    first = np.repeat(np.arange(n_neurons), n_offsets)
+    second = (first + np.tile(offsets, n_neurons)) % n_neurons
+    return first, second
+
+
+class PairwiseCorrelationStats:
+    """
+    Running statistics of pairwise Pearson correlations
+
+    Each update adds every neuron pair of one (n_neurons, n_bins) binned
+    matrix; pairs involving a neuron with constant counts are skipped, as
+    np.corrcoef would give NaN for them. Statistics pool all updates, e.g.
+    all trials of a dataset.
+    """
+
+    def __init__(self, tile_size=1024, top_k=0):
+        """
+        Parameters:
+        -----------
+        tile_size : int
+            Neurons per tile side; a tile holds tile_size**2 correlations
+        top_k : int
+            Number of most correlated pairs to keep (0: none)
+        """
+        self.tile_size = tile_size
+        self.top_k = top_k
+        self.n_pairs = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max = -np.inf
+        self._top = (np.empty(0), np.empty((0, 3), dtype=np.int64))
+        self._n_updates = 0
+
+    @property
+    def variance(self):
+        """Population variance of the correlations seen so far"""
+        return self._m2 / self.n_pairs if self.n_pairs else 0.0
+
+    @property
+    def top_pairs(self):
+        """
+        The top_k highest correlations, largest first
+
+        Returns:
+        --------
+        correlations : np.ndarray
+        pairs : np.ndarray
+            Shape (k, 3): update index, neuron i, neuron j (i < j)
+        """
+        values, pairs = self._top
+        order = np.argsort(values)[::-1]
+        return values[order], pairs[order]
+
+    def update(self, binned):
+        """
+        Add all pairs of one binned matrix
+
+        Parameters:
+        -----------
+        binned : scipy.sparse matrix or np.ndarray
+            Shape (n_neurons, n_bins)
+        """
+        binned = sparse.csr_matrix(binned, dtype=float)
+        n_neurons, n_bins = binned.shape
+        if n_neurons > 1 and n_bins > 0:
+            means = np.asarray(binned.mean(axis=1)).ravel()
+            squares = np.asarray(binned.multiply(binned).sum(axis=1)).ravel()
+            stds = np.sqrt(np.maximum(squares - n_bins * means**2, 0))
+            active = stds > 0
+
+            for row_start in range(0, n_neurons, self.tile_size):
+                rows = slice(row_start, row_start + self.tile_size)
+                row_block = binned[rows]
+                for col_start in range(row_start, n_neurons, self.tile_size):
+                    cols = slice(col_start, col_start + self.tile_size)
+                    self._add_tile(row_block, binned[cols], means, stds, active,
+                                   rows, cols, n_bins, diagonal=col_start == row_start)
+        self._n_updates += 1
+        return self
+
+    def _add_tile(self, row_block, col_block, means, stds, active, rows, cols, n_bins, diagonal):
+        """Correlations of one block of pairs, folded into the running statistics"""
+        # Centered cross-products: X_r X_c^T - n * mu_r mu_c^T
+        covariance = (row_block @ col_block.T).toarray()
+        covariance -= n_bins * np.outer(means[rows], means[cols])
+        valid = np.outer(active[rows], active[cols])
+        if diagonal:
+            valid &= np.triu(np.ones(valid.shape, dtype=bool), k=1)
+        pair_rows, pair_cols = np.nonzero(valid)
+        if not len(pair_rows):
+            return
+        correlations = covariance[pair_rows, pair_cols]
+        correlations /= stds[rows][pair_rows] * stds[cols][pair_cols]
+        np.clip(correlations, -1, 1, out=correlations)
+
+        # Merge the tile's count, mean and M2 (Chan et al.)
+        n_tile = len(correlations)
+        tile_mean = correlations.mean()
+        tile_m2 = np.sum((correlations - tile_mean)**2)
+        n_total = self.n_pairs + n_tile
+        delta = tile_mean - self.mean
+        self.mean += delta * n_tile / n_total
+        self._m2 += tile_m2 + delta**2 * self.n_pairs * n_tile / n_total
+        self.n_pairs = n_total
+        self.max = max(self.max, correlations.max())
+
+        if self.top_k:
+            keep = np.argsort(correlations)[-self.top_k:]
+            pairs = np.column_stack([np.full(len(keep), self._n_updates),
+                                     pair_rows[keep] + rows.start, pair_cols[keep] + cols.start])
+            values = np.concatenate([self._top[0], correlations[keep]])
+            pairs = np.concatenate([self._top[1], pairs])
+            best = np.argsort(values)[-self.top_k:]
+            self._top = (values[best], pairs[best])
+
+    def __repr__(self):
+        return (f"PairwiseCorrelationStats(n_pairs={self.n_pairs}, mean={self.mean:.4f}, "
+                f"variance={self.variance:.4f}, max={self.max:.4f})")
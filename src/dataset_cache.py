@@ -0,0 +1,173 @@
+"""
+Dataset Cache
+=============
+
+Content-addressed on-disk cache for generated datasets and training matrices.
+
+An entry is a directory named by a hash of everything that determines its
+contents (generator settings, class configurations, seed, feature-extractor
+version, ...). Arrays are stored as individual .npy files so they can be
+memory-mapped on load, and the cache evicts least recently used entries once
+it grows beyond a byte budget.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+from spike_train_set import SpikeTrainSet
+
+
+def _to_json(value):
+    """JSON fallback for numpy scalars/arrays and other plain objects"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return repr(value)
+
+
+def cache_key(**params):
+    """Stable hash of keyword parameters (order-independent)"""
+    canonical = json.dumps(params, sort_keys=True, default=_to_json, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+
+class DatasetCache:
+    """Directory of cached array bundles with size-bounded LRU eviction"""
+
+    def __init__(self, cache_dir=Path("cache") / "datasets", max_bytes=1 << 30):
+        """
+        Parameters:
+        -----------
+        cache_dir : str or Path
+            Where entries are stored (created on first write)
+        max_bytes : int
+            Total size budget; least recently used entries are evicted
+            after a write pushes the cache above it
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(self, **params):
+        return cache_key(**params)
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key
+
+    def __contains__(self, key):
+        return (self._entry_dir(key) / 'metadata.json').exists()
+
+    def load(self, key, mmap_mode='r'):
+        """
+        Arrays and metadata of an entry, or None on a miss.
+
+        Returns:
+        --------
+        arrays : dict
+            name -> np.ndarray (memory-mapped unless mmap_mode is None)
+        metadata : dict
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(entry_dir / 'metadata.json') as f:
+                metadata = json.load(f)
+            arrays = {name: np.load(entry_dir / f"{name}.npy", mmap_mode=mmap_mode)
+                      for name in metadata['arrays']}
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Directory mtime records the last use for LRU eviction
+        os.utime(entry_dir)
+        return arrays, metadata['metadata']
+
+    def store(self, key, arrays, metadata=None):
+        """Write an entry atomically, then evict old entries beyond the budget"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry_dir = self._entry_dir(key)
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.cache_dir))
+        try:
+            for name, array in arrays.items():
+                np.save(tmp_dir / f"{name}.npy", np.asarray(array), allow_pickle=False)
+            with open(tmp_dir / 'metadata.json', 'w') as f:
+                json.dump({'arrays': list(arrays), 'metadata': metadata or {},
+                           'created': time.time()}, f, default=_to_json)
+            if entry_dir.exists():
+                # Replace an older entry of the same key (e.g. one stored without spikes)
+                stale_dir = Path(tempfile.mkdtemp(prefix=f".{key}-stale-", dir=self.cache_dir))
+                try:
+                    os.replace(entry_dir, stale_dir / key)
+                except OSError:
+                    pass
+                shutil.rmtree(stale_dir, ignore_errors=True)
+            try:
+                os.replace(tmp_dir, entry_dir)
+            except OSError:
+                # Another writer stored the same key first; the contents are equal
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.evict(keep=key)
+        return entry_dir
+
+    def entries(self):
+        """(key, size in bytes, last used time) of every entry, oldest first"""
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            if entry_dir.name.startswith('.') or not entry_dir.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in entry_dir.iterdir() if f.is_file())
+            entries.append((entry_dir.name, size, entry_dir.stat().st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+
+
+def spike_train_set_arrays(spike_trains, prefix='spikes'):
+    """Arrays to store a SpikeTrainSet in a cache entry"""
+    spike_trains = spike_trains.compact()
+    return {f"{prefix}_times": spike_trains.spike_times,
+            f"{prefix}_offsets": spike_trains.offsets}
+
+
+def spike_train_set_from_arrays(arrays, prefix='spikes'):
+    """SpikeTrainSet view of arrays written by spike_train_set_arrays (no copy)"""
+    if f"{prefix}_times" not in arrays:
+        return None
+    return SpikeTrainSet(arrays[f"{prefix}_times"], arrays[f"{prefix}_offsets"])
+
+
+def as_dataset_cache(cache):
+    """DatasetCache from a cache object, a directory path, or None"""
+    if cache is None or isinstance(cache, DatasetCache):
+        return cache
+    return DatasetCache(cache)
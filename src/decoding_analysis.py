@@ -10,13 +10,27 @@ import seaborn as sns
 import warnings
 warnings.filterwarnings('ignore')
 
-from spike_data_loader import NeuralPatternGenerator
+from spike_data_loader import NeuralPatternGenerator, CLASS_CONFIGS, sample_class_config, class_jobs
+from parallel_jobs import map_jobs, root_seed_sequence
+from random_streams import make_rng
+from spike_train_set import SpikeTrainSet, as_trial_spikes
+from spike_engine import ENGINE_VERSION
+from dataset_cache import as_dataset_cache, spike_train_set_arrays, spike_train_set_from_arrays
+from feature_matrix import DECODER_FEATURES, decoder_feature_matrix
+
+# Bump whenever extract_optimized_features changes, so cached training
+# matrices from older versions are not reused
+FEATURE_EXTRACTOR_VERSION = 3
+
+# Synthetic spike data behind one training sample
+TRAINING_SAMPLE_PARAMS = {'n_stimuli': 3, 'n_trials_per_stimulus': 1}
 
 class OptimizedMultiClassDecoder:
     """Optimized multi-class neural pattern classifier with fast feature extraction"""
     
     def __init__(self, random_state=42):
         self.random_state = random_state
+        self.rng = make_rng(random_state)
         
         # Multiple classifiers for comparison
         self.rf_classifier = RandomForestClassifier(
@@ -47,276 +61,156 @@ class OptimizedMultiClassDecoder:
         self.label_encoder = LabelEncoder()
         
         # Data generator
-        self.data_generator = NeuralPatternGenerator()
+        self.data_generator = NeuralPatternGenerator(rng=self.rng)
         
         # Training state
         self.is_trained = False
-        self.feature_names = [
-            'mean_firing_rate', 'firing_rate_std', 'max_firing_rate',
-            'burst_index', 'burst_frequency', 'mean_burst_duration',
-            'regularity_index', 'mean_cv', 'fano_factor',
-            'sync_index', 'sync_variance', 'cross_correlation',
-            'population_entropy', 'timing_precision', 'response_latency',
-            'parkinsonian_composite', 'epileptiform_composite', 'pathology_score'
-        ]
+        self.feature_names = list(DECODER_FEATURES)
         self.class_names = []
         self.best_classifier = None
         self.feature_importance = None
         
     def extract_optimized_features(self, spike_data):
-        """Extract comprehensive but fast features"""
-        
-        spike_trains = spike_data['spike_trains'][0]  # First trial
-        trial_duration = spike_data.get('trial_duration', 2.0)
-        
-        features = {}
-        
-        # === RATE FEATURES ===
-        firing_rates = [len(spikes) / trial_duration for spikes in spike_trains]
-        features['mean_firing_rate'] = np.mean(firing_rates)
-        features['firing_rate_std'] = np.std(firing_rates)
-        features['max_firing_rate'] = np.max(firing_rates) if firing_rates else 0
-        
-        # === BURST FEATURES ===
-        burst_indices = []
-        burst_durations = []
-        total_bursts = 0
-        
-        for spikes in spike_trains:
-            if len(spikes) > 3:
-                isis = np.diff(spikes)
-                
-                # Burst detection: ISI < 10ms
-                short_isis = np.sum(isis < 0.01)
-                burst_index = short_isis / len(isis) if len(isis) > 0 else 0
-                burst_indices.append(burst_index)
-                
-                # Detect burst events
-                in_burst = False
-                burst_start = 0
-                for i, isi in enumerate(isis):
-                    if isi < 0.01 and not in_burst:
-                        in_burst = True
-                        burst_start = spikes[i]
-                    elif isi > 0.05 and in_burst:
-                        in_burst = False
-                        burst_duration = spikes[i] - burst_start
-                        if burst_duration > 0.01:  # Minimum burst duration
-                            burst_durations.append(burst_duration)
-                            total_bursts += 1
-        
-        features['burst_index'] = np.mean(burst_indices) if burst_indices else 0
-        features['burst_frequency'] = total_bursts / trial_duration
-        features['mean_burst_duration'] = np.mean(burst_durations) if burst_durations else 0
-        
-        # === REGULARITY FEATURES ===
-        cv_values = []
-        fano_factors = []
-        
-        for spikes in spike_trains:
-            if len(spikes) > 2:
-                # ISI coefficient of variation
-                isis = np.diff(spikes)
-                if len(isis) > 1 and np.mean(isis) > 0:
-                    cv = np.std(isis) / np.mean(isis)
-                    cv_values.append(cv)
-                
-                # Fano factor (spike count variance/mean in windows)
-                window_size = 0.1
-                n_windows = int(trial_duration / window_size)
-                counts = []
-                for w in range(n_windows):
-                    start_time = w * window_size
-                    end_time = (w + 1) * window_size
-                    count = np.sum((spikes >= start_time) & (spikes < end_time))
-                    counts.append(count)
-                
-                if len(counts) > 1 and np.mean(counts) > 0:
-                    fano = np.var(counts) / np.mean(counts)
-                    fano_factors.append(fano)
-        
-        features['regularity_index'] = 1 / (1 + np.mean(cv_values)) if cv_values else 0.5
-        features['mean_cv'] = np.mean(cv_values) if cv_values else 1.0
-        features['fano_factor'] = np.mean(fano_factors) if fano_factors else 1.0
-        
-        # === SYNCHRONY FEATURES ===
-        # Population activity analysis
-        bin_size = 0.005  # 5ms bins
-        time_bins = np.arange(0, trial_duration + bin_size, bin_size)
-        pop_activity = np.zeros(len(time_bins) - 1)
-        
-        for spikes in spike_trains:
-            if len(spikes) > 0:
-                spike_counts, _ = np.histogram(spikes, bins=time_bins)
-                pop_activity += spike_counts
-        
-        # Synchrony indices
-        features['sync_index'] = np.std(pop_activity) / (np.mean(pop_activity) + 1e-6)
-        features['sync_variance'] = np.var(pop_activity)
-        
-        # Cross-correlation (sample of neuron pairs)
-        correlations = []
-        n_sample = min(10, len(spike_trains))  # Sample first 10 neurons
-        
-        if n_sample > 1:
-            # Convert to binary trains
-            binary_trains = []
-            for i in range(n_sample):
-                spikes = spike_trains[i]
-                binary_train = np.zeros(len(pop_activity))
-                for spike_time in spikes:
-                    bin_idx = int(spike_time / bin_size)
-                    if bin_idx < len(binary_train):
-                        binary_train[bin_idx] = 1
-                binary_trains.append(binary_train)
-            
-            # Pairwise correlations (sample pairs to avoid n^2 complexity)
-            n_pairs = min(20, n_sample * (n_sample - 1) // 2)
-            pair_indices = np.random.choice(range(n_sample * (n_sample - 1) // 2), 
-                                          size=min(n_pairs, n_sample * (n_sample - 1) // 2), 
-                                          replace=False)
-            
-            pair_count = 0
-            for i in range(n_sample):
-                for j in range(i + 1, n_sample):
-                    if pair_count in pair_indices:
-                        if np.std(binary_trains[i]) > 0 and np.std(binary_trains[j]) > 0:
-                            corr = np.corrcoef(binary_trains[i], binary_trains[j])[0, 1]
-                            if not np.isnan(corr):
-                                correlations.append(corr)
-                    pair_count += 1
-        
-        features['cross_correlation'] = np.mean(correlations) if correlations else 0
-        
-        # === TEMPORAL FEATURES ===
-        # Population entropy
-        if len(pop_activity) > 0:
-            pop_hist = np.histogram(pop_activity, bins=10)[0]
-            pop_prob = pop_hist / np.sum(pop_hist)
-            features['population_entropy'] = -np.sum(pop_prob * np.log(pop_prob + 1e-10))
-        else:
-            features['population_entropy'] = 0
-        
-        # Timing precision (simplified)
-        if 'stimulus_times' in spike_data and spike_data['stimulus_times']:
-            stim_time = spike_data['stimulus_times'][0]
-            response_times = []
-            
-            for spikes in spike_trains:
-                post_stim = spikes[spikes > stim_time]
-                if len(post_stim) > 0:
-                    response_times.append(post_stim[0] - stim_time)
-            
-            features['timing_precision'] = 1 / (1 + np.std(response_times)) if len(response_times) > 1 else 0
-            features['response_latency'] = np.mean(response_times) if response_times else 0
+        """Extract comprehensive but fast features of the first trial of spike_data"""
+        return self.extract_feature_matrix([spike_data])[0]
+    
+    def extract_feature_matrix(self, samples, trial_duration=None, stimulus_times=None):
+        """
+        Features of many trials at once (see feature_matrix.decoder_feature_matrix)
+        
+        Parameters:
+        -----------
+        samples : list of spike_data dicts, SpikeTrainSet or nested spike_trains
+            For spike_data dicts the first trial of each is one row, as in
+            extract_optimized_features; otherwise every trial is a row
+        trial_duration : float or None
+            Defaults to the samples' 'trial_duration', else 2.0 s
+        stimulus_times : array-like or None
+            Stimulus onset of each row when samples are spike trains
+        
+        Returns:
+        --------
+        np.ndarray : float32, shape (n_rows, len(self.feature_names))
+        """
+        
+        if isinstance(samples, (list, tuple)) and samples and isinstance(samples[0], dict):
+            if trial_duration is None:
+                trial_duration = samples[0].get('trial_duration', 2.0)
+            trials = [as_trial_spikes(spike_data['spike_trains'][0]) for spike_data in samples]
+            spike_trains = SpikeTrainSet.from_trials((trial.spike_times, trial.offsets) for trial in trials)
+            stimulus_times = None
+            if all(spike_data.get('stimulus_times') for spike_data in samples):
+                stimulus_times = [spike_data['stimulus_times'][0] for spike_data in samples]
         else:
-            features['timing_precision'] = 0
-            features['response_latency'] = 0
-        
-        # === COMPOSITE PATHOLOGY INDICES ===
-        # Parkinsonian signature: high synchrony + irregular firing + some bursting
-        features['parkinsonian_composite'] = (
-            features['sync_index'] * 
-            (1 - features['regularity_index']) * 
-            (1 + features['burst_index'])
-        )
-        
-        # Epileptiform signature: very high synchrony + high bursting + irregular
-        features['epileptiform_composite'] = (
-            features['sync_index'] * 
-            features['burst_index'] * 
-            features['cross_correlation']
-        )
+            spike_trains = samples
         
-        # General pathology score
-        features['pathology_score'] = np.mean([
-            features['parkinsonian_composite'],
-            features['epileptiform_composite']
-        ])
-        
-        # Convert to array in consistent order
-        feature_vector = [features[name] for name in self.feature_names]
-        return np.array(feature_vector)
+        return decoder_feature_matrix(spike_trains, 2.0 if trial_duration is None else trial_duration,
+                                      stimulus_times)
     
-    def generate_training_data(self, n_trials_per_class=50, verbose=True):
-        """Generate training dataset with optimized generation"""
+    def generate_training_data(self, n_trials_per_class=50, verbose=True, n_jobs=1, seed=None,
+                               cache=None, keep_spikes=False):
+        """
+        Generate training dataset with optimized generation
+        
+        Parameters:
+        -----------
+        n_jobs : int or None
+            Worker processes for generation (1: serial, -1: all cores); features
+            are then extracted for all samples in one batch
+        seed : int, SeedSequence or None
+            Root seed; each trial gets its own child SeedSequence, so X and y
+            are identical for any n_jobs. None derives the root seed from
+            random_state itself, so repeated calls on one decoder (cached or
+            not) return the same data and hit the same cache entry.
+        cache : DatasetCache, str, Path or None
+            On-disk cache of (X, y); a warm entry skips generation entirely
+            and is returned memory-mapped. Not used without a deterministic
+            seed (seed and random_state both None)
+        keep_spikes : bool
+            Also return the raw spikes as a SpikeTrainSet; sample k owns
+            trials k * n_stimuli ... (k + 1) * n_stimuli - 1
+        
+        Returns:
+        --------
+        X, y (and spikes if keep_spikes)
+        """
+        
+        if seed is None and self.random_state is not None:
+            seed = root_seed_sequence(self.random_state)
+        cache = as_dataset_cache(cache) if seed is not None else None
+        if cache is not None:
+            key = cache.key(**self._training_data_params(n_trials_per_class, seed))
+            cached = cache.load(key)
+            if cached is not None and (not keep_spikes or 'spikes_times' in cached[0]):
+                arrays, _ = cached
+                if verbose:
+                    print(f"Loaded training data from cache ({len(arrays['X'])} trials)")
+                if keep_spikes:
+                    return arrays['X'], arrays['y'], spike_train_set_from_arrays(arrays)
+                return arrays['X'], arrays['y']
         
         if verbose:
             print(f"Generating training data ({n_trials_per_class} trials per class)...")
         
-        X = []
-        y = []
-        
-        # Optimized class configurations
-        configs = {
-            'Healthy_Rate': {
-                'coding_type': 'rate',
-                'oscillatory_power': 0.0,
-                'population_synchrony': 0.15,
-                'spike_regularity': 0.8,
-                'pathological_bursting': 0.0
-            },
-            'Healthy_Temporal': {
-                'coding_type': 'temporal',
-                'oscillatory_power': 0.0,
-                'population_synchrony': 0.15,
-                'spike_regularity': 0.8,
-                'pathological_bursting': 0.0
-            },
-            'Parkinsonian': {
-                'coding_type': np.random.choice(['rate', 'temporal']),
-                'oscillatory_power': lambda: np.random.uniform(0.5, 0.9),
-                'population_synchrony': lambda: np.random.uniform(0.6, 0.9),
-                'spike_regularity': lambda: np.random.uniform(0.2, 0.5),
-                'pathological_bursting': lambda: np.random.uniform(0.1, 0.4)
-            },
-            'Epileptiform': {
-                'coding_type': np.random.choice(['rate', 'temporal']),
-                'oscillatory_power': lambda: np.random.uniform(0.3, 0.7),
-                'population_synchrony': lambda: np.random.uniform(0.7, 1.0),
-                'spike_regularity': lambda: np.random.uniform(0.3, 0.7),
-                'pathological_bursting': lambda: np.random.uniform(0.4, 0.8)
+        class_names = list(CLASS_CONFIGS)
+        jobs = class_jobs(class_names, n_trials_per_class, self.rng if seed is None else seed)
+        results = map_jobs(_training_job, [job + (keep_spikes,) for job in jobs], n_jobs,
+                           initializer=_init_decoder_worker, initargs=(self,))
+        
+        # Features of every sample's first trial in one batch
+        X = self.extract_feature_matrix(
+            SpikeTrainSet.from_trials(layouts[0] for layouts, _ in results),
+            self.data_generator.trial_duration,
+            [stimulus_time for _, stimulus_time in results]
+        )
+        y = np.array([class_name for class_name, _ in jobs])
+        spikes = None
+        if keep_spikes:
+            spikes = SpikeTrainSet.from_trials(layout for layouts, _ in results for layout in layouts)
+        
+        if verbose:
+            print(f"  Generated {len(X)} trials across {len(class_names)} classes")
+        
+        if cache is not None:
+            arrays = {'X': X, 'y': y}
+            if keep_spikes:
+                arrays.update(spike_train_set_arrays(spikes))
+            cache.store(key, arrays, metadata={'n_trials_per_class': n_trials_per_class,
+                                               'feature_names': self.feature_names})
+        
+        if keep_spikes:
+            return X, y, spikes
+        return X, y
+    
+    def _training_data_params(self, n_trials_per_class, seed):
+        """Everything that determines the output of generate_training_data"""
+        if isinstance(seed, np.random.SeedSequence):
+            seed = {'entropy': seed.entropy, 'spawn_key': seed.spawn_key}
+        elif not isinstance(seed, (int, np.integer)):
+            raise ValueError("Cached training data needs an int or SeedSequence seed")
+        
+        generator = self.data_generator
+        return {
+            'kind': 'decoder_training_data',
+            'feature_extractor_version': FEATURE_EXTRACTOR_VERSION,
+            'feature_names': self.feature_names,
+            'engine_version': ENGINE_VERSION,
+            'generator': {
+                'n_neurons': generator.n_neurons,
+                'trial_duration': generator.trial_duration,
+                'dt': generator.dt,
+                'engine': generator.engine,
+                'bit_generator': generator.bit_generator
             },
-            'Mixed_Pathology': {
-                'coding_type': np.random.choice(['rate', 'temporal', 'mixed']),
-                'oscillatory_power': lambda: np.random.uniform(0.4, 0.8),
-                'population_synchrony': lambda: np.random.uniform(0.5, 0.8),
-                'spike_regularity': lambda: np.random.uniform(0.2, 0.6),
-                'pathological_bursting': lambda: np.random.uniform(0.2, 0.6)
-            }
+            'sample_params': TRAINING_SAMPLE_PARAMS,
+            'class_configs': CLASS_CONFIGS,
+            'n_trials_per_class': n_trials_per_class,
+            'seed': seed
         }
-        
-        for class_name, base_config in configs.items():
-            if verbose:
-                print(f"  Generating {class_name}...")
-            
-            for trial in range(n_trials_per_class):
-                # Randomize parameters for pathological classes
-                config = {}
-                for key, value in base_config.items():
-                    if callable(value):
-                        config[key] = value()
-                    else:
-                        config[key] = value
-                
-                # Generate spike data
-                spike_data = self.data_generator.generate_synthetic_spikes(
-                    n_stimuli=3, n_trials_per_stimulus=1, **config
-                )
-                
-                # Extract features
-                features = self.extract_optimized_features(spike_data)
-                
-                X.append(features)
-                y.append(class_name)
-                
-                if verbose and (trial + 1) % 25 == 0:
-                    print(f"    {trial + 1}/{n_trials_per_class} completed")
-        
-        return np.array(X), np.array(y)
     
-    def train(self, n_trials_per_class=50, test_size=0.2, verbose=True):
-        """Train multiple classifiers and select the best"""
+    def train(self, n_trials_per_class=50, test_size=0.2, verbose=True, n_jobs=1, seed=None,
+              cache=None):
+        """Train multiple classifiers and select the best (see generate_training_data for n_jobs/seed/cache)"""
         
         if verbose:
             print("=" * 60)
@@ -324,7 +218,8 @@ class OptimizedMultiClassDecoder:
             print("=" * 60)
         
         # Generate training data
-        X, y = self.generate_training_data(n_trials_per_class, verbose)
+        X, y = self.generate_training_data(n_trials_per_class, verbose, n_jobs=n_jobs, seed=seed,
+                                           cache=cache)
         
         # Encode labels
         y_encoded = self.label_encoder.fit_transform(y)
@@ -481,6 +376,27 @@ class OptimizedMultiClassDecoder:
         plt.tight_layout()
         plt.show()
 
+# Decoder shared by the jobs of one worker process
+_worker_decoder = None
+
+def _init_decoder_worker(decoder):
+    global _worker_decoder
+    _worker_decoder = decoder
+
+def _training_job(job):
+    """Generate one training sample; returns the layouts of its first (or, if asked, every)
+    trial and the first trial's stimulus time"""
+    class_name, seed_seq, keep_spikes = job
+    rng = make_rng(seed_seq, _worker_decoder.data_generator.bit_generator)
+    config = sample_class_config(CLASS_CONFIGS[class_name], rng)
+    spike_data = _worker_decoder.data_generator.generate_synthetic_spikes(
+        rng=rng, **TRAINING_SAMPLE_PARAMS, **config
+    )
+    
+    trials = spike_data['spike_trains'] if keep_spikes else spike_data['spike_trains'][:1]
+    layouts = [(trial.spike_times, trial.offsets) for trial in trials]
+    return layouts, spike_data['stimulus_times'][0]
+
 # Test function
 def test_optimized_decoder():
     """Test the optimized decoder"""
@@ -0,0 +1,231 @@
+"""
+Batch Feature Extraction
+========================
+
+Decoder features of many trials at once, as a dense float32
+(n_trials, n_features) matrix with the fixed column order DECODER_FEATURES.
+
+Every feature is a reduction over the flat spike array of a SpikeTrainSet:
+per-train ISI statistics are segment sums over the train index of each
+interval, binned activity comes from one bincount per grid, and burst
+episodes come from burst_detection. There is no Python loop over trials or
+neurons, so building a training set costs a fixed number of NumPy passes
+over all spikes.
+"""
+
+import numpy as np
+
+from burst_detection import detect_bursts
+from correlation_engine import stratified_pairs
+from spike_statistics import fano_factor, isi_moments, segment_histograms, window_counts
+from spike_train_set import SpikeTrainSet, as_spike_train_set, bin_indices
+
+# Spike-train cells (trials x neurons x bins) binned at once for correlations
+CORRELATION_CHUNK_CELLS = 2**22
+
+# Column order of decoder_feature_matrix
+DECODER_FEATURES = (
+    'mean_firing_rate', 'firing_rate_std', 'max_firing_rate',
+    'burst_index', 'burst_frequency', 'mean_burst_duration',
+    'regularity_index', 'mean_cv', 'fano_factor',
+    'sync_index', 'sync_variance', 'cross_correlation',
+    'population_entropy', 'timing_precision', 'response_latency',
+    'parkinsonian_composite', 'epileptiform_composite', 'pathology_score'
+)
+
+
+def trial_means(values, trial_idx, n_trials, default):
+    """Mean of values per trial, `default` for trials without values"""
+    counts = np.bincount(trial_idx, minlength=n_trials)
+    sums = np.bincount(trial_idx, values, minlength=n_trials)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), default)
+
+
+def mean_pair_correlations(spike_trains, edges, pairs=None):
+    """
+    Mean Pearson correlation of binary (spike / no spike) trains per trial
+
+    Spikes are binned once into flat (trial, neuron, bin) cell indices, and
+    trials are expanded to binary trains in chunks; pairs involving a train without spikes or
+    spiking in every bin are left out, and trials without valid pairs get 0.
+
+    Parameters:
+    -----------
+    spike_trains : SpikeTrainSet
+        Compact set
+    edges : np.ndarray
+        Time bin edges
+    pairs : tuple of np.ndarray or None
+        Neuron indices (first, second) of the pairs; None for all pairs
+
+    Returns:
+    --------
+    np.ndarray : shape (n_trials,)
+    """
+    n_trials, n_neurons = spike_trains.shape
+    n_bins = len(edges) - 1
+    mean_correlations = np.zeros(n_trials)
+    if n_neurons < 2 or n_bins < 1:
+        return mean_correlations
+    first, second = np.triu_indices(n_neurons, k=1) if pairs is None else pairs
+
+    # Per trial: the binned trains, plus the gathered pair trains of a sample
+    cells = (n_neurons + (0 if pairs is None else 2 * len(first))) * n_bins
+    chunk = max(1, CORRELATION_CHUNK_CELLS // cells)
+    bin_idx = bin_indices(spike_trains.spike_times, edges)
+    inside = bin_idx >= 0
+    cell_idx = (spike_trains.train_ids() * n_bins + bin_idx)[inside]
+    trial_bounds = np.searchsorted(cell_idx, np.arange(n_trials + 1) * n_neurons * n_bins)
+    for start in range(0, n_trials, chunk):
+        stop = min(start + chunk, n_trials)
+        binary_trains = np.zeros((stop - start) * n_neurons * n_bins, dtype=np.float32)
+        binary_trains[cell_idx[trial_bounds[start]:trial_bounds[stop]] - start * n_neurons * n_bins] = 1
+        binary_trains = binary_trains.reshape(stop - start, n_neurons, n_bins)
+        # Centered cross-products from co-active bin counts (exact in float32):
+        # sum (x - mean_x)(y - mean_y) = n_xy - n_x n_y / n_bins
+        if pairs is None:
+            # Co-activity of all pairs of every trial in one product
+            coactive = (binary_trains @ binary_trains.transpose(0, 2, 1))[:, first, second]
+        else:
+            coactive = np.einsum('tpb,tpb->tp', binary_trains[:, first], binary_trains[:, second])
+        active = binary_trains.sum(axis=2, dtype=np.float64)
+        covariance = coactive - active[:, first] * active[:, second] / n_bins
+        stds = np.sqrt(np.maximum(active - active**2 / n_bins, 0))
+        scale = stds[:, first] * stds[:, second]
+        valid = scale > 0
+        correlations = np.where(valid, covariance / np.where(valid, scale, 1), 0)
+        n_valid = valid.sum(axis=1)
+        mean_correlations[start:stop] = correlations.sum(axis=1) / np.maximum(n_valid, 1)
+    return mean_correlations
+
+
+def decoder_feature_matrix(spike_trains, trial_duration=2.0, stimulus_times=None,
+                           max_corr_pairs=2000, pair_seed=0):
+    """
+    Decoder features of every trial, computed with reductions across trials
+
+    Parameters:
+    -----------
+    spike_trains : SpikeTrainSet or nested spike_trains[trial][neuron]
+    trial_duration : float
+        Trial length (s)
+    stimulus_times : array-like or None
+        Stimulus onset of each trial (s); None sets the timing features to 0
+    max_corr_pairs : int
+        Correlations are averaged over all neuron pairs, or over a seeded
+        stratified sample of max_corr_pairs pairs in larger populations
+    pair_seed : int
+        Seed of the pair sample
+
+    Returns:
+    --------
+    np.ndarray : float32, shape (n_trials, len(DECODER_FEATURES))
+    """
+    spike_trains = as_spike_train_set(spike_trains).compact()
+    n_trials, n_neurons = spike_trains.shape
+    features = {}
+    if n_trials == 0:
+        return np.zeros((0, len(DECODER_FEATURES)), dtype=np.float32)
+
+    spike_times = spike_trains.spike_times
+    counts = spike_trains.counts
+    train_ids = spike_trains.train_ids()
+    n_trains = n_trials * n_neurons
+    train_trials = np.arange(n_trains) // max(n_neurons, 1)
+
+    # === RATE FEATURES ===
+    firing_rates = counts / trial_duration
+    features['mean_firing_rate'] = firing_rates.mean(axis=1) if n_neurons else np.full(n_trials, np.nan)
+    features['firing_rate_std'] = firing_rates.std(axis=1) if n_neurons else np.full(n_trials, np.nan)
+    features['max_firing_rate'] = firing_rates.max(axis=1) if n_neurons else np.zeros(n_trials)
+
+    # Per-train ISI statistics as segment sums over the owning train
+    isis, isi_trains = spike_trains.isis()
+    n_isis, isi_means, isi_stds = (values.ravel() for values in isi_moments(spike_trains))
+    train_counts = counts.ravel()
+
+    # === BURST FEATURES ===
+    # Burst index (fraction of ISIs < 10ms) of trains with more than 3 spikes
+    bursty = train_counts > 3
+    short_fraction = np.bincount(isi_trains, isis < 0.01, n_trains) / np.maximum(n_isis, 1)
+    features['burst_index'] = trial_means(short_fraction[bursty], train_trials[bursty], n_trials, 0)
+
+    # Burst events (open on an ISI <= 10ms, close on an ISI > 50ms) lasting over 10ms
+    burst_trains, burst_starts, burst_ends, _ = detect_bursts(
+        spike_times, train_ids, max_isi=0.01, end_isi=0.05, min_spikes=2, min_duration=0.01
+    )
+    kept = bursty[burst_trains]
+    burst_trials = train_trials[burst_trains[kept]]
+    burst_durations = (burst_ends - burst_starts)[kept]
+    features['burst_frequency'] = np.bincount(burst_trials, minlength=n_trials) / trial_duration
+    features['mean_burst_duration'] = trial_means(burst_durations, burst_trials, n_trials, 0)
+
+    # === REGULARITY FEATURES ===
+    # ISI coefficient of variation of trains with more than 2 spikes
+    regular = (train_counts > 2) & (isi_means > 0)
+    cv_values = isi_stds[regular] / isi_means[regular]
+    mean_cv = trial_means(cv_values, train_trials[regular], n_trials, np.nan)
+    has_cv = ~np.isnan(mean_cv)
+    features['regularity_index'] = np.where(has_cv, 1 / (1 + np.where(has_cv, mean_cv, 0)), 0.5)
+    features['mean_cv'] = np.where(has_cv, mean_cv, 1.0)
+
+    # Fano factor (spike count variance/mean in 100ms windows)
+    fano_factors = fano_factor(window_counts(spike_trains, 0.1, trial_duration)).ravel()
+    scored = (train_counts > 2) & ~np.isnan(fano_factors)
+    features['fano_factor'] = trial_means(fano_factors[scored], train_trials[scored], n_trials, 1.0)
+
+    # === SYNCHRONY FEATURES ===
+    # Population activity in 5ms bins: each trial binned as a single pooled train
+    bin_size = 0.005
+    time_bins = np.arange(0, trial_duration + bin_size, bin_size)
+    pooled = SpikeTrainSet(spike_times, spike_trains.offsets[:, [0, -1]])
+    pop_activity = pooled.bin_counts(time_bins)[:, 0].astype(float)
+    features['sync_index'] = pop_activity.std(axis=1) / (pop_activity.mean(axis=1) + 1e-6)
+    features['sync_variance'] = pop_activity.var(axis=1)
+
+    # Pairwise correlation of the binary trains
+    pairs = None
+    if n_neurons * (n_neurons - 1) // 2 > max_corr_pairs:
+        pairs = stratified_pairs(n_neurons, max_corr_pairs, pair_seed)
+    features['cross_correlation'] = mean_pair_correlations(spike_trains, time_bins, pairs)
+
+    # === TEMPORAL FEATURES ===
+    # Population entropy
+    n_pop_bins = pop_activity.shape[1]
+    pop_hist = segment_histograms(pop_activity.ravel(), np.repeat(np.arange(n_trials), n_pop_bins),
+                                  n_trials, 10)
+    pop_prob = pop_hist / n_pop_bins
+    features['population_entropy'] = -np.sum(pop_prob * np.log(pop_prob + 1e-10), axis=1)
+
+    # Timing precision: first spike of each neuron after the stimulus
+    features['timing_precision'] = np.zeros(n_trials)
+    features['response_latency'] = np.zeros(n_trials)
+    if stimulus_times is not None and len(stimulus_times):
+        stimulus_times = np.asarray(stimulus_times, dtype=float)
+        post_stim = np.flatnonzero(spike_times > stimulus_times[train_trials[train_ids]])
+        responding, first_idx = np.unique(train_ids[post_stim], return_index=True)
+        response_trials = train_trials[responding]
+        response_times = spike_times[post_stim[first_idx]] - stimulus_times[response_trials]
+
+        n_responses = np.bincount(response_trials, minlength=n_trials)
+        latency = trial_means(response_times, response_trials, n_trials, 0)
+        spread = np.sqrt(trial_means((response_times - latency[response_trials])**2,
+                                     response_trials, n_trials, 0))
+        features['timing_precision'] = np.where(n_responses > 1, 1 / (1 + spread), 0)
+        features['response_latency'] = latency
+
+    # === COMPOSITE PATHOLOGY INDICES ===
+    features['parkinsonian_composite'] = (
+        features['sync_index'] *
+        (1 - features['regularity_index']) *
+        (1 + features['burst_index'])
+    )
+    features['epileptiform_composite'] = (
+        features['sync_index'] *
+        features['burst_index'] *
+        features['cross_correlation']
+    )
+    features['pathology_score'] = (features['parkinsonian_composite'] +
+                                   features['epileptiform_composite']) / 2
+
+    return np.column_stack([features[name] for name in DECODER_FEATURES]).astype(np.float32)
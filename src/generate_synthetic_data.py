@@ -15,6 +15,9 @@ import pickle
 import os
 from pathlib import Path
 
+from random_streams import make_rng
+from spike_store import write_recording
+
 def create_data_folder():
     """Create data folder if it doesn't exist."""
     data_dir = Path("data")
@@ -22,7 +25,7 @@ def create_data_folder():
     return data_dir
 
 def generate_realistic_spike_data(scenario="mixed_coding", n_trials=120, n_units=15, 
-                                 trial_duration=4.0, save_format="npz"):
+                                 trial_duration=4.0, save_format="npz", rng=42):
     """
     Generate realistic synthetic spike data with different coding scenarios.
     
@@ -41,164 +44,121 @@ def generate_realistic_spike_data(scenario="mixed_coding", n_trials=120, n_units
     trial_duration : float
         Duration of each trial in seconds
     save_format : str
-        Format to save data ('npz', 'pkl', 'csv', 'mat')
+        Format to save data ('npz', 'pkl', 'csv', 'mat', 'columnar')
+    rng : np.random.Generator, int or None
+        Random stream; the default seed 42 keeps generated files reproducible
     """
     
     print(f"🧠 Generating {scenario} synthetic data...")
     print(f"   📊 {n_trials} trials, {n_units} units, {trial_duration}s duration")
     
-    np.random.seed(42)  # For reproducibility
+    rng = make_rng(rng)
     
     # Generate stimulus events
     inter_trial_interval = 6.0  # 6 seconds between trials
     event_times = np.arange(0, n_trials * inter_trial_interval, inter_trial_interval)
     
     # Mix of ON and OFF stimuli (60% ON, 40% OFF for slight imbalance - more realistic)
-    event_labels = np.random.choice(['ON', 'OFF'], n_trials, p=[0.6, 0.4])
-    
-    # Initialize spike data
-    all_spike_times = []
-    all_unit_ids = []
+    event_labels = rng.choice(['ON', 'OFF'], n_trials, p=[0.6, 0.4])
     
     # Unit properties (make some units more responsive than others)
     unit_properties = {}
     for unit_id in range(1, n_units + 1):
         unit_properties[unit_id] = {
-            'base_rate': np.random.uniform(0.5, 8.0),  # Baseline firing rate (Hz)
-            'responsiveness': np.random.uniform(0.1, 1.0),  # How much the unit responds
-            'preferred_stimulus': np.random.choice(['ON', 'OFF']),  # Which stimulus it prefers
-            'temporal_precision': np.random.uniform(0.5, 2.0),  # Temporal precision factor
-            'noise_level': np.random.uniform(0.1, 0.5)  # Background noise
+            'base_rate': rng.uniform(0.5, 8.0),  # Baseline firing rate (Hz)
+            'responsiveness': rng.uniform(0.1, 1.0),  # How much the unit responds
+            'preferred_stimulus': rng.choice(['ON', 'OFF']),  # Which stimulus it prefers
+            'temporal_precision': rng.uniform(0.5, 2.0),  # Temporal precision factor
+            'noise_level': rng.uniform(0.1, 0.5)  # Background noise
         }
     
     print(f"   🎯 Unit responsiveness: {len([u for u in unit_properties.values() if u['responsiveness'] > 0.5])}/{n_units} highly responsive")
     
-    # Generate spikes for each trial
-    for trial_idx, (event_time, stimulus) in enumerate(zip(event_times, event_labels)):
-        
-        for unit_id in range(1, n_units + 1):
-            props = unit_properties[unit_id]
-            
-            # Time windows
-            pre_stim_start = event_time - 1.0
-            stim_start = event_time
-            stim_end = event_time + 2.0
-            post_stim_end = event_time + trial_duration - 1.0
-            
-            # Generate spikes for different periods
-            unit_spikes = []
-            
-            # 1. Pre-stimulus baseline
-            baseline_rate = props['base_rate'] * (1 + props['noise_level'] * np.random.randn() * 0.1)
-            baseline_spikes = generate_poisson_spikes(baseline_rate, 1.0)
-            baseline_spikes = baseline_spikes + pre_stim_start
-            unit_spikes.extend(baseline_spikes)
-            
-            # 2. Stimulus period - this is where the coding happens!
-            stim_duration = 2.0
-            
-            if scenario == "rate_coding":
-                # Rate coding: Change firing rate but keep timing random
-                if stimulus == props['preferred_stimulus']:
-                    stim_rate = props['base_rate'] * (1 + 2.0 * props['responsiveness'])
-                else:
-                    stim_rate = props['base_rate'] * (1 - 0.5 * props['responsiveness'])
-                
-                stim_spikes = generate_poisson_spikes(stim_rate, stim_duration)
-                stim_spikes = stim_spikes + stim_start
-                
-            elif scenario == "temporal_coding":
-                # Temporal coding: Precise timing patterns
-                base_rate = props['base_rate']
-                
-                if stimulus == props['preferred_stimulus']:
-                    # Create stereotyped temporal pattern
-                    if props['responsiveness'] > 0.7:  # High responders get precise patterns
-                        # Early precise burst
-                        early_burst = np.random.normal(0.05, 0.01, size=int(2 + 3*props['responsiveness']))
-                        early_burst = early_burst[early_burst > 0]
-                        
-                        # Late response  
-                        late_response = np.random.normal(1.2, 0.05, size=int(1 + 2*props['responsiveness']))
-                        late_response = late_response[(late_response > 0.8) & (late_response < 1.8)]
-                        
-                        precise_spikes = np.concatenate([early_burst, late_response])
-                        precise_spikes = precise_spikes + stim_start
-                        
-                        # Add some background spikes
-                        bg_spikes = generate_poisson_spikes(base_rate * 0.5, stim_duration)
-                        bg_spikes = bg_spikes + stim_start
-                        
-                        stim_spikes = np.concatenate([precise_spikes, bg_spikes])
-                    else:
-                        # Less responsive units have less precise timing
-                        stim_spikes = generate_poisson_spikes(base_rate * 1.2, stim_duration)
-                        stim_spikes = stim_spikes + stim_start
-                else:
-                    # Non-preferred stimulus
-                    stim_spikes = generate_poisson_spikes(base_rate * 0.8, stim_duration)
-                    stim_spikes = stim_spikes + stim_start
-                    
-            elif scenario == "mixed_coding":
-                # Mixed coding: Both rate and timing matter
-                if stimulus == props['preferred_stimulus']:
-                    # Increase rate
-                    stim_rate = props['base_rate'] * (1 + 1.5 * props['responsiveness'])
-                    
-                    # Add temporal structure for highly responsive units
-                    if props['responsiveness'] > 0.6:
-                        # Early response with some jitter
-                        early_spikes = np.random.normal(0.1, 0.03, size=int(1 + 2*props['responsiveness']))
-                        early_spikes = early_spikes[(early_spikes > 0) & (early_spikes < 0.5)]
-                        early_spikes = early_spikes + stim_start
-                        
-                        # Background poisson
-                        bg_spikes = generate_poisson_spikes(stim_rate * 0.7, stim_duration)
-                        bg_spikes = bg_spikes + stim_start
-                        
-                        stim_spikes = np.concatenate([early_spikes, bg_spikes])
-                    else:
-                        stim_spikes = generate_poisson_spikes(stim_rate, stim_duration)
-                        stim_spikes = stim_spikes + stim_start
-                else:
-                    # Non-preferred: decrease rate, no temporal structure
-                    stim_rate = props['base_rate'] * (1 - 0.3 * props['responsiveness'])
-                    stim_spikes = generate_poisson_spikes(stim_rate, stim_duration)
-                    stim_spikes = stim_spikes + stim_start
-                    
-            else:  # no_coding
-                # No stimulus effect - just baseline firing
-                stim_rate = props['base_rate'] * (1 + props['noise_level'] * np.random.randn() * 0.1)
-                stim_spikes = generate_poisson_spikes(stim_rate, stim_duration)
-                stim_spikes = stim_spikes + stim_start
-            
-            unit_spikes.extend(stim_spikes)
-            
-            # 3. Post-stimulus period
-            post_rate = props['base_rate'] * (1 + props['noise_level'] * np.random.randn() * 0.1)
-            post_spikes = generate_poisson_spikes(post_rate, 1.0)
-            post_spikes = post_spikes + stim_end
-            unit_spikes.extend(post_spikes)
-            
-            # Add all spikes for this unit
-            unit_spikes = np.array(unit_spikes)
-            unit_spikes = unit_spikes[unit_spikes >= pre_stim_start]  # Remove any negative spikes
-            unit_spikes = unit_spikes[unit_spikes <= post_stim_end]   # Remove spikes beyond trial
-            
-            # Add refractory period violations (small percentage)
-            unit_spikes = add_refractory_violations(unit_spikes, violation_rate=0.01)
-            
-            all_spike_times.extend(unit_spikes)
-            all_unit_ids.extend([unit_id] * len(unit_spikes))
-    
-    # Convert to arrays
-    all_spike_times = np.array(all_spike_times)
-    all_unit_ids = np.array(all_unit_ids)
-    
-    # Sort by spike time
-    sort_idx = np.argsort(all_spike_times)
-    all_spike_times = all_spike_times[sort_idx]
-    all_unit_ids = all_unit_ids[sort_idx]
+    # Per-unit properties as arrays, broadcast against trials as (n_trials, n_units)
+    unit_ids = np.arange(1, n_units + 1)
+    base_rate = np.array([unit_properties[u]['base_rate'] for u in unit_ids])
+    responsiveness = np.array([unit_properties[u]['responsiveness'] for u in unit_ids])
+    noise_level = np.array([unit_properties[u]['noise_level'] for u in unit_ids])
+    preferred = event_labels[:, None] == np.array([unit_properties[u]['preferred_stimulus'] for u in unit_ids])
+    
+    def jittered_rate(rate):
+        return rate * (1 + noise_level * rng.standard_normal((n_trials, n_units)) * 0.1)
+    
+    # Epochs relative to each event: baseline [-1, 0), stimulus [0, 2), post-stimulus [2, 3)
+    stim_duration = 2.0
+    window_end = trial_duration - 1.0  # Spikes beyond the trial are dropped
+    epoch_starts = np.array([-1.0, 0.0, stim_duration])
+    epoch_lengths = np.clip(np.minimum([1.0, stim_duration, 1.0], window_end - epoch_starts), 0, None)
+    
+    baseline_rate = jittered_rate(base_rate)
+    post_rate = jittered_rate(base_rate)
+    
+    # Stimulus-period rates and precisely timed spike groups (size, mean, sd, low, high)
+    precise_groups = []
+    if scenario == "rate_coding":
+        # Rate coding: Change firing rate but keep timing random
+        stim_rate = np.where(preferred, base_rate * (1 + 2.0 * responsiveness),
+                             base_rate * (1 - 0.5 * responsiveness))
+    elif scenario == "temporal_coding":
+        # Temporal coding: high responders fire a stereotyped early burst and late
+        # response plus background spikes; others only change rate slightly
+        precise = preferred & (responsiveness > 0.7)
+        stim_rate = np.where(precise, base_rate * 0.5,
+                             np.where(preferred, base_rate * 1.2, base_rate * 0.8))
+        precise_groups = [
+            (np.where(precise, (2 + 3 * responsiveness).astype(int), 0), 0.05, 0.01, 0.0, np.inf),
+            (np.where(precise, (1 + 2 * responsiveness).astype(int), 0), 1.2, 0.05, 0.8, 1.8),
+        ]
+    elif scenario == "mixed_coding":
+        # Mixed coding: increased rate, plus a jittered early response for highly responsive units
+        precise = preferred & (responsiveness > 0.6)
+        preferred_rate = base_rate * (1 + 1.5 * responsiveness)
+        stim_rate = np.where(preferred, np.where(precise, preferred_rate * 0.7, preferred_rate),
+                             base_rate * (1 - 0.3 * responsiveness))
+        precise_groups = [
+            (np.where(precise, (1 + 2 * responsiveness).astype(int), 0), 0.1, 0.03, 0.0, 0.5),
+        ]
+    else:  # no_coding
+        # No stimulus effect - just baseline firing
+        stim_rate = jittered_rate(base_rate)
+    
+    # Every spike block below is ordered by train (trial-major, unit-minor)
+    n_trains = n_trials * n_units
+    train_event_times = np.repeat(event_times, n_units)
+    block_times, block_counts = [], []
+    
+    # Poisson epochs: all counts in one draw, then one uniform draw places every spike
+    for epoch_rate, start, length in zip((baseline_rate, stim_rate, post_rate), epoch_starts, epoch_lengths):
+        counts = rng.poisson(np.clip(epoch_rate, 0, None).ravel() * length)
+        spike_train = np.repeat(np.arange(n_trains), counts)
+        times = train_event_times[spike_train] + start + rng.uniform(0, length, counts.sum())
+        block_times.append(times)
+        block_counts.append(counts)
+    
+    # Precisely timed spikes, dropped outside their window (as in the rejection step)
+    for sizes, mean, sd, low, high in precise_groups:
+        sizes = sizes.ravel()
+        spike_train = np.repeat(np.arange(n_trains), sizes)
+        offsets = rng.normal(mean, sd, sizes.sum())
+        keep = (offsets > low) & (offsets < high) & (offsets <= window_end)
+        block_times.append(train_event_times[spike_train[keep]] + offsets[keep])
+        block_counts.append(np.bincount(spike_train[keep], minlength=n_trains))
+    
+    block_counts = np.stack(block_counts, axis=1)  # (n_trains, n_blocks)
+    spike_times = np.concatenate(block_times)
+    spike_trains = np.concatenate([np.repeat(np.arange(n_trains), block_counts[:, block])
+                                   for block in range(block_counts.shape[1])])
+    
+    # Add refractory period violations (1% of each train's spikes), in one batch
+    violation_times, violation_trains = _refractory_violations(spike_times, block_counts,
+                                                               violation_rate=0.01, rng=rng)
+    spike_times = np.concatenate([spike_times, violation_times])
+    spike_trains = np.concatenate([spike_trains, violation_trains])
+    
+    # Merge: the only sort of the whole recording
+    sort_idx = np.argsort(spike_times, kind='stable')
+    all_spike_times = spike_times[sort_idx]
+    all_unit_ids = unit_ids[spike_trains[sort_idx] % n_units]
     
     # Create data dictionary
     data = {
@@ -220,33 +180,68 @@ def generate_realistic_spike_data(scenario="mixed_coding", n_trials=120, n_units
     
     return data
 
-def generate_poisson_spikes(rate, duration):
+def generate_poisson_spikes(rate, duration, rng=None):
     """Generate spikes from Poisson process."""
+    rng = make_rng(rng)
     if rate <= 0:
         return np.array([])
     
-    n_spikes = np.random.poisson(rate * duration)
+    n_spikes = rng.poisson(rate * duration)
     if n_spikes == 0:
         return np.array([])
     
-    spikes = np.sort(np.random.uniform(0, duration, n_spikes))
+    spikes = np.sort(rng.uniform(0, duration, n_spikes))
     return spikes
 
-def add_refractory_violations(spike_times, violation_rate=0.01, refractory_period=0.001):
+def add_refractory_violations(spike_times, violation_rate=0.01, refractory_period=0.001, rng=None):
     """Add a small percentage of refractory period violations to make data more realistic."""
+    rng = make_rng(rng)
     if len(spike_times) < 2:
         return spike_times
     
     spike_times = np.sort(spike_times)
     n_violations = int(len(spike_times) * violation_rate)
     
-    for _ in range(n_violations):
-        # Pick a random spike and add a violation nearby
-        idx = np.random.randint(0, len(spike_times)-1)
-        violation_time = spike_times[idx] + np.random.uniform(0.0001, refractory_period*0.8)
-        spike_times = np.append(spike_times, violation_time)
+    # Pick random spikes and add a violation shortly after each, all at once
+    idx = rng.integers(0, len(spike_times) - 1, size=n_violations)
+    violation_times = spike_times[idx] + rng.uniform(0.0001, refractory_period*0.8, n_violations)
     
-    return np.sort(spike_times)
+    return np.sort(np.concatenate([spike_times, violation_times]))
+
+def _refractory_violations(spike_times, block_counts, violation_rate=0.01, refractory_period=0.001, rng=None):
+    """
+    Refractory violations for many spike trains at once.
+    
+    Parameters:
+    -----------
+    spike_times : np.ndarray
+        Concatenated spike blocks; within each block, spikes are ordered by train
+    block_counts : np.ndarray
+        (n_trains, n_blocks) spikes of each train in each block
+        
+    Returns:
+    --------
+    (violation_times, violation_trains)
+    """
+    rng = make_rng(rng)
+    train_counts = block_counts.sum(axis=1)
+    n_violations = (train_counts * violation_rate).astype(int)
+    n_violations[train_counts < 2] = 0
+    violation_train = np.repeat(np.arange(len(train_counts)), n_violations)
+    
+    # Spike k (uniform over the train) lies in the block where the train's running count passes k
+    k = rng.integers(0, train_counts[violation_train])
+    train_cumulative = np.cumsum(block_counts, axis=1)[violation_train]
+    block = (k[:, None] >= train_cumulative).sum(axis=1)
+    before_block = np.take_along_axis(train_cumulative, block[:, None], axis=1)[:, 0] - \
+        block_counts[violation_train, block]
+    
+    block_starts = np.concatenate([[0], np.cumsum(block_counts.sum(axis=0))[:-1]])
+    train_starts = np.cumsum(block_counts, axis=0) - block_counts  # Within each block
+    source = block_starts[block] + train_starts[violation_train, block] + (k - before_block)
+    
+    violation_times = spike_times[source] + rng.uniform(0.0001, refractory_period*0.8, len(source))
+    return violation_times, violation_train
 
 def save_data(data, filename, format_type):
     """Save data in specified format."""
@@ -273,6 +268,9 @@ def save_data(data, filename, format_type):
         })
         events_path = str(filepath).replace('.csv', '_events.csv')
         events_df.to_csv(events_path, index=False)
+    elif format_type == 'columnar':
+        # Directory of raw .npy columns + metadata.json, opened memory-mapped
+        filepath = write_recording(data, filepath)
     elif format_type == 'mat':
         try:
             from scipy.io import savemat
@@ -319,9 +317,9 @@ def generate_all_scenarios():
         npz_file = save_data(data, f"{filename_base}.npz", 'npz')
         generated_files.append(npz_file)
         
-        # Pickle format
-        pkl_file = save_data(data, f"{filename_base}.pkl", 'pkl')
-        generated_files.append(pkl_file)
+        # Columnar store (memory-mapped, replaces the duplicate pickle copy)
+        columnar_dir = save_data(data, filename_base, 'columnar')
+        generated_files.append(columnar_dir)
         
         # CSV format  
         csv_file = save_data(data, f"{filename_base}.csv", 'csv')
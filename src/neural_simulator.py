@@ -4,11 +4,18 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 from datetime import datetime
+from pathlib import Path
 import time
 
 # Import our enhanced modules
 from spike_data_loader import NeuralPatternGenerator
 from decoding_analysis import OptimizedMultiClassDecoder
+from neuron_features import NEURON_FEATURES, feature_column, neuron_feature_matrix
+from dataset_cache import DatasetCache
+
+# Training matrices shared by all sessions; warm entries skip data generation
+TRAINING_CACHE = DatasetCache(Path(__file__).resolve().parent.parent / "cache" / "datasets",
+                              max_bytes=256 * 2**20)
 
 # Configure page
 st.set_page_config(
@@ -430,6 +437,8 @@ def initialize_session_state():
         st.session_state.training_results = None
     if 'current_data' not in st.session_state:
         st.session_state.current_data = None
+    if 'neuron_features' not in st.session_state:
+        st.session_state.neuron_features = None
     if 'prediction_results' not in st.session_state:
         st.session_state.prediction_results = None
     if 'user_mode' not in st.session_state:
@@ -716,6 +725,9 @@ def generate_and_analyze_pattern_simple(pattern_type, n_neurons, trial_duration,
         )
         
         st.session_state.current_data = spike_data
+        # Per-neuron features once per pattern; drill-down views only index them
+        st.session_state.neuron_features = neuron_feature_matrix(
+            spike_data['spike_trains'], trial_duration, spike_data['stimulus_times'])
 
         # Analyze with AI
         if st.session_state.decoder_trained:
@@ -1131,6 +1143,8 @@ def show_visualizations_simple():
     with col4:
         show_spike_count_dist()
 
+    show_neuron_drilldown()
+
 def show_raster_plot_simple():
     """Show Vision Pro style raster plot with glow effects"""
 
@@ -1411,6 +1425,29 @@ def show_spike_count_dist():
     </div>
     """, unsafe_allow_html=True)
 
+def show_neuron_drilldown():
+    """Show per-neuron features from the stored feature matrix"""
+
+    neuron_features = st.session_state.neuron_features
+    if neuron_features is None:
+        return
+
+    with st.expander("Per-neuron drill-down"):
+        col1, col2 = st.columns(2)
+        with col1:
+            feature = st.selectbox("Feature", NEURON_FEATURES, key='drilldown_feature')
+        with col2:
+            neuron = st.selectbox("Neuron", range(neuron_features.shape[1]), key='drilldown_neuron')
+
+        # Mean over trials of one feature for every neuron
+        values = pd.DataFrame({feature: np.nanmean(feature_column(neuron_features, feature), axis=0)})
+        values.index.name = 'Neuron'
+        st.bar_chart(values)
+
+        # Every feature of one neuron, trial by trial
+        st.dataframe(pd.DataFrame(neuron_features[:, neuron], columns=NEURON_FEATURES)
+                     .rename_axis('Trial'))
+
 def train_classifier():
     """Train the classifier with clear progress"""
 
@@ -1432,7 +1469,8 @@ def train_classifier():
         progress_bar.progress(60)
 
         # Train the model
-        results = st.session_state.decoder.train(n_trials_per_class=30, verbose=False)
+        results = st.session_state.decoder.train(n_trials_per_class=30, verbose=False,
+                                                 cache=TRAINING_CACHE)
 
         progress_bar.progress(90)
         status_text.text("Finalizing training...")
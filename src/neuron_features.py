@@ -0,0 +1,203 @@
+"""
+Per-Neuron Feature Matrices
+===========================
+
+Features of every neuron in every trial as one float32
+(n_trials, n_neurons, n_features) array with the column order
+NEURON_FEATURES, NaN where a feature is undefined for a train (e.g. an ISI
+CV without ISIs).
+
+The same buffer can be viewed as a (n_trials, n_neurons) record array with
+one float32 field per feature (as_records), which is how it is stored: a
+single .npy file with the feature names in its header, written and opened
+through np.lib.format.open_memmap / np.load(mmap_mode=...). Drill-down views
+read single neurons or features from the matrix, and population summaries
+are reductions over it (population_summary) instead of another pass over
+the spikes.
+"""
+
+import numpy as np
+
+from burst_detection import detect_bursts
+from spike_statistics import (cv2, fano_factor, isi_cv, isi_entropy, isi_moments, local_variation,
+                              segment_means, window_counts)
+from spike_train_set import as_spike_train_set
+
+# Column order of neuron_feature_matrix
+NEURON_FEATURES = (
+    'firing_rate', 'spike_count',
+    'mean_isi', 'isi_cv', 'local_variation', 'cv2', 'isi_entropy', 'fano_factor',
+    'burst_index', 'burst_rate', 'mean_burst_duration',
+    'timing_precision',
+)
+
+# One float32 field per feature: the record view of a feature matrix
+NEURON_FEATURE_DTYPE = np.dtype([(name, np.float32) for name in NEURON_FEATURES])
+
+
+def neuron_feature_matrix(spike_trains, trial_duration=2.0, stimulus_time=None, path=None):
+    """
+    Features of every neuron of every trial
+
+    Parameters:
+    -----------
+    spike_trains : SpikeTrainSet or nested spike_trains[trial][neuron]
+    trial_duration : float
+        Trial length (s)
+    stimulus_time : float, array-like or None
+        Stimulus onset (s), one for all trials or one per trial; None leaves
+        timing_precision NaN
+    path : str, Path or None
+        Write the matrix to this .npy file (as records) and return the
+        memory-mapped array instead of an in-memory one
+
+    Returns:
+    --------
+    np.ndarray : float32, shape (n_trials, n_neurons, len(NEURON_FEATURES))
+    """
+    spike_trains = as_spike_train_set(spike_trains).compact()
+    n_trials, n_neurons = spike_trains.shape
+    n_trains = n_trials * n_neurons
+    counts = spike_trains.counts
+    features = {}
+
+    # === RATE ===
+    features['firing_rate'] = counts / trial_duration
+    features['spike_count'] = counts
+
+    # === ISI STATISTICS ===
+    n_isis, features['mean_isi'], _ = isi_moments(spike_trains)
+    features['isi_cv'] = isi_cv(spike_trains)
+    features['local_variation'] = local_variation(spike_trains)
+    features['cv2'] = cv2(spike_trains)
+    features['isi_entropy'] = isi_entropy(spike_trains)
+    features['fano_factor'] = fano_factor(window_counts(spike_trains, 0.1, trial_duration))
+
+    # === BURSTS ===
+    # Fraction of ISIs < 10ms, and bursts of at least 3 spikes with ISIs <= 10ms
+    isis, isi_trains = spike_trains.isis()
+    n_short = np.bincount(isi_trains, isis < 0.01, minlength=n_trains).reshape(n_trials, n_neurons)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features['burst_index'] = np.where(n_isis > 0, n_short / n_isis, np.nan)
+    burst_trains, starts, ends, _ = detect_bursts(spike_trains.spike_times, spike_trains.train_ids())
+    burst_durations, n_bursts = segment_means(ends - starts, burst_trains, n_trains)
+    features['burst_rate'] = n_bursts.reshape(n_trials, n_neurons) / trial_duration
+    features['mean_burst_duration'] = burst_durations.reshape(n_trials, n_neurons)
+
+    # === TIMING ===
+    # Vector strength (8 Hz) of the spikes 0-500ms after the stimulus, with more than 2 such spikes
+    features['timing_precision'] = np.full((n_trials, n_neurons), np.nan)
+    if stimulus_time is not None and n_trains:
+        train_ids = spike_trains.train_ids()
+        onsets = np.broadcast_to(np.asarray(stimulus_time, dtype=float), (n_trials,))
+        relative_times = spike_trains.spike_times - onsets[train_ids // n_neurons]
+        post_stim = (relative_times > 0) & (relative_times < 0.5)
+        phases = 2 * np.pi * 8 * relative_times[post_stim]
+        mean_cos, n_post = segment_means(np.cos(phases), train_ids[post_stim], n_trains)
+        mean_sin, _ = segment_means(np.sin(phases), train_ids[post_stim], n_trains)
+        features['timing_precision'] = np.where(n_post > 2, np.hypot(mean_cos, mean_sin),
+                                                np.nan).reshape(n_trials, n_neurons)
+
+    if path is None:
+        matrix = np.empty((n_trials, n_neurons, len(NEURON_FEATURES)), dtype=np.float32)
+    else:
+        records = np.lib.format.open_memmap(path, mode='w+', dtype=NEURON_FEATURE_DTYPE,
+                                            shape=(n_trials, n_neurons))
+        matrix = as_matrix(records)
+    for column, name in enumerate(NEURON_FEATURES):
+        matrix[..., column] = features[name]
+    if path is not None:
+        records.flush()
+    return matrix
+
+
+def as_records(matrix):
+    """(n_trials, n_neurons) record view of a feature matrix, one field per feature"""
+    return np.ascontiguousarray(matrix, dtype=np.float32).view(NEURON_FEATURE_DTYPE)[..., 0]
+
+
+def as_matrix(records):
+    """(n_trials, n_neurons, n_features) float32 view of feature records"""
+    return records.view(np.float32).reshape(records.shape + (len(NEURON_FEATURES),))
+
+
+def open_neuron_features(path, mmap_mode='r'):
+    """Memory-map a feature matrix written by neuron_feature_matrix(path=...)"""
+    records = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    if records.dtype != NEURON_FEATURE_DTYPE:
+        raise ValueError(f"{path} does not hold neuron features of this version")
+    return as_matrix(records)
+
+
+def feature_column(matrix, name):
+    """One feature of every neuron and trial, shape (n_trials, n_neurons) (a view)"""
+    return matrix[..., NEURON_FEATURES.index(name)]
+
+
+def _scored_mean(values, scored, default):
+    """Mean of the defined values of the scored trains, `default` if there are none"""
+    values = values[scored & ~np.isnan(values)].astype(float)
+    return values.mean() if len(values) else default
+
+
+def population_summary(matrix, trial_duration=2.0):
+    """
+    Population features of the analyzer that are reductions over neurons
+
+    Each value applies the spike-count criteria of the corresponding
+    EnhancedSpikeAnalyzer feature, so it matches that feature up to float32
+    rounding of the per-neuron values. Features that need more than the
+    per-neuron values (stimulus labels, rate histograms, the pooled ISI
+    histogram of isi_entropy, inter-burst gaps) are left to the analyzer.
+
+    Returns:
+    --------
+    dict : family -> {feature: value}, as analyze_spike_data
+    """
+    column = {name: feature_column(matrix, name).astype(float) for name in NEURON_FEATURES}
+    counts = column['spike_count']
+    rates = counts / trial_duration  # Exact, unlike the float32 firing_rate column
+    has_trains = counts.size > 0
+
+    # ISIs and bursts pooled over trains are count-weighted means of the per-train means
+    n_isis = np.maximum(counts - 1, 0)
+    pooled = (counts > 2) & ~np.isnan(column['mean_isi'])
+    n_bursts = column['burst_rate'] * trial_duration
+    bursting = (counts > 3) & (n_bursts > 0)
+    cv_values = column['isi_cv'][(counts > 3) & ~np.isnan(column['isi_cv'])]
+    # The temporal family's CV divides by mean ISI + 1e-6 (0 for trains of coincident spikes)
+    with np.errstate(invalid='ignore'):
+        temporal_cvs = np.where(column['mean_isi'] > 0,
+                                column['isi_cv'] * column['mean_isi'] / (column['mean_isi'] + 1e-6), 0)
+    temporal_cvs = temporal_cvs[counts > 2]
+    timing = column['timing_precision'][~np.isnan(column['timing_precision'])]
+
+    return {
+        'rate_features': {
+            'mean_population_rate': rates.mean() if has_trains else np.nan,
+            'rate_variance': rates.var() if has_trains else np.nan,
+            'rate_range': rates.max() - rates.min() if has_trains else np.nan,
+            'fano_factor': rates.var() / (rates.mean() + 1e-6) if has_trains else np.nan,
+        },
+        'temporal_features': {
+            'mean_timing_precision': timing.mean() if len(timing) else 0,
+            'timing_precision_std': timing.std() if len(timing) else 0,
+            'mean_isi': (np.sum((column['mean_isi'] * n_isis)[pooled]) / np.sum(n_isis[pooled])
+                         if pooled.any() else 0),
+            'isi_cv': temporal_cvs.mean() if len(temporal_cvs) else 0,
+            'local_variation': _scored_mean(column['local_variation'], counts > 3, 0),
+        },
+        'burst_features': {
+            'burst_index': _scored_mean(column['burst_index'], counts > 3, 0),
+            'mean_burst_duration': (np.sum((column['mean_burst_duration'] * n_bursts)[bursting]) /
+                                    np.sum(n_bursts[bursting]) if bursting.any() else 0),
+            'burst_frequency': (np.sum(n_bursts[bursting]) / (len(matrix) * trial_duration)
+                                if bursting.any() else 0),
+        },
+        'regularity_features': {
+            'mean_fano_factor': _scored_mean(column['fano_factor'], counts > 2, 1.0),
+            'mean_cv': cv_values.mean() if len(cv_values) else 1.0,
+            'mean_entropy': _scored_mean(column['isi_entropy'], counts > 5, 0),
+            'regularity_index': 1 / (1 + cv_values.mean()) if len(cv_values) else 0.5,
+        },
+    }
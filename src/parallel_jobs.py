@@ -0,0 +1,78 @@
+"""
+Parallel Jobs
+=============
+
+Process-pool helpers for embarrassingly parallel generation work.
+
+Every job carries its own child np.random.SeedSequence, spawned up front from
+one root seed, so results depend only on the root seed and the job order --
+never on how many workers run or how jobs are scheduled across them.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+def resolve_n_jobs(n_jobs):
+    """Number of worker processes for n_jobs (None or 1: serial, -1: all cores)"""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def root_seed_sequence(seed=None):
+    """
+    Root SeedSequence for a batch of jobs.
+
+    `seed` may be an int, a SeedSequence, a np.random.Generator (whose stream
+    provides the entropy, so a seeded generator gives reproducible batches)
+    or None for fresh OS entropy.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        seed = seed.integers(0, 2**32, size=4, dtype=np.uint64).tolist()
+    return np.random.SeedSequence(seed)
+
+
+def spawn_seeds(seed, n_jobs):
+    """Independent child SeedSequences, one per job"""
+    return root_seed_sequence(seed).spawn(n_jobs)
+
+
+def map_jobs(function, jobs, n_jobs=1, initializer=None, initargs=(), chunksize=None):
+    """
+    Apply `function` to every job, in a process pool when n_jobs > 1.
+
+    Parameters:
+    -----------
+    function : callable
+        Module-level function taking one job (must be picklable)
+    jobs : list
+        Job arguments; results are returned in the same order
+    n_jobs : int or None
+        Worker processes (None or 1: run in this process, -1: all cores)
+    initializer : callable or None
+        Called once per worker with `initargs`, e.g. to cache a shared object
+
+    Returns:
+    --------
+    list : function(job) for each job
+    """
+    jobs = list(jobs)
+    n_workers = min(resolve_n_jobs(n_jobs), max(len(jobs), 1))
+
+    if n_workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [function(job) for job in jobs]
+
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (n_workers * 4))
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        return list(executor.map(function, jobs, chunksize=chunksize))
@@ -0,0 +1,640 @@
+"""
+Performance Benchmarks
+======================
+
+Timing checks for the data generation and analysis pipeline.
+Run from the src/ folder: python performance_benchmarks.py
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+import tracemalloc
+import numpy as np
+
+from spike_data_loader import (NeuralPatternGenerator, SpikeDataLoader, BETA_MIXTURE_RATIOS,
+                               BETA_MIXTURE_WEIGHTS, SYNCHRONY_FREQUENCIES, SYNCHRONY_WEIGHTS)
+from sinusoid_basis import shifted_sine, sine_mixture
+from spike_store import csv_to_recording, open_recording, read_spike_csv, write_recording
+
+# Representative parameter sets for the spike generation benchmarks
+GENERATION_SCENARIOS = {
+    'Healthy': {'spike_regularity': 0.8, 'pathological_bursting': 0.0},
+    'Parkinsonian': {'spike_regularity': 0.3, 'pathological_bursting': 0.2},
+    'Epileptiform': {'spike_regularity': 0.5, 'pathological_bursting': 0.6},
+}
+
+# Trial-level settings matching the classes of generate_multiclass_dataset
+TRIAL_SCENARIOS = {
+    'Healthy': {'oscillatory_power': 0.0, 'population_synchrony': 0.15,
+                'spike_regularity': 0.8, 'pathological_bursting': 0.0},
+    'Parkinsonian': {'oscillatory_power': 0.7, 'population_synchrony': 0.75,
+                     'spike_regularity': 0.35, 'pathological_bursting': 0.25},
+    'Epileptiform': {'oscillatory_power': 0.5, 'population_synchrony': 0.85,
+                     'spike_regularity': 0.5, 'pathological_bursting': 0.6},
+}
+
+def _spike_train_stats(spike_trains, trial_duration):
+    """Mean firing rate and mean ISI CV over a list of spike trains"""
+    rates = [len(spikes) / trial_duration for spikes in spike_trains]
+    cvs = []
+    for spikes in spike_trains:
+        if len(spikes) > 2:
+            isis = np.diff(spikes)
+            cvs.append(np.std(isis) / np.mean(isis))
+    return np.mean(rates), np.mean(cvs) if cvs else 0
+
+def benchmark_spike_engine(n_neurons=200, trial_duration=2.0, base_firing_rates=(20.0, 80.0)):
+    """Compare the per-spike loop against the vectorized spike engine"""
+
+    print("\nSpike Generation Engine Benchmark:")
+    print("-" * 70)
+    print(f"  {'Scenario':<20}{'Engine':<12}{'Spikes/s':>12}{'Rate (Hz)':>10}{'ISI CV':>8}{'Speedup':>9}")
+
+    generators = {
+        engine: NeuralPatternGenerator(n_neurons=1, trial_duration=trial_duration, engine=engine)
+        for engine in ('loop', 'vectorized')
+    }
+
+    for base_firing_rate in base_firing_rates:
+        # Shared rate profile with a stimulus-like modulation
+        t = generators['loop'].time_bins
+        firing_rate = base_firing_rate * (1 + 0.5 * np.sin(2 * np.pi * 8 * t))
+
+        for scenario, params in GENERATION_SCENARIOS.items():
+            _benchmark_engines(generators, f"{scenario} {base_firing_rate:.0f}Hz", params,
+                               firing_rate, n_neurons, trial_duration)
+
+def _benchmark_engines(generators, label, params, firing_rate, n_neurons, trial_duration):
+    """Time each engine on the same rate profile and print one row per engine"""
+    throughput = {}
+    for engine, generator in generators.items():
+        spike_trains = []
+        start_time = time.perf_counter()
+        for _ in range(n_neurons):
+            spike_trains.append(generator._generate_neuron_spikes(
+                firing_rate, params['spike_regularity'], params['pathological_bursting'],
+                burst_duration=0.05, interburst_interval=0.2, refractory_period=0.002
+            ))
+        elapsed = time.perf_counter() - start_time
+
+        n_spikes = sum(len(spikes) for spikes in spike_trains)
+        throughput[engine] = n_spikes / elapsed
+        mean_rate, mean_cv = _spike_train_stats(spike_trains, trial_duration)
+        speedup = throughput[engine] / throughput['loop']
+
+        print(f"  {label:<20}{engine:<12}{throughput[engine]:>12,.0f}"
+              f"{mean_rate:>10.2f}{mean_cv:>8.3f}{speedup:>8.1f}x")
+
+def benchmark_population_generation(population_sizes=(50, 1000), n_trials=3, trial_duration=2.0):
+    """Time whole trials for each spike generation engine and population size"""
+
+    print("\nTrial Generation Benchmark:")
+    print("-" * 70)
+    print(f"  {'Scenario':<20}{'Engine':<12}{'ms/trial':>10}{'Spikes/s':>14}{'Speedup':>9}")
+
+    for n_neurons in population_sizes:
+        for scenario, params in TRIAL_SCENARIOS.items():
+            trial_times = {}
+            for engine in ('loop', 'vectorized', 'batched'):
+                generator = NeuralPatternGenerator(n_neurons=n_neurons, trial_duration=trial_duration,
+                                                   engine=engine)
+                n_spikes = 0
+                start_time = time.perf_counter()
+                for _ in range(n_trials):
+                    spike_trains = generator._generate_trial_spikes(
+                        1.2, 0.0, 10.0, 0.1, 0.002,
+                        params['oscillatory_power'], params['population_synchrony'],
+                        params['spike_regularity'], params['pathological_bursting'],
+                        20.0, 0.05, 0.2
+                    )
+                    n_spikes += sum(len(spikes) for spikes in spike_trains)
+                elapsed = time.perf_counter() - start_time
+
+                trial_times[engine] = elapsed / n_trials
+                speedup = trial_times['loop'] / trial_times[engine]
+                print(f"  {f'{scenario} x{n_neurons}':<20}{engine:<12}{trial_times[engine] * 1000:>10.1f}"
+                      f"{n_spikes / elapsed:>14,.0f}{speedup:>8.1f}x")
+
+def benchmark_oscillation_signals(n_trials=500, trial_durations=(2.0, 10.0), dt=0.001, seed=0):
+    """Per-trial cost of the oscillatory signals: direct np.sin vs the cached sinusoid basis"""
+
+    print(f"\nOscillation and Synchrony Signals ({n_trials} trials):")
+    print("-" * 70)
+    print(f"  {'Duration (s)':<14}{'Signal':<12}{'Direct (us)':>12}{'Basis (us)':>12}"
+          f"{'Speedup':>9}{'Max err':>11}")
+
+    rng = np.random.default_rng(seed)
+    beta_frequencies = BETA_MIXTURE_RATIOS * 20.0
+    for trial_duration in trial_durations:
+        t = np.arange(0, trial_duration, dt)
+        n_bins = len(t)
+        phases = rng.uniform(0, 2*np.pi, (n_trials, len(SYNCHRONY_FREQUENCIES)))
+
+        # (direct evaluation, cached basis) of each signal, given one trial's random phases
+        signals = {
+            'beta': (
+                lambda trial_phases: sum(weight * np.sin(2 * np.pi * freq * t) for freq, weight
+                                         in zip(beta_frequencies, BETA_MIXTURE_WEIGHTS)),
+                lambda trial_phases: sine_mixture(dt, n_bins, beta_frequencies, BETA_MIXTURE_WEIGHTS)
+            ),
+            'synchrony': (
+                lambda trial_phases: sum(weight * np.sin(2 * np.pi * freq * t + phase) for freq, weight, phase
+                                         in zip(SYNCHRONY_FREQUENCIES, SYNCHRONY_WEIGHTS, trial_phases)),
+                lambda trial_phases: sine_mixture(dt, n_bins, SYNCHRONY_FREQUENCIES, SYNCHRONY_WEIGHTS,
+                                                  trial_phases)
+            ),
+            '8Hz phase': (
+                lambda trial_phases: np.sin(2 * np.pi * 8 * t + trial_phases[0]),
+                lambda trial_phases: shifted_sine(dt, n_bins, 8.0, trial_phases[0])
+            ),
+        }
+
+        for name, (direct, cached) in signals.items():
+            cached(phases[0])  # Tables are filled once, by the first trial of a dataset
+            elapsed = []
+            for build in (direct, cached):
+                start_time = time.perf_counter()
+                for trial_phases in phases:
+                    build(trial_phases)
+                elapsed.append((time.perf_counter() - start_time) / n_trials * 1e6)
+            max_error = max(np.abs(direct(trial_phases) - cached(trial_phases)).max()
+                            for trial_phases in phases[:10])
+            print(f"  {trial_duration:<14.0f}{name:<12}{elapsed[0]:>12.1f}{elapsed[1]:>12.1f}"
+                  f"{elapsed[0] / elapsed[1]:>8.1f}x{max_error:>11.1e}")
+
+def benchmark_parallel_generation(n_trials_per_class=100, worker_counts=(1, 2, 4), seed=0):
+    """Build time of the decoder training set for several worker counts"""
+    from decoding_analysis import OptimizedMultiClassDecoder
+
+    print(f"\nParallel Training Set Generation ({n_trials_per_class} trials/class, "
+          f"{os.cpu_count()} cores available):")
+    print("-" * 70)
+    print(f"  {'Workers':<10}{'Time (s)':>10}{'Trials/s':>12}{'Speedup':>9}  Identical")
+
+    decoder = OptimizedMultiClassDecoder(random_state=42)
+    reference = None
+    for n_jobs in worker_counts:
+        start_time = time.perf_counter()
+        X, y = decoder.generate_training_data(n_trials_per_class, verbose=False,
+                                              n_jobs=n_jobs, seed=seed)
+        elapsed = time.perf_counter() - start_time
+
+        if reference is None:
+            reference = (X, elapsed)
+        identical = np.array_equal(X, reference[0])
+        print(f"  {n_jobs:<10}{elapsed:>10.2f}{len(X) / elapsed:>12.1f}"
+              f"{reference[1] / elapsed:>8.1f}x  {identical}")
+
+def benchmark_streaming_generation(trial_counts=(100, 400, 1600), n_neurons=100, chunk_size=50):
+    """Peak traced memory of whole-dataset vs streamed generation as trial count grows"""
+
+    print(f"\nStreaming Generation Memory ({n_neurons} neurons, chunks of {chunk_size} trials):")
+    print("-" * 70)
+    print(f"  {'Trials':<10}{'Mode':<12}{'Peak (MB)':>10}{'Time (s)':>10}{'Mean rate':>11}")
+
+    generator = NeuralPatternGenerator(n_neurons=n_neurons, trial_duration=2.0)
+    for n_trials in trial_counts:
+        params = {'n_stimuli': 10, 'n_trials_per_stimulus': n_trials // 10,
+                  'pathological_bursting': 0.2, 'rng': 0}
+
+        def whole_dataset():
+            data = generator.generate_synthetic_spikes(**params)
+            return data['spike_trains'].counts.mean()
+
+        def streamed():
+            # Running mean over chunks: only the current chunk is alive
+            total, n = 0.0, 0
+            for chunk in generator.iter_synthetic_spikes(chunk_size=chunk_size, **params):
+                counts = chunk['spike_trains'].counts
+                total += counts.sum()
+                n += counts.size
+            return total / n
+
+        for mode, run in (('in-memory', whole_dataset), ('streamed', streamed)):
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            mean_count = run()
+            elapsed = time.perf_counter() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"  {n_trials:<10}{mode:<12}{peak / 1e6:>10.1f}{elapsed:>10.2f}"
+                  f"{mean_count / generator.trial_duration:>10.2f}Hz")
+
+def benchmark_feature_matrix(trial_counts=(100, 2000), n_neurons=50, seed=0):
+    """Decoder features one trial per call vs one batched call over all trials"""
+    from decoding_analysis import OptimizedMultiClassDecoder
+
+    print(f"\nDecoder Feature Extraction ({n_neurons} neurons):")
+    print("-" * 70)
+    print(f"  {'Trials':<10}{'Per-trial (s)':>15}{'Batch (s)':>12}{'Trials/s':>12}{'Speedup':>9}")
+
+    decoder = OptimizedMultiClassDecoder(random_state=seed)
+    generator = NeuralPatternGenerator(n_neurons=n_neurons, trial_duration=2.0)
+    for n_trials in trial_counts:
+        data = generator.generate_synthetic_spikes(n_stimuli=10, n_trials_per_stimulus=n_trials // 10,
+                                                   pathological_bursting=0.3, rng=seed)
+        samples = [{'spike_trains': data['spike_trains'][i:i + 1], 'stimulus_times': [stimulus_time]}
+                   for i, stimulus_time in enumerate(data['stimulus_times'])]
+
+        start_time = time.perf_counter()
+        per_trial = np.array([decoder.extract_optimized_features(sample) for sample in samples])
+        loop_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        X = decoder.extract_feature_matrix(data['spike_trains'], 2.0, data['stimulus_times'])
+        batch_time = time.perf_counter() - start_time
+
+        assert np.allclose(per_trial, X)
+        print(f"  {n_trials:<10}{loop_time:>15.2f}{batch_time:>12.3f}{n_trials / batch_time:>12,.0f}"
+              f"{loop_time / batch_time:>8.1f}x")
+
+def _loop_train_statistics(spike_trains, trial_duration):
+    """Per-neuron CV, LV, Fano factor and ISI entropy with the former per-train loops"""
+    cv, lv, fano, entropy = [], [], [], []
+    for trial_spikes in spike_trains:
+        for spikes in trial_spikes:
+            isis = np.diff(spikes)
+            cv.append(np.std(isis) / np.mean(isis) if len(isis) > 1 else np.nan)
+            pairs = [3 * (isi1 - isi2)**2 / (isi1 + isi2)**2
+                     for isi1, isi2 in zip(isis[:-1], isis[1:]) if isi1 + isi2 > 0]
+            lv.append(np.mean(pairs) if pairs else np.nan)
+            counts = [np.sum((spikes >= w * 0.1) & (spikes < (w + 1) * 0.1))
+                      for w in range(int(trial_duration / 0.1))]
+            fano.append(np.var(counts) / np.mean(counts) if np.mean(counts) > 0 else np.nan)
+            if len(isis):
+                hist, _ = np.histogram(isis, bins=10)
+                prob = hist / np.sum(hist) + 1e-10
+                prob /= prob.sum()
+                entropy.append(-np.sum(prob * np.log(prob)))
+            else:
+                entropy.append(np.nan)
+    return [np.array(values) for values in (cv, lv, fano, entropy)]
+
+def benchmark_train_statistics(trial_counts=(20, 200), n_neurons=50, trial_duration=2.0, seed=0):
+    """Per-neuron ISI statistics: per-train loops vs segment-reduction kernels"""
+    from spike_statistics import fano_factor, isi_cv, isi_entropy, local_variation, window_counts
+
+    print(f"\nPer-Neuron Train Statistics ({n_neurons} neurons, CV/LV/Fano/ISI entropy):")
+    print("-" * 70)
+    print(f"  {'Trials':<10}{'Trains':>10}{'Loop (s)':>12}{'Kernels (s)':>13}{'Speedup':>9}  Identical")
+
+    generator = NeuralPatternGenerator(n_neurons=n_neurons, trial_duration=trial_duration)
+    for n_trials in trial_counts:
+        spike_trains = generator.generate_synthetic_spikes(
+            n_stimuli=10, n_trials_per_stimulus=n_trials // 10, pathological_bursting=0.3, rng=seed
+        )['spike_trains']
+
+        start_time = time.perf_counter()
+        reference = _loop_train_statistics(spike_trains, trial_duration)
+        loop_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        kernels = [isi_cv(spike_trains), local_variation(spike_trains),
+                   fano_factor(window_counts(spike_trains, 0.1, trial_duration)), isi_entropy(spike_trains)]
+        kernel_time = time.perf_counter() - start_time
+
+        identical = all(np.allclose(ref, values.ravel(), equal_nan=True)
+                        for ref, values in zip(reference, kernels))
+        print(f"  {n_trials:<10}{n_trials * n_neurons:>10,}{loop_time:>12.2f}{kernel_time:>13.3f}"
+              f"{loop_time / kernel_time:>8.0f}x  {identical}")
+
+def benchmark_spectral_engine(trial_counts=(100, 10_000), n_samples=200, seed=0):
+    """Welch band features and Hilbert phase locking: per-trial scipy calls vs the batched engine"""
+    from scipy import signal
+    from spectral_engine import FREQUENCY_BANDS, band_powers, peak_frequencies, phase_consistency, welch_psd
+
+    print(f"\nSpectral Engine (population activity of {n_samples} samples per trial):")
+    print("-" * 70)
+    print(f"  {'Trials':<10}{'Loop (trials/s)':>17}{'Batched (trials/s)':>20}{'Speedup':>9}  Identical")
+
+    rng = np.random.default_rng(seed)
+    fs, nperseg = 1000, min(128, n_samples // 4)
+    bands = tuple(FREQUENCY_BANDS.values())
+    for n_trials in trial_counts:
+        pop_activities = rng.poisson(5.0, (n_trials, n_samples)).astype(float)
+
+        start_time = time.perf_counter()
+        loop_powers, loop_plv = [], []
+        for pop_activity in pop_activities:
+            freqs, psd = signal.welch(pop_activity, fs=fs, nperseg=nperseg)
+            loop_powers.append([np.trapz(psd[(freqs >= low) & (freqs <= high)],
+                                         freqs[(freqs >= low) & (freqs <= high)]) for low, high in bands])
+            loop_plv.append(np.abs(np.mean(np.exp(1j * np.angle(signal.hilbert(pop_activity))))))
+        loop_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        _, psds = welch_psd(pop_activities, fs, nperseg)
+        powers = band_powers(psds, fs, nperseg, bands)
+        peak_frequencies(psds, fs, nperseg, bands)
+        plv = phase_consistency(pop_activities)
+        batch_time = time.perf_counter() - start_time
+
+        identical = np.allclose(loop_powers, powers) and np.allclose(loop_plv, plv)
+        print(f"  {n_trials:<10,}{n_trials / loop_time:>17,.0f}{n_trials / batch_time:>20,.0f}"
+              f"{loop_time / batch_time:>8.1f}x  {identical}")
+
+def benchmark_pairwise_correlation(population_sizes=(500, 2000, 5000), n_bins=200, rate=0.3,
+                                   max_dense_neurons=2000, seed=0):
+    """Correlation summary statistics: dense np.corrcoef vs the tiled sparse engine (peak memory)"""
+    from correlation_engine import PairwiseCorrelationStats
+
+    print(f"\nPairwise Correlation ({n_bins} bins per train):")
+    print("-" * 70)
+    print(f"  {'Neurons':<10}{'Dense (MB)':>11}{'Dense (s)':>10}{'Sparse (MB)':>12}{'Sparse (s)':>11}  Identical")
+
+    rng = np.random.default_rng(seed)
+    for n_neurons in population_sizes:
+        binned = rng.poisson(rate, (n_neurons, n_bins))
+        dense = None
+        if n_neurons <= max_dense_neurons:
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            correlations = np.corrcoef(binned)[np.triu_indices(n_neurons, k=1)]
+            correlations = correlations[~np.isnan(correlations)]
+            dense = (correlations.mean(), correlations.max(), correlations.var())
+            dense_time = time.perf_counter() - start_time
+            _, dense_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        correlation_stats = PairwiseCorrelationStats().update(binned)
+        sparse_time = time.perf_counter() - start_time
+        _, sparse_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if dense is None:
+            print(f"  {n_neurons:<10,}{'-':>11}{'-':>10}{sparse_peak / 1e6:>12.1f}{sparse_time:>11.2f}  -")
+        else:
+            identical = np.allclose(dense, (correlation_stats.mean, correlation_stats.max,
+                                            correlation_stats.variance))
+            print(f"  {n_neurons:<10,}{dense_peak / 1e6:>11.1f}{dense_time:>10.2f}"
+                  f"{sparse_peak / 1e6:>12.1f}{sparse_time:>11.2f}  {identical}")
+
+def benchmark_decoder_correlation(population_sizes=(50, 200, 800), n_trials=50, max_pairs=2000, seed=0):
+    """Decoder cross_correlation feature: all neuron pairs vs the stratified pair sample"""
+    from correlation_engine import stratified_pairs
+    from feature_matrix import mean_pair_correlations
+
+    print(f"\nDecoder Pair Correlations ({n_trials} trials, samples of {max_pairs:,} pairs):")
+    print("-" * 70)
+    print(f"  {'Neurons':<10}{'All pairs':>11}{'All (s)':>9}{'Sampled (s)':>13}{'Max abs diff':>14}")
+
+    edges = np.arange(0, 2.0 + 0.005, 0.005)
+    for n_neurons in population_sizes:
+        generator = NeuralPatternGenerator(n_neurons=n_neurons, trial_duration=2.0)
+        spike_trains = generator.generate_synthetic_spikes(n_stimuli=1, n_trials_per_stimulus=n_trials,
+                                                           population_synchrony=0.5,
+                                                           rng=seed)['spike_trains'].compact()
+
+        start_time = time.perf_counter()
+        exact = mean_pair_correlations(spike_trains, edges)
+        exact_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        sampled = mean_pair_correlations(spike_trains, edges, stratified_pairs(n_neurons, max_pairs, seed))
+        sampled_time = time.perf_counter() - start_time
+
+        print(f"  {n_neurons:<10}{n_neurons * (n_neurons - 1) // 2:>11,}{exact_time:>9.2f}"
+              f"{sampled_time:>13.2f}{np.abs(exact - sampled).max():>14.4f}")
+
+def _binned_correlogram(trials, unit1_id, unit2_id, max_lag, bin_size, duration):
+    """Correlogram from full cross-correlation of binned trials, one trial at a time"""
+    n_side = int(round(max_lag / bin_size))
+    edges = np.arange(int(round(duration / bin_size)) + 1) * bin_size
+    total = np.zeros(2 * n_side + 1)
+    for trial_idx in range(len(trials)):
+        first = np.histogram(trials.spikes.neuron(trial_idx, trials.column(unit1_id)), edges)[0]
+        second = np.histogram(trials.spikes.neuron(trial_idx, trials.column(unit2_id)), edges)[0]
+        full = np.correlate(second, first, mode='full')
+        center = len(first) - 1
+        total += full[center - n_side:center + n_side + 1]
+    return total
+
+def benchmark_correlograms(n_trials=100, n_units=20, rate=20.0, duration=5.0, max_lag=0.05,
+                           bin_size=0.001, seed=0):
+    """Cross-correlograms: binned whole-trial correlation vs spike-time lag windows"""
+    from correlogram import all_pair_correlograms, jitter_correlogram, unit_correlogram
+    from spike_train_set import TrialData
+
+    print(f"\nCorrelograms ({n_trials} trials x {duration:.0f}s, {n_units} units at {rate:.0f}Hz):")
+    print("-" * 70)
+
+    rng = np.random.default_rng(seed)
+    trials = TrialData.from_trials([
+        {'event_label': 'ON', 'pre_time': 0.0, 'post_time': duration,
+         'units': [{'unit_id': unit_id, 'spike_times': rng.uniform(0, duration, rng.poisson(rate * duration))}
+                   for unit_id in range(n_units)]}
+        for _ in range(n_trials)
+    ])
+
+    start_time = time.perf_counter()
+    binned = _binned_correlogram(trials, 0, 1, max_lag, bin_size, duration)
+    binned_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    _, counts = unit_correlogram(trials, 0, 1, max_lag, bin_size)
+    lag_time = time.perf_counter() - start_time
+    print(f"  One pair, binned trials:      {binned_time:8.3f}s")
+    print(f"  One pair, lag windows:        {lag_time:8.3f}s  ({binned_time / lag_time:.0f}x, "
+          f"{int(counts.sum()):,} vs {int(binned.sum()):,} binned pairs)")
+
+    start_time = time.perf_counter()
+    all_pair_correlograms(trials, max_lag=max_lag, bin_size=bin_size)
+    batch_time = time.perf_counter() - start_time
+    print(f"  All {n_units * n_units} ordered pairs, batched: {batch_time:8.3f}s")
+
+    start_time = time.perf_counter()
+    jitter_correlogram(trials, 0, 1, max_lag, bin_size, n_surrogates=100, rng=seed)
+    jitter_time = time.perf_counter() - start_time
+    print(f"  Jitter baseline (100 surr.):  {jitter_time:8.3f}s")
+
+def benchmark_neuron_features(trial_counts=(50, 500), n_neurons=100, seed=0):
+    """Per-neuron feature matrix: extraction, memory-mapped storage and population reductions"""
+    from spike_analyzer import EnhancedSpikeAnalyzer
+    from neuron_features import open_neuron_features, population_summary
+
+    print(f"\nPer-Neuron Feature Matrices ({n_neurons} neurons):")
+    print("-" * 70)
+    print(f"  {'Trials':<10}{'Families (s)':>13}{'Matrix (s)':>12}{'To .npy (s)':>13}{'Summary (ms)':>14}{'MB':>7}")
+
+    analyzer = EnhancedSpikeAnalyzer()
+    families = ('rate_features', 'temporal_features', 'burst_features', 'regularity_features')
+    generator = NeuralPatternGenerator(n_neurons=n_neurons, trial_duration=2.0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_trials in trial_counts:
+            data = generator.generate_synthetic_spikes(n_stimuli=10, n_trials_per_stimulus=n_trials // 10,
+                                                       pathological_bursting=0.3, rng=seed)
+
+            start_time = time.perf_counter()
+            analyzer.analyze_spike_data(data, families)
+            family_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            matrix = analyzer.extract_neuron_features(data)
+            matrix_time = time.perf_counter() - start_time
+
+            path = Path(tmp_dir) / f"neurons_{n_trials}.npy"
+            start_time = time.perf_counter()
+            analyzer.extract_neuron_features(data, path)
+            stored_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            population_summary(open_neuron_features(path))
+            summary_time = time.perf_counter() - start_time
+
+            print(f"  {n_trials:<10}{family_time:>13.3f}{matrix_time:>12.3f}{stored_time:>13.3f}"
+                  f"{summary_time * 1000:>14.2f}{matrix.nbytes / 1e6:>7.2f}")
+
+def benchmark_csv_ingestion(n_rows=2_000_000, n_units=50, chunk_rows=250_000, seed=0):
+    """Whole-file pandas read vs chunked CSV ingestion (throughput and peak memory)"""
+    import pandas as pd
+
+    print(f"\nCSV Ingestion ({n_rows:,} rows, blocks of {chunk_rows:,}):")
+    print("-" * 70)
+    print(f"  {'Reader':<22}{'Peak (MB)':>10}{'Time (s)':>10}{'Rows/s':>14}")
+
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "spikes.csv"
+        pd.DataFrame({'spike_times': np.sort(rng.uniform(0, n_rows / 1000, n_rows)),
+                      'unit_ids': rng.integers(0, n_units, n_rows)}).to_csv(csv_path, index=False)
+
+        readers = {
+            'pandas (whole file)': lambda: len(pd.read_csv(csv_path, float_precision='round_trip')),
+            'read_spike_csv': lambda: len(read_spike_csv(csv_path, chunk_rows)['spike_times']),
+            'csv_to_recording': lambda: len(open_recording(csv_to_recording(
+                csv_path, Path(tmp_dir) / "spikes", chunk_rows, verbose=False))['spike_times']),
+        }
+        for name, read in readers.items():
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            n_read = read()
+            elapsed = time.perf_counter() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"  {name:<22}{peak / 1e6:>10.1f}{elapsed:>10.2f}{n_read / elapsed:>14,.0f}")
+
+def benchmark_time_encoding(n_spikes=2_000_000, n_units=50, duration=3600.0, sampling_rate=30000, seed=0):
+    """On-disk size and load time of float64 vs tick-encoded spike times"""
+    import pandas as pd
+
+    print(f"\nSpike Time Encoding ({n_spikes:,} spikes, {n_units} units, {sampling_rate} Hz):")
+    print("-" * 70)
+    print(f"  {'Format':<16}{'Size (MB)':>10}{'Load (s)':>10}{'Max error (us)':>16}")
+
+    rng = np.random.default_rng(seed)
+    ticks = np.sort(rng.integers(0, int(duration * sampling_rate), n_spikes))
+    data = {'spike_times': ticks / sampling_rate,
+            'unit_ids': rng.integers(0, n_units, n_spikes),
+            'event_times': np.arange(0.0, duration, 6.0),
+            'metadata': {'sampling_rate': sampling_rate}}
+    data['event_labels'] = np.where(np.arange(len(data['event_times'])) % 2, 'ON', 'OFF')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "spikes.csv"
+        pd.DataFrame({name: data[name] for name in ('spike_times', 'unit_ids')}).to_csv(csv_path, index=False)
+        formats = {'csv': (csv_path, lambda: read_spike_csv(csv_path))}
+        for encoding in (None, 'ticks', 'delta-varint'):
+            path = write_recording(data, Path(tmp_dir) / f"rec_{encoding}", time_encoding=encoding)
+            formats[encoding or 'float64'] = (path, lambda path=path: open_recording(path, mmap_mode=None))
+
+        for name, (path, load) in formats.items():
+            files = path.iterdir() if path.is_dir() else [path]
+            size = sum(f.stat().st_size for f in files)
+            start_time = time.perf_counter()
+            recording = load()
+            elapsed = time.perf_counter() - start_time
+            error = np.max(np.abs(np.sort(recording['spike_times']) - data['spike_times']))
+            print(f"  {name:<16}{size / 1e6:>10.1f}{elapsed:>10.3f}{error * 1e6:>16.3f}")
+
+def benchmark_trial_slicing(spike_counts=(10_000_000, 100_000_000), n_units=100, n_events=100_000,
+                            rate=2.0, pre_time=1.0, post_time=3.0, seed=0):
+    """Event-aligned trial cutting: boolean mask scan vs SpikeDataLoader.create_trials"""
+
+    print(f"\nEvent-Aligned Trial Slicing ({n_units} units at {rate:.0f}Hz, {n_events:,} events):")
+    print("-" * 70)
+    print(f"  {'Spikes':<14}{'Mask scan (s)':>14}{'Trials (s)':>12}{'Peak (MB)':>11}{'Trial (us)':>12}"
+          f"{'Speedup':>9}")
+
+    rng = np.random.default_rng(seed)
+    for n_spikes in spike_counts:
+        duration = n_spikes / n_units / rate
+        spike_times = rng.uniform(0, duration, n_spikes)
+        spike_times.sort()
+        unit_ids = rng.integers(0, n_units, n_spikes, dtype=np.uint16)
+        event_times = np.sort(rng.uniform(pre_time, duration - post_time, n_events))
+        event_labels = np.where(np.arange(n_events) % 2, 'ON', 'OFF')
+
+        # Naive cut of a few events, extrapolated: every trial scans the whole recording
+        n_sampled = 10
+        start_time = time.perf_counter()
+        for event_time in event_times[:n_sampled]:
+            in_window = (spike_times >= event_time - pre_time) & (spike_times < event_time + post_time)
+            window_units = unit_ids[in_window]
+            _ = [spike_times[in_window][window_units == unit_id] for unit_id in range(n_units)]
+        mask_time = (time.perf_counter() - start_time) * n_events / n_sampled
+
+        # Whole public path: index, aligned table and the TrialData view
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        trials = SpikeDataLoader(pre_time, post_time).create_trials(spike_times, unit_ids, event_times,
+                                                                     event_labels)
+        trial_time = time.perf_counter() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Building one trial dict on access
+        start_time = time.perf_counter()
+        for trial_idx in range(0, n_events, n_events // 100):
+            trials[trial_idx]['units'][0]['spike_times']
+        access_time = (time.perf_counter() - start_time) / 100
+
+        print(f"  {n_spikes:<14,}{mask_time:>14.1f}{trial_time:>12.2f}{peak / 1e6:>11.0f}"
+              f"{access_time * 1e6:>12.0f}{mask_time / trial_time:>8.0f}x")
+        del trials, spike_times, unit_ids
+
+def benchmark_continuous_recording(durations=(300.0, 1200.0), n_neurons=50, block_duration=10.0):
+    """Peak traced memory of block-streamed continuous recordings as duration grows"""
+    print(f"\nContinuous Recording ({n_neurons} neurons, blocks of {block_duration:.0f}s):")
+    print("-" * 70)
+    print(f"  {'Duration (s)':<14}{'Spikes':>12}{'Peak (MB)':>11}{'Time (s)':>10}{'Mean rate':>11}")
+
+    generator = NeuralPatternGenerator(n_neurons=n_neurons, trial_duration=2.0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for duration in durations:
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            path = generator.generate_continuous_recording(Path(tmp_dir) / "recording", duration,
+                                                           block_duration=block_duration,
+                                                           pathological_bursting=0.2, rng=0)
+            elapsed = time.perf_counter() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            n_spikes = len(open_recording(path)['spike_times'])
+            print(f"  {duration:<14.0f}{n_spikes:>12,}{peak / 1e6:>11.1f}{elapsed:>10.2f}"
+                  f"{n_spikes / n_neurons / duration:>9.2f}Hz")
+
+if __name__ == "__main__":
+    print("PERFORMANCE BENCHMARKS")
+    print("=" * 70)
+
+    benchmark_spike_engine()
+    benchmark_population_generation()
+    benchmark_oscillation_signals()
+    benchmark_parallel_generation()
+    benchmark_streaming_generation()
+    benchmark_continuous_recording()
+    benchmark_feature_matrix()
+    benchmark_train_statistics()
+    benchmark_spectral_engine()
+    benchmark_pairwise_correlation()
+    benchmark_decoder_correlation()
+    benchmark_correlograms()
+    benchmark_neuron_features()
+    benchmark_csv_ingestion()
+    benchmark_time_encoding()
+    benchmark_trial_slicing()
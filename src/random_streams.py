@@ -0,0 +1,43 @@
+"""
+Random Streams
+==============
+
+Construction of np.random.Generator instances for the simulators.
+
+Every generation routine takes an explicit `rng` instead of using the legacy
+global np.random state, so concurrent callers (threads, Streamlit sessions,
+worker processes) each own an independent stream and never interfere.
+"""
+
+import numpy as np
+
+# Bit generators accepted by make_rng
+BIT_GENERATORS = {
+    'pcg64': np.random.PCG64,
+    'pcg64dxsm': np.random.PCG64DXSM,
+    'philox': np.random.Philox,
+}
+
+
+def make_rng(rng=None, bit_generator='pcg64'):
+    """
+    Return a np.random.Generator.
+
+    Parameters:
+    -----------
+    rng : np.random.Generator, int, np.random.SeedSequence or None
+        An existing Generator is returned unchanged; anything else seeds a new
+        one (None: fresh OS entropy)
+    bit_generator : str
+        'pcg64' (default), 'pcg64dxsm' or 'philox'
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if bit_generator not in BIT_GENERATORS:
+        raise ValueError(f"Unknown bit generator: {bit_generator}")
+    return np.random.Generator(BIT_GENERATORS[bit_generator](rng))
+
+
+def spawn_rngs(rng, n_streams, bit_generator='pcg64'):
+    """Independent Generators, e.g. one per thread, derived from `rng`"""
+    return make_rng(rng, bit_generator).spawn(n_streams)
@@ -0,0 +1,65 @@
+"""
+Sinusoid Basis
+==============
+
+Cached sine/cosine tables for building oscillatory signals on a fixed time grid.
+
+All trials of a generator share the same time bins, so sin(2πft) and cos(2πft)
+only need evaluating once per (dt, n_bins, frequency). A sinusoid with any
+phase is then a rotation of the cached pair,
+
+    sin(2πft + φ) = sin(2πft)·cos φ + cos(2πft)·sin φ,
+
+and a weighted mixture of several frequencies is one matrix-vector product
+with the stacked tables, instead of fresh transcendental evaluations per trial.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+
+@lru_cache(maxsize=128)
+def sinusoid_table(dt, n_bins, frequency):
+    """Read-only (2, n_bins) array: sin and cos of 2πft at t = 0, dt, 2dt, ..."""
+    angle = 2 * np.pi * frequency * (np.arange(n_bins) * dt)
+    table = np.vstack([np.sin(angle), np.cos(angle)])
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=32)
+def sinusoid_basis(dt, n_bins, frequencies):
+    """Read-only (2 * len(frequencies), n_bins) stack of sinusoid_table rows"""
+    basis = np.vstack([sinusoid_table(dt, n_bins, frequency) for frequency in frequencies])
+    basis.flags.writeable = False
+    return basis
+
+
+def rotation_coefficients(weights, phases):
+    """Coefficients of weighted, phase-shifted sinusoids in a sinusoid_basis"""
+    weights = np.asarray(weights, dtype=float)
+    phases = np.broadcast_to(np.asarray(phases, dtype=float), weights.shape)
+    return np.column_stack([weights * np.cos(phases), weights * np.sin(phases)]).ravel()
+
+
+def sine_mixture(dt, n_bins, frequencies, weights, phases=0.0):
+    """
+    sum_k weights[k] * sin(2π frequencies[k] t + phases[k]) on the time grid
+
+    Parameters:
+    -----------
+    dt : float
+        Bin width (s); the grid is t = 0, dt, ..., (n_bins - 1) * dt
+    n_bins : int
+    frequencies, weights : sequences of equal length
+    phases : float or sequence
+        Phase of each component (rad), shared if a scalar
+    """
+    frequencies = tuple(float(frequency) for frequency in frequencies)
+    basis = sinusoid_basis(float(dt), int(n_bins), frequencies)
+    return rotation_coefficients(weights, phases) @ basis
+
+
+def shifted_sine(dt, n_bins, frequency, phase=0.0):
+    """sin(2πft + phase) on the time grid, from the cached table"""
+    return sine_mixture(dt, n_bins, (frequency,), (1.0,), phase)
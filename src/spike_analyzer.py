@@ -1,9 +1,34 @@
 import numpy as np
-from scipy import signal, stats
+from scipy import stats
 from scipy.spatial.distance import pdist, squareform
 import warnings
 warnings.filterwarnings('ignore')
 
+from burst_detection import detect_bursts, interburst_intervals
+from correlation_engine import PairwiseCorrelationStats
+from neuron_features import neuron_feature_matrix
+from spectral_engine import (FREQUENCY_BANDS, band_powers, peak_frequencies, phase_consistency,
+                             spectral_entropy, welch_psd)
+from spike_statistics import fano_factor, isi_cv, isi_entropy, local_variation, segment_means
+from spike_train_set import BinnedCounts, as_spike_train_set, as_trial_spikes
+
+# Feature families of analyze_spike_data: the method computing each and the
+# families it is built from (passed to it as keyword arguments)
+FEATURE_EXTRACTORS = {
+    'quality_metrics': 'calculate_quality_metrics',
+    'rate_features': 'extract_rate_features',
+    'temporal_features': 'extract_temporal_features',
+    'spectral_features': 'extract_spectral_features',
+    'synchrony_features': 'extract_synchrony_features',
+    'burst_features': 'extract_burst_features',
+    'regularity_features': 'extract_regularity_features',
+    'pathology_features': 'extract_pathology_features',
+}
+FEATURE_DEPENDENCIES = {
+    'pathology_features': ('spectral_features', 'synchrony_features',
+                           'burst_features', 'regularity_features'),
+}
+
 class EnhancedSpikeAnalyzer:
     """Enhanced spike train analyzer with pathological pattern feature extraction"""
     
@@ -11,60 +36,86 @@ class EnhancedSpikeAnalyzer:
         self.trial_duration = trial_duration
         self.dt = dt
         self.time_bins = np.arange(0, trial_duration, dt)
-        
-    def analyze_spike_data(self, spike_data):
-        """Comprehensive analysis of spike data with pathological features"""
-        
-        results = {
-            'quality_metrics': self.calculate_quality_metrics(spike_data),
-            'rate_features': self.extract_rate_features(spike_data),
-            'temporal_features': self.extract_temporal_features(spike_data),
-            'spectral_features': self.extract_spectral_features(spike_data),
-            'synchrony_features': self.extract_synchrony_features(spike_data),
-            'burst_features': self.extract_burst_features(spike_data),
-            'regularity_features': self.extract_regularity_features(spike_data),
-            'pathology_features': self.extract_pathology_features(spike_data)
-        }
-        
+        self._binned = None
+        
+    def analyze_spike_data(self, spike_data, features=None):
+        """
+        Comprehensive analysis of spike data with pathological features
+        
+        Parameters:
+        -----------
+        spike_data : dict
+        features : iterable of str or None
+            Feature families to return ('spectral_features', ...) or single
+            features as 'family.feature' ('spectral_features.beta_ratio').
+            None returns every family of FEATURE_EXTRACTORS.
+        
+        Returns:
+        --------
+        dict : family -> {feature: value}, holding only what was requested.
+            Each family, including those only needed as a dependency, is
+            computed once per call.
+        """
+        
+        requested = {}
+        for name in FEATURE_EXTRACTORS if features is None else features:
+            family, _, feature = name.partition('.')
+            if family not in FEATURE_EXTRACTORS:
+                raise ValueError(f"Unknown feature family: {family}")
+            if not feature:
+                requested[family] = None
+            elif requested.get(family, ()) is not None:
+                requested.setdefault(family, []).append(feature)
+        
+        # Binned counts are shared by the families of this call only
+        computed = {}
+        previous, self._binned = self._binned, {}
+        try:
+            for family in requested:
+                self._compute_family(spike_data, family, computed)
+        finally:
+            self._binned = previous
+        
+        results = {}
+        for family, family_features in requested.items():
+            values = computed[family]
+            results[family] = values if family_features is None else \
+                {feature: values[feature] for feature in family_features}
         return results
     
+    def _compute_family(self, spike_data, family, computed):
+        """Compute a feature family after its dependencies, memoized in `computed`"""
+        if family not in computed:
+            dependencies = {dependency: self._compute_family(spike_data, dependency, computed)
+                            for dependency in FEATURE_DEPENDENCIES.get(family, ())}
+            computed[family] = getattr(self, FEATURE_EXTRACTORS[family])(spike_data, **dependencies)
+        return computed[family]
+    
     def calculate_quality_metrics(self, spike_data):
         """Calculate data quality metrics (existing functionality)"""
         
+        spike_trains = as_spike_train_set(spike_data['spike_trains'])
+        
         metrics = {
-            'n_trials': len(spike_data['spike_trains']),
-            'n_neurons': len(spike_data['spike_trains'][0]) if spike_data['spike_trains'] else 0,
+            'n_trials': spike_trains.n_trials,
+            'n_neurons': spike_trains.n_neurons if spike_trains.n_trials else 0,
             'mean_firing_rate': 0,
             'refractory_violations': 0,
             'empty_neurons': 0
         }
         
-        if not spike_data['spike_trains']:
+        if not spike_trains.n_trials:
             return metrics
         
-        all_rates = []
-        refractory_violations = 0
-        empty_neurons = 0
-        
-        for trial_spikes in spike_data['spike_trains']:
-            for neuron_spikes in trial_spikes:
-                if len(neuron_spikes) == 0:
-                    empty_neurons += 1
-                    continue
-                
-                # Firing rate
-                rate = len(neuron_spikes) / self.trial_duration
-                all_rates.append(rate)
-                
-                # Refractory period violations (< 2ms)
-                if len(neuron_spikes) > 1:
-                    isis = np.diff(neuron_spikes)
-                    violations = np.sum(isis < 0.002)
-                    refractory_violations += violations
-        
-        metrics['mean_firing_rate'] = np.mean(all_rates) if all_rates else 0
-        metrics['refractory_violations'] = refractory_violations
-        metrics['empty_neurons'] = empty_neurons
+        counts = spike_trains.counts
+        active_counts = counts[counts > 0]
+        
+        # Refractory period violations (< 2ms)
+        isis, _ = spike_trains.isis()
+        
+        metrics['mean_firing_rate'] = np.mean(active_counts / self.trial_duration) if len(active_counts) else 0
+        metrics['refractory_violations'] = int(np.sum(isis < 0.002))
+        metrics['empty_neurons'] = int(np.sum(counts == 0))
         
         return metrics
     
@@ -74,15 +125,7 @@ class EnhancedSpikeAnalyzer:
         features = {}
         
         # Calculate firing rates for each trial and stimulus
-        firing_rates = []
-        for trial_idx, trial_spikes in enumerate(spike_data['spike_trains']):
-            trial_rates = []
-            for neuron_spikes in trial_spikes:
-                rate = len(neuron_spikes) / self.trial_duration
-                trial_rates.append(rate)
-            firing_rates.append(trial_rates)
-        
-        firing_rates = np.array(firing_rates)
+        firing_rates = as_spike_train_set(spike_data['spike_trains']).counts / self.trial_duration
         
         # Basic rate features
         features['mean_population_rate'] = np.mean(firing_rates)
@@ -116,57 +159,42 @@ class EnhancedSpikeAnalyzer:
         
         features = {}
         
-        # Spike timing precision
-        timing_precisions = []
-        for trial_spikes in spike_data['spike_trains']:
-            for neuron_spikes in trial_spikes:
-                if len(neuron_spikes) > 2:
-                    # Vector strength for temporal precision
-                    stim_times = spike_data.get('stimulus_times', [0.5])
-                    if stim_times:
-                        stim_time = stim_times[0] if isinstance(stim_times, list) else stim_times
-                        relative_times = neuron_spikes - stim_time
-                        post_stim_spikes = relative_times[(relative_times > 0) & (relative_times < 0.5)]
-                        
-                        if len(post_stim_spikes) > 2:
-                            # Phase consistency (assuming 8 Hz modulation)
-                            phases = 2 * np.pi * 8 * post_stim_spikes
-                            vector_strength = np.abs(np.mean(np.exp(1j * phases)))
-                            timing_precisions.append(vector_strength)
-        
-        features['mean_timing_precision'] = np.mean(timing_precisions) if timing_precisions else 0
-        features['timing_precision_std'] = np.std(timing_precisions) if timing_precisions else 0
-        
-        # Inter-spike interval statistics
-        all_isis = []
-        isi_cvs = []
-        for trial_spikes in spike_data['spike_trains']:
-            for neuron_spikes in trial_spikes:
-                if len(neuron_spikes) > 2:
-                    isis = np.diff(neuron_spikes)
-                    all_isis.extend(isis)
-                    
-                    if len(isis) > 1:
-                        cv = np.std(isis) / (np.mean(isis) + 1e-6)
-                        isi_cvs.append(cv)
-        
-        features['mean_isi'] = np.mean(all_isis) if all_isis else 0
-        features['isi_cv'] = np.mean(isi_cvs) if isi_cvs else 0
-        features['isi_entropy'] = stats.entropy(np.histogram(all_isis, bins=20)[0] + 1e-6) if all_isis else 0
-        
-        # Local variation (Shinomoto et al.)
-        lv_values = []
-        for trial_spikes in spike_data['spike_trains']:
-            for neuron_spikes in trial_spikes:
-                if len(neuron_spikes) > 3:
-                    isis = np.diff(neuron_spikes)
-                    if len(isis) > 2:
-                        lv = np.mean([3 * (isi1 - isi2)**2 / (isi1 + isi2)**2 
-                                    for isi1, isi2 in zip(isis[:-1], isis[1:]) 
-                                    if isi1 + isi2 > 0])
-                        lv_values.append(lv)
-        
-        features['local_variation'] = np.mean(lv_values) if lv_values else 0
+        spike_trains = as_spike_train_set(spike_data['spike_trains']).compact()
+        counts = spike_trains.counts.ravel()
+        n_trains = counts.size
+        
+        # Spike timing precision: vector strength of the spikes 0-500ms after
+        # the stimulus, for trains with more than 2 spikes (and 2 such spikes)
+        timing_precisions = np.empty(0)
+        stim_times = spike_data.get('stimulus_times', [0.5])
+        if stim_times:
+            stim_time = stim_times[0] if isinstance(stim_times, list) else stim_times
+            train_ids = spike_trains.train_ids()
+            relative_times = spike_trains.spike_times - stim_time
+            post_stim = (relative_times > 0) & (relative_times < 0.5) & (counts[train_ids] > 2)
+            # Phase consistency (assuming 8 Hz modulation)
+            phases = 2 * np.pi * 8 * relative_times[post_stim]
+            mean_cos, n_post = segment_means(np.cos(phases), train_ids[post_stim], n_trains)
+            mean_sin, _ = segment_means(np.sin(phases), train_ids[post_stim], n_trains)
+            timing_precisions = np.hypot(mean_cos, mean_sin)[n_post > 2]
+        
+        features['mean_timing_precision'] = np.mean(timing_precisions) if len(timing_precisions) else 0
+        features['timing_precision_std'] = np.std(timing_precisions) if len(timing_precisions) else 0
+        
+        # Inter-spike interval statistics of trains with more than 2 spikes
+        isis, isi_trains = spike_trains.isis()
+        all_isis = isis[counts[isi_trains] > 2]
+        isi_cvs = isi_cv(spike_trains, offset=1e-6).ravel()[counts > 2]
+        
+        features['mean_isi'] = np.mean(all_isis) if len(all_isis) else 0
+        features['isi_cv'] = np.mean(isi_cvs) if len(isi_cvs) else 0
+        features['isi_entropy'] = stats.entropy(np.histogram(all_isis, bins=20)[0] + 1e-6) if len(all_isis) else 0
+        
+        # Local variation (Shinomoto et al.) of trains with more than 3 spikes
+        lv_values = local_variation(spike_trains).ravel()
+        lv_values = lv_values[(counts > 3) & ~np.isnan(lv_values)]
+        
+        features['local_variation'] = np.mean(lv_values) if len(lv_values) else 0
         
         return features
     
@@ -176,40 +204,28 @@ class EnhancedSpikeAnalyzer:
         features = {}
         
         # Calculate population activity
-        pop_activities = []
-        for trial_spikes in spike_data['spike_trains']:
-            pop_activity = self._calculate_population_activity(trial_spikes)
-            pop_activities.append(pop_activity)
-        
-        # Average spectral analysis across trials
-        all_psds = []
-        freqs = None
-        
-        for pop_activity in pop_activities:
-            if len(pop_activity) > 20:
-                try:
-                    f, psd = signal.welch(pop_activity, fs=1000, nperseg=min(128, len(pop_activity)//4))
-                    freqs = f
-                    all_psds.append(psd)
-                except:
-                    continue
-        
-        if all_psds and freqs is not None:
-            mean_psd = np.mean(all_psds, axis=0)
+        pop_activities = self.binned_counts(spike_data).population(0.01).astype(float)
+        
+        # Average spectral analysis across trials: all trials in one Welch call
+        n_trials, n_samples = pop_activities.shape
+        if n_trials and n_samples > 20:
+            fs, nperseg = 1000, min(128, n_samples // 4)
+            freqs, psds = welch_psd(pop_activities, fs, nperseg)
+            mean_psd = psds.mean(axis=0)
             
             # Frequency band powers
-            features['delta_power'] = self._band_power(freqs, mean_psd, 1, 4)
-            features['theta_power'] = self._band_power(freqs, mean_psd, 4, 8)
-            features['alpha_power'] = self._band_power(freqs, mean_psd, 8, 13)
-            features['beta_power'] = self._band_power(freqs, mean_psd, 13, 30)
-            features['gamma_power'] = self._band_power(freqs, mean_psd, 30, 100)
+            bands = tuple(FREQUENCY_BANDS.values())
+            for band, power in zip(FREQUENCY_BANDS, band_powers(mean_psd, fs, nperseg, bands)):
+                features[f'{band}_power'] = power
             
             # Pathological frequency signatures
-            features['beta_peak_freq'] = self._find_peak_frequency(freqs, mean_psd, 13, 30)
-            features['gamma_peak_freq'] = self._find_peak_frequency(freqs, mean_psd, 30, 100)
+            beta_peak, gamma_peak = peak_frequencies(mean_psd, fs, nperseg,
+                                                     (FREQUENCY_BANDS['beta'], FREQUENCY_BANDS['gamma']))
+            features['beta_peak_freq'] = beta_peak
+            features['gamma_peak_freq'] = gamma_peak
             
             # Spectral entropy (measure of spectral complexity)
-            features['spectral_entropy'] = stats.entropy(mean_psd + 1e-10)
+            features['spectral_entropy'] = spectral_entropy(mean_psd)
             
             # Beta/total power ratio (Parkinsonian marker)
             total_power = np.sum(mean_psd[(freqs >= 1) & (freqs <= 100)])
@@ -229,35 +245,23 @@ class EnhancedSpikeAnalyzer:
         
         features = {}
         
-        # Cross-correlation analysis
-        cross_correlations = []
-        for trial_spikes in spike_data['spike_trains']:
-            if len(trial_spikes) > 1:
-                # Convert to binned spike trains
-                binned_trains = []
-                for spikes in trial_spikes:
-                    binned, _ = np.histogram(spikes, bins=np.arange(0, self.trial_duration + 0.01, 0.01))
-                    binned_trains.append(binned)
-                
-                binned_trains = np.array(binned_trains)
-                
-                # Pairwise correlations
-                if binned_trains.shape[0] > 1:
-                    corr_matrix = np.corrcoef(binned_trains)
-                    # Remove diagonal and take upper triangle
-                    triu_indices = np.triu_indices(corr_matrix.shape[0], k=1)
-                    correlations = corr_matrix[triu_indices]
-                    correlations = correlations[~np.isnan(correlations)]
-                    cross_correlations.extend(correlations)
-        
-        features['mean_cross_correlation'] = np.mean(cross_correlations) if cross_correlations else 0
-        features['max_cross_correlation'] = np.max(cross_correlations) if cross_correlations else 0
-        features['correlation_variance'] = np.var(cross_correlations) if cross_correlations else 0
+        binned = self.binned_counts(spike_data)
+        
+        # Cross-correlation analysis: pairwise correlations of 10ms counts,
+        # pooled over trials as streamed summary statistics
+        correlation_stats = PairwiseCorrelationStats()
+        if binned.shape[1] > 1:
+            for binned_trains in binned.counts(0.01):
+                correlation_stats.update(binned_trains)
+        
+        has_correlations = correlation_stats.n_pairs > 0
+        features['mean_cross_correlation'] = correlation_stats.mean if has_correlations else 0
+        features['max_cross_correlation'] = correlation_stats.max if has_correlations else 0
+        features['correlation_variance'] = correlation_stats.variance if has_correlations else 0
         
         # Population synchrony index
         sync_indices = []
-        for trial_spikes in spike_data['spike_trains']:
-            pop_activity = self._calculate_population_activity(trial_spikes, bin_size=0.001)
+        for pop_activity in binned.population(0.001).astype(float):
             if len(pop_activity) > 10:
                 # Synchrony as coefficient of variation of population activity
                 sync_index = np.std(pop_activity) / (np.mean(pop_activity) + 1e-6)
@@ -266,20 +270,14 @@ class EnhancedSpikeAnalyzer:
         features['population_sync_index'] = np.mean(sync_indices) if sync_indices else 0
         features['sync_index_variance'] = np.var(sync_indices) if sync_indices else 0
         
-        # Phase locking analysis (simplified)
-        phase_locking_values = []
-        for trial_spikes in spike_data['spike_trains']:
-            pop_activity = self._calculate_population_activity(trial_spikes)
-            if len(pop_activity) > 50:
-                # Hilbert transform for instantaneous phase
-                analytic_signal = signal.hilbert(pop_activity)
-                instantaneous_phase = np.angle(analytic_signal)
-                
-                # Phase consistency across time
-                phase_consistency = np.abs(np.mean(np.exp(1j * instantaneous_phase)))
-                phase_locking_values.append(phase_consistency)
-        
-        features['phase_locking_value'] = np.mean(phase_locking_values) if phase_locking_values else 0
+        # Phase locking analysis (simplified): consistency of the Hilbert
+        # phase across time, all trials in one batched transform
+        pop_activities = binned.population(0.01).astype(float)
+        phase_locking_values = np.empty(0)
+        if pop_activities.shape[1] > 50:
+            phase_locking_values = phase_consistency(pop_activities)
+        
+        features['phase_locking_value'] = np.mean(phase_locking_values) if len(phase_locking_values) else 0
         
         return features
     
@@ -288,41 +286,29 @@ class EnhancedSpikeAnalyzer:
         
         features = {}
         
-        burst_indices = []
-        burst_durations = []
-        interburst_intervals = []
-        
-        for trial_spikes in spike_data['spike_trains']:
-            for neuron_spikes in trial_spikes:
-                if len(neuron_spikes) > 3:
-                    # Detect bursts (ISI < 10ms followed by ISI > 100ms)
-                    isis = np.diff(neuron_spikes)
-                    
-                    if len(isis) > 2:
-                        # Simple burst detection
-                        short_isis = isis < 0.01  # < 10ms
-                        long_isis = isis > 0.1    # > 100ms
-                        
-                        # Burst index
-                        burst_ratio = np.sum(short_isis) / len(isis)
-                        burst_indices.append(burst_ratio)
-                        
-                        # More sophisticated burst detection
-                        bursts = self._detect_bursts(neuron_spikes)
-                        if bursts:
-                            for burst_start, burst_end in bursts:
-                                burst_durations.append(burst_end - burst_start)
-                            
-                            # Inter-burst intervals
-                            if len(bursts) > 1:
-                                for i in range(len(bursts) - 1):
-                                    ibi = bursts[i+1][0] - bursts[i][1]
-                                    interburst_intervals.append(ibi)
-        
-        features['burst_index'] = np.mean(burst_indices) if burst_indices else 0
-        features['mean_burst_duration'] = np.mean(burst_durations) if burst_durations else 0
-        features['mean_interburst_interval'] = np.mean(interburst_intervals) if interburst_intervals else 0
-        features['burst_frequency'] = len(burst_durations) / (len(spike_data['spike_trains']) * self.trial_duration) if burst_durations else 0
+        spike_trains = as_spike_train_set(spike_data['spike_trains']).compact()
+        isis, isi_trains = spike_trains.isis()
+        n_trains = spike_trains.counts.size
+        
+        # Trains with more than 3 spikes are scored
+        scored = spike_trains.counts.ravel() > 3
+        
+        # Burst index: fraction of ISIs < 10ms
+        n_isis = np.bincount(isi_trains, minlength=n_trains)
+        n_short = np.bincount(isi_trains, isis < 0.01, minlength=n_trains)
+        burst_indices = n_short[scored] / n_isis[scored]
+        
+        # Bursts (runs of ISIs <= 10ms with at least 3 spikes) and the gaps between them
+        trains, starts, ends, _ = detect_bursts(spike_trains.spike_times, spike_trains.train_ids())
+        in_scored = scored[trains]
+        trains, starts, ends = trains[in_scored], starts[in_scored], ends[in_scored]
+        burst_durations = ends - starts
+        interburst_gaps, _ = interburst_intervals(trains, starts, ends)
+        
+        features['burst_index'] = np.mean(burst_indices) if len(burst_indices) else 0
+        features['mean_burst_duration'] = np.mean(burst_durations) if len(burst_durations) else 0
+        features['mean_interburst_interval'] = np.mean(interburst_gaps) if len(interburst_gaps) else 0
+        features['burst_frequency'] = len(burst_durations) / (len(spike_data['spike_trains']) * self.trial_duration) if len(burst_durations) else 0
         
         return features
     
@@ -331,73 +317,61 @@ class EnhancedSpikeAnalyzer:
         
         features = {}
         
-        fano_factors = []
-        cv_values = []
-        entropies = []
-        
-        for trial_spikes in spike_data['spike_trains']:
-            for neuron_spikes in trial_spikes:
-                if len(neuron_spikes) > 2:
-                    # Fano factor (variance/mean of spike counts in windows)
-                    window_size = 0.1  # 100ms windows
-                    n_windows = int(self.trial_duration / window_size)
-                    spike_counts = []
-                    
-                    for w in range(n_windows):
-                        start_time = w * window_size
-                        end_time = (w + 1) * window_size
-                        count = np.sum((neuron_spikes >= start_time) & (neuron_spikes < end_time))
-                        spike_counts.append(count)
-                    
-                    if spike_counts and np.mean(spike_counts) > 0:
-                        fano = np.var(spike_counts) / np.mean(spike_counts)
-                        fano_factors.append(fano)
-                    
-                    # ISI coefficient of variation
-                    if len(neuron_spikes) > 3:
-                        isis = np.diff(neuron_spikes)
-                        if len(isis) > 1 and np.mean(isis) > 0:
-                            cv = np.std(isis) / np.mean(isis)
-                            cv_values.append(cv)
-                    
-                    # Spike train entropy
-                    if len(neuron_spikes) > 5:
-                        # Simple entropy based on ISI distribution
-                        isis = np.diff(neuron_spikes)
-                        hist, _ = np.histogram(isis, bins=10)
-                        prob = hist / np.sum(hist)
-                        entropy_val = stats.entropy(prob + 1e-10)
-                        entropies.append(entropy_val)
-        
-        features['mean_fano_factor'] = np.mean(fano_factors) if fano_factors else 1.0
-        features['mean_cv'] = np.mean(cv_values) if cv_values else 1.0
-        features['mean_entropy'] = np.mean(entropies) if entropies else 0
-        features['regularity_index'] = 1 / (1 + np.mean(cv_values)) if cv_values else 0.5
+        counts = as_spike_train_set(spike_data['spike_trains']).counts
+        
+        # Fano factor (variance/mean of spike counts in 100ms windows) of
+        # every train with more than 2 spikes and a non-zero mean count
+        n_windows = int(self.trial_duration / 0.1)
+        fano_factors = fano_factor(self.binned_counts(spike_data).counts(0.1)[..., :n_windows])
+        fano_factors = fano_factors[(counts > 2) & ~np.isnan(fano_factors)]
+        
+        # ISI coefficient of variation of trains with more than 3 spikes
+        cv_values = isi_cv(spike_data['spike_trains'])
+        cv_values = cv_values[(counts > 3) & ~np.isnan(cv_values)]
+        
+        # Spike train entropy of the ISI distribution, trains with more than 5 spikes
+        entropies = isi_entropy(spike_data['spike_trains'])[counts > 5]
+        
+        features['mean_fano_factor'] = np.mean(fano_factors) if len(fano_factors) else 1.0
+        features['mean_cv'] = np.mean(cv_values) if len(cv_values) else 1.0
+        features['mean_entropy'] = np.mean(entropies) if len(entropies) else 0
+        features['regularity_index'] = 1 / (1 + np.mean(cv_values)) if len(cv_values) else 0.5
         
         return features
     
-    def extract_pathology_features(self, spike_data):
-        """Extract composite pathological pattern features"""
+    def extract_pathology_features(self, spike_data, spectral_features=None, synchrony_features=None,
+                                   burst_features=None, regularity_features=None):
+        """
+        Extract composite pathological pattern features
+        
+        Families already computed for spike_data can be passed in; the
+        missing ones are extracted here.
+        """
         
         features = {}
         
         # Get previously calculated features
-        spectral = self.extract_spectral_features(spike_data)
-        synchrony = self.extract_synchrony_features(spike_data)
-        burst = self.extract_burst_features(spike_data)
+        if spectral_features is None:
+            spectral_features = self.extract_spectral_features(spike_data)
+        if synchrony_features is None:
+            synchrony_features = self.extract_synchrony_features(spike_data)
+        if burst_features is None:
+            burst_features = self.extract_burst_features(spike_data)
+        if regularity_features is None:
+            regularity_features = self.extract_regularity_features(spike_data)
         
         # Parkinsonian signature (beta power + synchrony + regularity disruption)
         features['parkinsonian_index'] = (
-            spectral['beta_ratio'] * 
-            synchrony['mean_cross_correlation'] * 
-            (1 - self.extract_regularity_features(spike_data)['regularity_index'])
+            spectral_features['beta_ratio'] * 
+            synchrony_features['mean_cross_correlation'] * 
+            (1 - regularity_features['regularity_index'])
         )
         
         # Epileptiform signature (high synchrony + bursting + sharp transients)
         features['epileptiform_index'] = (
-            synchrony['population_sync_index'] * 
-            burst['burst_index'] * 
-            synchrony['max_cross_correlation']
+            synchrony_features['population_sync_index'] * 
+            burst_features['burst_index'] * 
+            synchrony_features['max_cross_correlation']
         )
         
         # General pathology indicator
@@ -408,66 +382,56 @@ class EnhancedSpikeAnalyzer:
         
         return features
     
+    def extract_neuron_features(self, spike_data, path=None):
+        """
+        Per-neuron features of every trial, without averaging over the population
+        
+        Parameters:
+        -----------
+        spike_data : dict
+        path : str, Path or None
+            Write the matrix to this .npy file and return it memory-mapped
+        
+        Returns:
+        --------
+        np.ndarray : float32, shape (n_trials, n_neurons, len(NEURON_FEATURES));
+            see neuron_features.population_summary for the population
+            features that reduce over it
+        """
+        stim_times = spike_data.get('stimulus_times', [0.5])
+        stim_time = None
+        if stim_times:
+            stim_time = stim_times[0] if isinstance(stim_times, list) else stim_times
+        return neuron_feature_matrix(spike_data['spike_trains'], self.trial_duration, stim_time, path)
+    
     # Helper methods
+    def binned_counts(self, spike_data):
+        """
+        Spike counts of spike_data on the dt grid, shared by all feature families
+        
+        Within one analyze_spike_data call the spikes are binned once and
+        coarser grids are derived by reshape-sum; nothing is kept after the
+        call returns, and direct extract_* calls bin the spikes themselves.
+        """
+        if self._binned is None:
+            return BinnedCounts(spike_data['spike_trains'], self.trial_duration, self.dt)
+        if 'counts' not in self._binned:
+            self._binned['counts'] = BinnedCounts(spike_data['spike_trains'], self.trial_duration, self.dt)
+        return self._binned['counts']
+    
     def _calculate_population_activity(self, spike_trains, bin_size=0.01):
         """Calculate population activity over time"""
         time_bins = np.arange(0, self.trial_duration + bin_size, bin_size)
-        pop_activity = np.zeros(len(time_bins) - 1)
         
-        for spikes in spike_trains:
-            if len(spikes) > 0:
-                spike_counts, _ = np.histogram(spikes, bins=time_bins)
-                min_len = min(len(spike_counts), len(pop_activity))
-                pop_activity[:min_len] += spike_counts[:min_len]
-        
-        return pop_activity
-    
-    def _band_power(self, freqs, psd, low_freq, high_freq):
-        """Calculate power in a frequency band"""
-        band_mask = (freqs >= low_freq) & (freqs <= high_freq)
-        if np.any(band_mask):
-            return np.trapz(psd[band_mask], freqs[band_mask])
-        return 0
-    
-    def _find_peak_frequency(self, freqs, psd, low_freq, high_freq):
-        """Find peak frequency in a band"""
-        band_mask = (freqs >= low_freq) & (freqs <= high_freq)
-        if np.any(band_mask):
-            band_freqs = freqs[band_mask]
-            band_psd = psd[band_mask]
-            peak_idx = np.argmax(band_psd)
-            return band_freqs[peak_idx]
-        return 0
+        # All neurons share the bins, so one histogram of the pooled spikes suffices
+        spike_counts, _ = np.histogram(as_trial_spikes(spike_trains).spike_times, bins=time_bins)
+        return spike_counts.astype(float)
     
     def _detect_bursts(self, spike_times, max_isi=0.01, min_spikes=3):
-        """Simple burst detection algorithm"""
-        if len(spike_times) < min_spikes:
-            return []
-        
-        isis = np.diff(spike_times)
-        burst_spikes = isis <= max_isi
-        
-        bursts = []
-        burst_start = None
-        burst_spikes_count = 0
-        
-        for i, is_burst in enumerate(burst_spikes):
-            if is_burst:
-                if burst_start is None:
-                    burst_start = i
-                    burst_spikes_count = 1
-                burst_spikes_count += 1
-            else:
-                if burst_start is not None and burst_spikes_count >= min_spikes:
-                    bursts.append((spike_times[burst_start], spike_times[i]))
-                burst_start = None
-                burst_spikes_count = 0
-        
-        # Check final burst
-        if burst_start is not None and burst_spikes_count >= min_spikes:
-            bursts.append((spike_times[burst_start], spike_times[-1]))
-        
-        return bursts
+        """Bursts of one spike train as (start, end) time pairs (see burst_detection)"""
+        _, starts, ends, _ = detect_bursts(spike_times, np.zeros(len(spike_times), dtype=np.int64),
+                                           max_isi=max_isi, min_spikes=min_spikes)
+        return list(zip(starts, ends))
     
     def _calculate_rate_entropy(self, firing_rates):
         """Calculate entropy of firing rate distribution"""
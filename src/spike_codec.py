@@ -0,0 +1,259 @@
+"""
+Spike Time Codecs
+=================
+
+Integer encodings of spike times for storage and in-memory use.
+
+Recordings are sampled at metadata['sampling_rate'] (30 kHz), so spike times
+can be kept as integer sample ticks instead of float64 seconds:
+
+- 'ticks': int32 ticks (int64 beyond ~19.8 hours at 30 kHz), half the size of
+  float64 and still memory-mappable.
+- 'delta-varint': spikes grouped into one stream per unit, each stream
+  delta-encoded and packed as LEB128 varints (zig-zag, so negative times
+  work). Typical inter-spike intervals fit in 2-3 bytes.
+
+Decoding is exact: ticks_to_seconds(seconds_to_ticks(t)) == t for any t on
+the sampling grid. Times between samples would be rounded to the nearest
+tick (an error of at most half a sample period), so encode_time_columns
+refuses them unless rounding is explicitly allowed, and records the error.
+
+With either codec, unit_ids are stored in the smallest integer dtype that
+holds their range.
+"""
+
+import numpy as np
+
+TIME_CODECS = ('ticks', 'delta-varint')
+
+# Spike columns stored for each codec (instead of spike_times/unit_ids)
+CODEC_COLUMNS = {
+    None: ('spike_times', 'unit_ids'),
+    'ticks': ('spike_ticks', 'unit_ids'),
+    'delta-varint': ('stream_units', 'stream_counts', 'spike_deltas'),
+}
+
+# Values encoded per block, bounding the (n, bytes per value) scratch array
+_VARINT_BLOCK = 1 << 20
+
+
+def tick_dtype(min_tick, max_tick):
+    """int32 when the tick range fits, else int64"""
+    info = np.iinfo(np.int32)
+    return np.dtype(np.int32) if info.min <= min_tick and max_tick <= info.max else np.dtype(np.int64)
+
+
+def unit_id_dtype(unit_ids):
+    """Smallest integer dtype holding every id (unsigned unless an id is negative)"""
+    unit_ids = np.asarray(unit_ids)
+    if unit_ids.dtype.kind not in 'iu':
+        return unit_ids.dtype
+    min_id, max_id = (int(unit_ids.min()), int(unit_ids.max())) if len(unit_ids) else (0, 0)
+    dtypes = (np.int8, np.int16, np.int32, np.int64) if min_id < 0 else \
+        (np.uint8, np.uint16, np.uint32, np.uint64)
+    for dtype in dtypes:
+        info = np.iinfo(dtype)
+        if info.min <= min_id and max_id <= info.max:
+            return np.dtype(dtype)
+    return unit_ids.dtype
+
+
+def seconds_to_ticks(spike_times, sampling_rate, dtype=None):
+    """
+    Spike times in seconds -> nearest integer sample ticks.
+
+    Parameters:
+    -----------
+    spike_times : np.ndarray
+        Spike times (s)
+    sampling_rate : float
+        Samples per second
+    dtype : numpy dtype or None
+        Tick dtype (default: int32 if the range fits, else int64)
+    """
+    ticks = np.rint(np.asarray(spike_times, dtype=float) * sampling_rate)
+    if dtype is None:
+        dtype = tick_dtype(ticks.min(), ticks.max()) if len(ticks) else np.dtype(np.int32)
+    return ticks.astype(dtype)
+
+
+def ticks_to_seconds(ticks, sampling_rate):
+    """Integer sample ticks -> spike times in seconds (float64)"""
+    return np.asarray(ticks, dtype=np.int64) / float(sampling_rate)
+
+
+def quantization_error(spike_times, ticks, sampling_rate):
+    """Largest |decoded - original| spike time (s) of an encoding"""
+    if len(ticks) == 0:
+        return 0.0
+    return float(np.max(np.abs(ticks_to_seconds(ticks, sampling_rate) - spike_times)))
+
+
+def zigzag_encode(values):
+    """Signed int64 -> uint64 with small magnitudes mapped to small codes"""
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def zigzag_decode(codes):
+    codes = np.asarray(codes, dtype=np.uint64)
+    return (codes >> np.uint64(1)).view(np.int64) ^ -(codes & np.uint64(1)).view(np.int64)
+
+
+def _varint_encode_block(values):
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        n_bytes += rest > 0
+        rest >>= np.uint64(7)
+
+    byte_idx = np.arange(n_bytes.max())
+    groups = ((values[:, None] >> (7 * byte_idx).astype(np.uint64)) & np.uint64(0x7F)).astype(np.uint8)
+    groups[byte_idx < n_bytes[:, None] - 1] |= 0x80  # Continuation bit on all but the last byte
+    return groups[byte_idx < n_bytes[:, None]]  # Row-major: the bytes of each value in order
+
+
+def varint_encode(values):
+    """Pack unsigned integers as LEB128 varints (7 bits per byte, high bit = more bytes follow)"""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.concatenate([_varint_encode_block(values[start:start + _VARINT_BLOCK])
+                           for start in range(0, len(values), _VARINT_BLOCK)])
+
+
+def varint_decode(buffer):
+    """Unpack a LEB128 varint byte stream into uint64 values"""
+    buffer = np.asarray(buffer, dtype=np.uint8)
+    if len(buffer) == 0:
+        return np.empty(0, dtype=np.uint64)
+    is_last = (buffer & 0x80) == 0
+    if not is_last[-1]:
+        raise ValueError("Truncated varint stream")
+
+    starts = np.flatnonzero(np.concatenate([[True], is_last[:-1]]))
+    value_idx = np.cumsum(is_last) - is_last
+    shifts = (7 * (np.arange(len(buffer)) - starts[value_idx])).astype(np.uint64)
+    payload = (buffer & 0x7F).astype(np.uint64) << shifts
+    return np.bitwise_or.reduceat(payload, starts)
+
+
+def encode_unit_streams(ticks, unit_ids):
+    """
+    Delta-varint encode spike ticks as one stream per unit.
+
+    Returns:
+    --------
+    units : np.ndarray
+        Unit id of each stream (sorted)
+    counts : np.ndarray
+        Spikes per stream
+    buffer : np.ndarray of uint8
+        Concatenated varint streams; each stream starts with its first tick
+        and continues with inter-spike intervals
+    """
+    ticks = np.asarray(ticks, dtype=np.int64)
+    unit_ids = np.asarray(unit_ids)
+    order = np.lexsort((ticks, unit_ids))
+    units, counts = np.unique(unit_ids, return_counts=True)
+
+    stream_ticks = ticks[order]
+    deltas = np.diff(stream_ticks, prepend=0)
+    stream_starts = np.cumsum(counts) - counts
+    deltas[stream_starts] = stream_ticks[stream_starts]
+    return units, counts, varint_encode(zigzag_encode(deltas))
+
+
+def decode_unit_streams(units, counts, buffer):
+    """
+    Inverse of encode_unit_streams.
+
+    Returns:
+    --------
+    ticks, unit_ids : spikes in time order (simultaneous spikes by unit id)
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    deltas = zigzag_decode(varint_decode(buffer))
+    if len(deltas) != counts.sum():
+        raise ValueError("Varint stream does not match the stream counts")
+
+    # One cumulative sum over all streams, minus what earlier streams contributed
+    ticks = np.cumsum(deltas)
+    stream_starts = np.cumsum(counts) - counts
+    nonempty = counts > 0
+    stream_base = ticks[stream_starts[nonempty]] - deltas[stream_starts[nonempty]]
+    ticks -= np.repeat(stream_base, counts[nonempty])
+    unit_ids = np.repeat(np.asarray(units), counts)
+
+    order = np.lexsort((unit_ids, ticks))
+    return ticks[order], unit_ids[order]
+
+
+def encode_time_columns(columns, codec, sampling_rate, allow_rounding=False):
+    """
+    Replace the spike_times/unit_ids columns of a recording by their encoding.
+
+    Parameters:
+    -----------
+    columns : dict
+        Recording columns
+    codec : str
+        One of TIME_CODECS
+    sampling_rate : float
+        Samples per second of the tick grid
+    allow_rounding : bool
+        Round spike times that are not on the sampling grid to the nearest
+        tick; otherwise such times raise a ValueError
+
+    Returns:
+    --------
+    columns : dict
+        Columns to store (see CODEC_COLUMNS)
+    encoding : dict
+        Codec description for the recording metadata
+    """
+    if codec not in TIME_CODECS:
+        raise ValueError(f"Unknown time codec: {codec} (choose from {TIME_CODECS})")
+    if sampling_rate is None:
+        raise ValueError("Encoding spike times as ticks requires metadata['sampling_rate']")
+    spike_times = np.asarray(columns['spike_times'], dtype=float)
+    if any(len(np.asarray(value)) == len(spike_times) and name not in CODEC_COLUMNS[None]
+           and not name.startswith('event_') for name, value in columns.items()):
+        raise ValueError("Only spike_times and unit_ids can be stored with a time codec")
+
+    ticks = seconds_to_ticks(spike_times, sampling_rate)
+    max_error = quantization_error(spike_times, ticks, sampling_rate)
+    if max_error > 0 and not allow_rounding:
+        raise ValueError(f"Spike times are not on the {sampling_rate} Hz sampling grid (max error "
+                         f"{max_error * 1e6:.3g} us); pass allow_rounding=True to round them to ticks")
+
+    unit_ids = np.asarray(columns['unit_ids'])
+    unit_ids = unit_ids.astype(unit_id_dtype(unit_ids), copy=False)
+    encoded = {name: value for name, value in columns.items() if name not in CODEC_COLUMNS[None]}
+    if codec == 'ticks':
+        encoded['spike_ticks'] = ticks
+        encoded['unit_ids'] = unit_ids
+    else:
+        encoded['stream_units'], encoded['stream_counts'], encoded['spike_deltas'] = \
+            encode_unit_streams(ticks, unit_ids)
+
+    encoding = {'codec': codec, 'sampling_rate': sampling_rate, 'tick_dtype': ticks.dtype.str,
+                'max_error': max_error}
+    return encoded, encoding
+
+
+def decode_time_columns(columns, encoding, decode_times=True):
+    """
+    Inverse of encode_time_columns: adds 'spike_ticks' and 'unit_ids' (and
+    'spike_times' in seconds when decode_times) and drops the stream columns.
+    """
+    columns = dict(columns)
+    if encoding['codec'] == 'delta-varint':
+        ticks, unit_ids = decode_unit_streams(columns.pop('stream_units'),
+                                              columns.pop('stream_counts'),
+                                              columns.pop('spike_deltas'))
+        columns['spike_ticks'] = ticks.astype(encoding.get('tick_dtype', np.int64))
+        columns['unit_ids'] = unit_ids
+    if decode_times:
+        columns['spike_times'] = ticks_to_seconds(columns['spike_ticks'], encoding['sampling_rate'])
+    return columns
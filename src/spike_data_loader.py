@@ -3,14 +3,131 @@ from scipy import signal
 import warnings
 warnings.filterwarnings('ignore')
 
+from spike_engine import (generate_spike_train, generate_population_spikes, generate_population_block,
+                          ragged_offsets, sort_by_owner)
+from spike_train_set import SpikeTrainSet, TrialData, TrialSpikes, UnitSpikeIndex, ragged_layout
+from spike_store import RecordingWriter, load_recording
+from parallel_jobs import map_jobs, spawn_seeds
+from random_streams import make_rng
+from sinusoid_basis import shifted_sine, sine_mixture, sinusoid_table
+
+# Parameter ranges for each class of generate_multiclass_dataset. A value is
+# either fixed, a (low, high) tuple drawn uniformly, or a list of choices.
+CLASS_CONFIGS = {
+    'Healthy_Rate': {
+        'coding_type': 'rate',
+        'oscillatory_power': 0.0,
+        'population_synchrony': 0.15,  # Minimal natural synchrony
+        'spike_regularity': 0.8,
+        'pathological_bursting': 0.0
+    },
+    'Healthy_Temporal': {
+        'coding_type': 'temporal',
+        'oscillatory_power': 0.0,
+        'population_synchrony': 0.15,
+        'spike_regularity': 0.8,
+        'pathological_bursting': 0.0
+    },
+    'Parkinsonian': {
+        'coding_type': ['rate', 'temporal'],
+        'oscillatory_power': (0.5, 0.9),  # Strong beta
+        'population_synchrony': (0.6, 0.9),  # High sync
+        'spike_regularity': (0.2, 0.5),  # Irregular
+        'pathological_bursting': (0.1, 0.4)  # Some bursting
+    },
+    'Epileptiform': {
+        'coding_type': ['rate', 'temporal'],
+        'oscillatory_power': (0.3, 0.7),  # Mixed oscillations
+        'population_synchrony': (0.7, 1.0),  # Very high sync
+        'spike_regularity': (0.3, 0.7),  # Variable
+        'pathological_bursting': (0.4, 0.8)  # High bursting
+    },
+    'Mixed_Pathology': {
+        'coding_type': ['rate', 'temporal', 'mixed'],
+        'oscillatory_power': (0.4, 0.8),
+        'population_synchrony': (0.5, 0.8),
+        'spike_regularity': (0.2, 0.6),
+        'pathological_bursting': (0.2, 0.6)
+    }
+}
+
+# Beta mixture of _generate_beta_oscillation: frequencies relative to the beta
+# frequency, and their weights
+BETA_MIXTURE_RATIOS = np.array([1.0, 1.2, 0.8])
+BETA_MIXTURE_WEIGHTS = np.array([1.0, 0.3, 0.2])
+
+# Frequency bands (Hz) and weights of the population synchrony signal
+SYNCHRONY_FREQUENCIES = np.array([4.0, 8.0, 15.0, 30.0, 60.0])
+SYNCHRONY_WEIGHTS = np.array([0.3, 0.25, 0.2, 0.15, 0.1])
+
+def sample_class_config(class_config, rng=None):
+    """Draw one set of generation parameters from a CLASS_CONFIGS entry"""
+    rng = make_rng(rng)
+    config = {}
+    for key, value in class_config.items():
+        if isinstance(value, tuple):
+            config[key] = rng.uniform(*value)
+        elif isinstance(value, list):
+            config[key] = str(rng.choice(value))
+        else:
+            config[key] = value
+    return config
+
+def class_jobs(class_names, n_trials_per_class, seed=None):
+    """(class_name, SeedSequence) jobs, class by class, each with its own seed"""
+    seeds = spawn_seeds(seed, len(class_names) * n_trials_per_class)
+    return [(class_name, seeds[class_idx * n_trials_per_class + trial])
+            for class_idx, class_name in enumerate(class_names)
+            for trial in range(n_trials_per_class)]
+
+# Generator shared by the jobs of one worker process
+_worker_generator = None
+
+def _init_generator_worker(generator):
+    global _worker_generator
+    _worker_generator = generator
+
+def _multiclass_job(job):
+    """Generate one dataset sample; the job's seed fixes every random draw"""
+    class_name, seed_seq = job
+    rng = make_rng(seed_seq, _worker_generator.bit_generator)
+    config = sample_class_config(CLASS_CONFIGS[class_name], rng)
+    return _worker_generator.generate_synthetic_spikes(rng=rng, **config)
+
 class NeuralPatternGenerator:
     """Enhanced neural spike data generator with pathological pattern simulation"""
     
-    def __init__(self, n_neurons=50, trial_duration=2.0, dt=0.001):
+    def __init__(self, n_neurons=50, trial_duration=2.0, dt=0.001, engine='batched',
+                 rng=None, bit_generator='pcg64'):
+        """
+        Parameters:
+        -----------
+        engine : str
+            'batched' draws all neurons of a trial in one pass from a shared
+            rate matrix, 'vectorized' draws each neuron's spike train with
+            array operations (see spike_engine), 'loop' uses the original
+            per-spike loop
+        rng : np.random.Generator, int, SeedSequence or None
+            Default random stream of this generator (None: fresh entropy).
+            Methods also take an `rng` argument, so threads sharing one
+            generator can each pass their own stream (see random_streams.spawn_rngs)
+        bit_generator : str
+            'pcg64', 'pcg64dxsm' or 'philox', used when rng is not a Generator
+        """
+        if engine not in ('batched', 'vectorized', 'loop'):
+            raise ValueError(f"Unknown spike generation engine: {engine}")
+        
         self.n_neurons = n_neurons
         self.trial_duration = trial_duration
         self.dt = dt
+        self.engine = engine
+        self.bit_generator = bit_generator
+        self.rng = make_rng(rng, bit_generator)
         self.time_bins = np.arange(0, trial_duration, dt)
+    
+    def _rng(self, rng):
+        """The stream to draw from: `rng` if given, else this generator's own"""
+        return self.rng if rng is None else make_rng(rng, self.bit_generator)
         
     def generate_synthetic_spikes(self, 
                                 coding_type='rate',
@@ -27,7 +144,8 @@ class NeuralPatternGenerator:
                                 # Disease-specific parameters
                                 beta_frequency=20.0,
                                 burst_duration=0.05,
-                                interburst_interval=0.2):
+                                interburst_interval=0.2,
+                                rng=None):
         """
         Generate synthetic neural spike data with pathological pattern options
         
@@ -43,9 +161,317 @@ class NeuralPatternGenerator:
             Regularity of spike timing (1=regular, 0=irregular)
         pathological_bursting : float (0-1)
             Amount of burst firing activity
+        rng : np.random.Generator, int or None
+            Random stream for this call (defaults to the generator's own)
+        """
+        
+        # The whole dataset is the single chunk of the streaming generator
+        n_trials = n_stimuli * n_trials_per_stimulus
+        chunks = self.iter_synthetic_spikes(
+            coding_type=coding_type,
+            n_stimuli=n_stimuli,
+            n_trials_per_stimulus=n_trials_per_stimulus,
+            chunk_size=max(n_trials, 1),
+            base_firing_rate=base_firing_rate,
+            noise_level=noise_level,
+            refractory_period=refractory_period,
+            oscillatory_power=oscillatory_power,
+            population_synchrony=population_synchrony,
+            spike_regularity=spike_regularity,
+            pathological_bursting=pathological_bursting,
+            beta_frequency=beta_frequency,
+            burst_duration=burst_duration,
+            interburst_interval=interburst_interval,
+            rng=rng,
+            yield_empty=True
+        )
+        return next(chunks)
+    
+    def iter_synthetic_spikes(self,
+                              coding_type='rate',
+                              n_stimuli=20,
+                              n_trials_per_stimulus=10,
+                              chunk_size=None,
+                              base_firing_rate=10.0,
+                              noise_level=0.1,
+                              refractory_period=0.002,
+                              oscillatory_power=0.0,
+                              population_synchrony=0.2,
+                              spike_regularity=0.8,
+                              pathological_bursting=0.0,
+                              beta_frequency=20.0,
+                              burst_duration=0.05,
+                              interburst_interval=0.2,
+                              rng=None,
+                              yield_empty=False):
+        """
+        Stream synthetic trials instead of building the whole dataset in memory
+        
+        Takes the same generation parameters as generate_synthetic_spikes and
+        draws the same trials in the same order for the same rng. Only the
+        trials of the current chunk are held in memory, so arbitrarily long
+        (or unbounded) streams run in constant memory.
+        
+        Parameters:
+        -----------
+        n_trials_per_stimulus : int or None
+            Trials per stimulus, ordered stimulus by stimulus as in
+            generate_synthetic_spikes. None streams forever, cycling through
+            the stimuli one trial at a time.
+        chunk_size : int or None
+            None yields one trial at a time as a dict with 'spike_trains'
+            (TrialSpikes), 'stimulus_label', 'stimulus_time' and
+            'trial_index'. An int yields spike_data dicts in the format of
+            generate_synthetic_spikes holding up to chunk_size trials each.
+        yield_empty : bool
+            Yield an empty chunk when there are no trials at all
+        """
+        
+        rng = self._rng(rng)
+        stimulus_intensities, stimulus_phases = self._stimulus_parameters(coding_type, n_stimuli)
+        parameters = {
+            'coding_type': coding_type,
+            'n_neurons': self.n_neurons,
+            'trial_duration': self.trial_duration,
+            'base_firing_rate': base_firing_rate,
+            'oscillatory_power': oscillatory_power,
+            'population_synchrony': population_synchrony,
+            'spike_regularity': spike_regularity,
+            'pathological_bursting': pathological_bursting
+        }
+        trial_params = (base_firing_rate, noise_level,
+                        refractory_period, oscillatory_power, population_synchrony,
+                        spike_regularity, pathological_bursting, beta_frequency,
+                        burst_duration, interburst_interval)
+        
+        if n_trials_per_stimulus is None:
+            # Unbounded: one trial per stimulus per round
+            stimulus_order = (stim_idx for _ in iter(int, 1) for stim_idx in range(n_stimuli))
+        else:
+            stimulus_order = (stim_idx for stim_idx in range(n_stimuli)
+                              for _ in range(n_trials_per_stimulus))
+        
+        def make_chunk(trial_layouts, stimulus_labels, stimulus_times):
+            return {
+                'spike_trains': SpikeTrainSet.from_trials(trial_layouts),
+                'stimulus_labels': stimulus_labels,
+                'stimulus_times': stimulus_times,
+                'stimulus_intensities': stimulus_intensities,
+                'stimulus_phases': stimulus_phases,
+                'parameters': dict(parameters)
+            }
+        
+        trial_layouts = []
+        stimulus_labels = []
+        stimulus_times = []
+        n_chunks = 0
+        
+        for trial_index, stim_idx in enumerate(stimulus_order):
+            # Generate spike trains for this trial
+            trial_layout = self._generate_trial_layout(
+                stimulus_intensities[stim_idx], stimulus_phases[stim_idx],
+                *trial_params, rng=rng
+            )
+            
+            # Generate stimulus onset time (randomized)
+            stimulus_time = rng.uniform(0.2, 0.4)
+            
+            if chunk_size is None:
+                yield {
+                    'spike_trains': TrialSpikes(*trial_layout),
+                    'stimulus_label': stim_idx,
+                    'stimulus_time': stimulus_time,
+                    'trial_index': trial_index
+                }
+                continue
+            
+            trial_layouts.append(trial_layout)
+            stimulus_labels.append(stim_idx)
+            stimulus_times.append(stimulus_time)
+            
+            if len(trial_layouts) == chunk_size:
+                yield make_chunk(trial_layouts, stimulus_labels, stimulus_times)
+                trial_layouts, stimulus_labels, stimulus_times = [], [], []
+                n_chunks += 1
+        
+        # Last partial chunk
+        if chunk_size is not None and (trial_layouts or (yield_empty and n_chunks == 0)):
+            yield make_chunk(trial_layouts, stimulus_labels, stimulus_times)
+    
+    def iter_continuous_blocks(self,
+                               duration,
+                               block_duration=10.0,
+                               coding_type='rate',
+                               n_stimuli=20,
+                               base_firing_rate=10.0,
+                               noise_level=0.1,
+                               refractory_period=0.002,
+                               oscillatory_power=0.0,
+                               population_synchrony=0.2,
+                               spike_regularity=0.8,
+                               pathological_bursting=0.0,
+                               beta_frequency=20.0,
+                               burst_duration=0.05,
+                               interburst_interval=0.2,
+                               rng=None):
         """
+        Generate one continuous recording in fixed time blocks
+        
+        Stimuli are presented back to back, one every trial_duration seconds,
+        cycling through the n_stimuli stimuli. Rate profiles, oscillations and
+        spikes only ever exist for the current block, so memory is bounded by
+        block_duration rather than by the recording length. Oscillation and
+        synchrony phases, synchrony transients, burst episodes and the
+        refractory dead time carry across block boundaries.
+        
+        Parameters:
+        -----------
+        duration : float
+            Recording length (s)
+        block_duration : float
+            Length of each generated block (s), rounded to whole dt bins
+            
+        Other parameters are those of generate_synthetic_spikes.
+        
+        Yields:
+        -------
+        dict : 'block_start' (s), 'spike_times' (absolute, neuron by neuron),
+            'offsets' (neuron i owns spike_times[offsets[i]:offsets[i + 1]]),
+            and 'event_times' / 'event_labels' (stimulus index) of the stimuli
+            presented in the block
+        """
+        
+        rng = self._rng(rng)
+        stimulus_intensities, stimulus_phases = self._stimulus_parameters(coding_type, n_stimuli)
+        
+        # Fixed for the whole recording
+        responsive = rng.random(self.n_neurons) < 0.7  # 70% of neurons are stimulus-responsive
+        sync_phases = rng.uniform(0, 2*np.pi, 5)
+        transient_tail = np.zeros(0)
+        engine_state = None
+        last_trial = -1
+        
+        bins_per_block = max(1, int(round(block_duration / self.dt)))
+        n_bins_total = int(round(duration / self.dt))
+        
+        for first_bin in range(0, n_bins_total, bins_per_block):
+            n_bins = min(bins_per_block, n_bins_total - first_bin)
+            t = (first_bin + np.arange(n_bins)) * self.dt
+            block_start, block_length = first_bin * self.dt, n_bins * self.dt
+            
+            trial_idx = np.floor(t / self.trial_duration + 1e-9).astype(np.int64)
+            stim_idx = trial_idx % n_stimuli
+            
+            # Row 0: non-responsive neurons, row 1: stimulus-responsive neurons.
+            # sin(2π·8·t + φ) as a rotation of the block's cached table, with
+            # the block offset folded into the per-stimulus phases
+            block_phases = 2 * np.pi * 8 * block_start + stimulus_phases
+            sin_8hz, cos_8hz = sinusoid_table(self.dt, n_bins, 8.0)
+            phase_modulation = 1 + 0.5 * (sin_8hz * np.cos(block_phases)[stim_idx] +
+                                          cos_8hz * np.sin(block_phases)[stim_idx])
+            rates = np.vstack([
+                np.full(n_bins, base_firing_rate),
+                base_firing_rate * stimulus_intensities[stim_idx] * phase_modulation
+            ])
+            
+            if oscillatory_power > 0:
+                oscillation = self._continuous_beta_oscillation(block_start, n_bins, beta_frequency,
+                                                                oscillatory_power, rng)
+                rates *= (1 + oscillatory_power * oscillation)
+            
+            if population_synchrony > 0:
+                sync_signal, transient_tail = self._continuous_synchrony_signal(
+                    block_start, n_bins, population_synchrony, sync_phases, transient_tail, rng
+                )
+                rates *= (1 + population_synchrony * sync_signal)
+            
+            spike_times, offsets, engine_state = generate_population_block(
+                rates, self.dt, block_length,
+                rows=responsive.astype(np.int64),
+                regularity=spike_regularity,
+                bursting=pathological_bursting,
+                burst_duration=burst_duration,
+                interburst_interval=interburst_interval,
+                refractory_period=refractory_period,
+                state=engine_state,
+                rng=rng
+            )
+            
+            # Add noise
+            if noise_level > 0:
+                n_noise_spikes = rng.poisson(noise_level * block_length, self.n_neurons)
+                noise_spikes = rng.uniform(0, block_length, n_noise_spikes.sum())
+                owners = np.concatenate([
+                    np.repeat(np.arange(self.n_neurons), np.diff(offsets)),
+                    np.repeat(np.arange(self.n_neurons), n_noise_spikes)
+                ])
+                spike_times, owners = sort_by_owner(
+                    np.concatenate([spike_times, noise_spikes]), owners, block_length + 1.0
+                )
+                offsets = ragged_offsets(owners, self.n_neurons)
+            
+            # Stimuli whose presentation starts in this block
+            event_bins = np.flatnonzero(np.diff(trial_idx, prepend=last_trial))
+            last_trial = trial_idx[-1]
+            
+            yield {
+                'block_start': block_start,
+                'spike_times': spike_times + block_start,
+                'offsets': offsets,
+                'event_times': trial_idx[event_bins] * self.trial_duration,
+                'event_labels': stim_idx[event_bins]
+            }
+    
+    def generate_continuous_recording(self, path, duration, block_duration=10.0, **params):
+        """
+        Generate a continuous recording block by block, streaming it to disk
+        
+        Each block is appended to a columnar recording (see spike_store) as
+        soon as it is generated, so hours-long recordings are written with
+        memory bounded by the block size.
+        
+        Parameters:
+        -----------
+        path : str or Path
+            Recording directory
+        duration, block_duration :
+            As in iter_continuous_blocks
+        **params :
+            Generation parameters of iter_continuous_blocks (coding_type, rng, ...)
+            
+        Returns:
+        --------
+        Path : the recording directory (open it with spike_store.open_recording)
+        """
+        
+        with RecordingWriter(path) as writer:
+            writer.append(spike_times=np.empty(0), unit_ids=np.empty(0, dtype=np.int64),
+                          event_times=np.empty(0), event_labels=np.empty(0, dtype=np.int64))
+            
+            n_spikes = 0
+            for block in self.iter_continuous_blocks(duration, block_duration, **params):
+                # Recordings are stored in time order
+                unit_ids = np.repeat(np.arange(self.n_neurons), np.diff(block['offsets']))
+                order = np.argsort(block['spike_times'], kind='stable')
+                writer.append(spike_times=block['spike_times'][order], unit_ids=unit_ids[order],
+                              event_times=block['event_times'], event_labels=block['event_labels'])
+                n_spikes += len(order)
+            
+            metadata = {
+                'n_units': self.n_neurons,
+                'duration': duration,
+                'trial_duration': self.trial_duration,
+                'dt': self.dt,
+                'block_duration': block_duration,
+                'parameters': {name: value for name, value in params.items() if name != 'rng'}
+            }
+            path = writer.close(metadata)
         
-        # Generate stimulus parameters
+        print(f"Continuous recording complete: {n_spikes} spikes over {duration:.0f}s -> {path}")
+        return path
+    
+    def _stimulus_parameters(self, coding_type, n_stimuli):
+        """Stimulus intensities and phases for a coding type"""
         if coding_type == 'rate':
             stimulus_intensities = np.linspace(0.5, 2.0, n_stimuli)
             stimulus_phases = np.zeros(n_stimuli)  # No phase coding
@@ -55,76 +481,54 @@ class NeuralPatternGenerator:
         else:  # mixed
             stimulus_intensities = np.linspace(0.8, 1.5, n_stimuli)
             stimulus_phases = np.linspace(0, np.pi, n_stimuli)
-        
-        all_spike_trains = []
-        all_stimulus_labels = []
-        all_stimulus_times = []
-        
-        for stim_idx in range(n_stimuli):
-            intensity = stimulus_intensities[stim_idx]
-            phase = stimulus_phases[stim_idx]
-            
-            for trial in range(n_trials_per_stimulus):
-                # Generate spike trains for this trial
-                spike_trains = self._generate_trial_spikes(
-                    intensity, phase, base_firing_rate, noise_level,
-                    refractory_period, oscillatory_power, population_synchrony,
-                    spike_regularity, pathological_bursting, beta_frequency,
-                    burst_duration, interburst_interval
-                )
-                
-                # Generate stimulus onset time (randomized)
-                stimulus_time = np.random.uniform(0.2, 0.4)
-                
-                all_spike_trains.append(spike_trains)
-                all_stimulus_labels.append(stim_idx)
-                all_stimulus_times.append(stimulus_time)
-        
-        return {
-            'spike_trains': all_spike_trains,
-            'stimulus_labels': all_stimulus_labels,
-            'stimulus_times': all_stimulus_times,
-            'stimulus_intensities': stimulus_intensities,
-            'stimulus_phases': stimulus_phases,
-            'parameters': {
-                'coding_type': coding_type,
-                'n_neurons': self.n_neurons,
-                'trial_duration': self.trial_duration,
-                'base_firing_rate': base_firing_rate,
-                'oscillatory_power': oscillatory_power,
-                'population_synchrony': population_synchrony,
-                'spike_regularity': spike_regularity,
-                'pathological_bursting': pathological_bursting
-            }
-        }
+        return stimulus_intensities, stimulus_phases
+    
+    def _generate_trial_layout(self, *trial_params, rng=None):
+        """Spikes of a single trial as a (spike_times, offsets) ragged layout"""
+        if self.engine == 'batched':
+            return self._generate_trial_population(*trial_params, rng=rng)
+        return ragged_layout(self._generate_trial_spikes(*trial_params, rng=rng))
     
     def _generate_trial_spikes(self, intensity, phase, base_firing_rate, noise_level,
                               refractory_period, oscillatory_power, population_synchrony,
                               spike_regularity, pathological_bursting, beta_frequency,
-                              burst_duration, interburst_interval):
+                              burst_duration, interburst_interval, rng=None):
         """Generate spikes for a single trial with pathological patterns"""
         
+        rng = self._rng(rng)
+        n_bins = len(self.time_bins)
+        
+        if self.engine == 'batched':
+            spike_times, offsets = self._generate_trial_population(
+                intensity, phase, base_firing_rate, noise_level,
+                refractory_period, oscillatory_power, population_synchrony,
+                spike_regularity, pathological_bursting, beta_frequency,
+                burst_duration, interburst_interval, rng=rng
+            )
+            # Per-neuron views into the flat spike array
+            return np.split(spike_times, offsets[1:-1])
+        
         spike_trains = []
+        phase_modulation = 1 + 0.5 * shifted_sine(self.dt, n_bins, 8.0, phase)
         
         # Generate shared oscillatory signal for pathological synchrony
         if oscillatory_power > 0:
-            oscillation = self._generate_beta_oscillation(beta_frequency, oscillatory_power)
+            oscillation = self._generate_beta_oscillation(beta_frequency, oscillatory_power, rng)
         else:
             oscillation = np.zeros(len(self.time_bins))
         
         # Generate population synchrony signal
         if population_synchrony > 0:
-            sync_signal = self._generate_synchrony_signal(population_synchrony)
+            sync_signal = self._generate_synchrony_signal(population_synchrony, rng)
         else:
             sync_signal = np.zeros(len(self.time_bins))
             
         for neuron_idx in range(self.n_neurons):
             # Base firing rate with stimulus modulation
-            if np.random.rand() < 0.7:  # 70% of neurons are stimulus-responsive
+            if rng.random() < 0.7:  # 70% of neurons are stimulus-responsive
                 modulated_rate = base_firing_rate * intensity
                 
                 # Add temporal coding (phase-locked responses)
-                phase_modulation = 1 + 0.5 * np.sin(2 * np.pi * 8 * self.time_bins + phase)
                 firing_rate = modulated_rate * phase_modulation
             else:
                 firing_rate = np.full(len(self.time_bins), base_firing_rate)
@@ -140,13 +544,13 @@ class NeuralPatternGenerator:
             # Generate spike times
             spike_times = self._generate_neuron_spikes(
                 firing_rate, spike_regularity, pathological_bursting,
-                burst_duration, interburst_interval, refractory_period
+                burst_duration, interburst_interval, refractory_period, rng
             )
             
             # Add noise
             if noise_level > 0:
-                n_noise_spikes = np.random.poisson(noise_level * self.trial_duration)
-                noise_spikes = np.random.uniform(0, self.trial_duration, n_noise_spikes)
+                n_noise_spikes = rng.poisson(noise_level * self.trial_duration)
+                noise_spikes = rng.uniform(0, self.trial_duration, n_noise_spikes)
                 spike_times = np.concatenate([spike_times, noise_spikes])
             
             spike_times = np.sort(spike_times)
@@ -154,39 +558,100 @@ class NeuralPatternGenerator:
         
         return spike_trains
     
-    def _generate_beta_oscillation(self, frequency, power):
+    def _generate_trial_population(self, intensity, phase, base_firing_rate, noise_level,
+                                   refractory_period, oscillatory_power, population_synchrony,
+                                   spike_regularity, pathological_bursting, beta_frequency,
+                                   burst_duration, interburst_interval, rng=None):
+        """
+        Generate spikes for every neuron of a trial in one vectorized pass
+        
+        Neurons differ only in whether they are stimulus-responsive, so the
+        trial's (n_neurons, n_time_bins) rate matrix is kept as two shared
+        rate profiles plus a profile index per neuron.
+        
+        Returns:
+        --------
+        spike_times : np.ndarray
+            Sorted spike times of all neurons, concatenated neuron by neuron
+        offsets : np.ndarray
+            Neuron i owns spike_times[offsets[i]:offsets[i + 1]]
+        """
+        
+        rng = self._rng(rng)
+        n_bins = len(self.time_bins)
+        
+        # Row 0: non-responsive neurons, row 1: stimulus-responsive neurons
+        responsive = rng.random(self.n_neurons) < 0.7  # 70% of neurons are stimulus-responsive
+        phase_modulation = 1 + 0.5 * shifted_sine(self.dt, n_bins, 8.0, phase)
+        rates = np.vstack([
+            np.full(n_bins, base_firing_rate),
+            base_firing_rate * intensity * phase_modulation
+        ])
+        
+        # Add pathological oscillations
+        if oscillatory_power > 0:
+            oscillation = self._generate_beta_oscillation(beta_frequency, oscillatory_power, rng)
+            rates *= (1 + oscillatory_power * oscillation)
+        
+        # Add population synchrony
+        if population_synchrony > 0:
+            sync_signal = self._generate_synchrony_signal(population_synchrony, rng)
+            rates *= (1 + population_synchrony * sync_signal)
+        
+        spike_times, offsets = generate_population_spikes(
+            rates, self.dt, self.trial_duration,
+            rows=responsive.astype(np.int64),
+            regularity=spike_regularity,
+            bursting=pathological_bursting,
+            burst_duration=burst_duration,
+            interburst_interval=interburst_interval,
+            refractory_period=refractory_period,
+            rng=rng
+        )
+        
+        # Add noise
+        if noise_level > 0:
+            n_noise_spikes = rng.poisson(noise_level * self.trial_duration, self.n_neurons)
+            noise_spikes = rng.uniform(0, self.trial_duration, n_noise_spikes.sum())
+            owners = np.concatenate([
+                np.repeat(np.arange(self.n_neurons), np.diff(offsets)),
+                np.repeat(np.arange(self.n_neurons), n_noise_spikes)
+            ])
+            spike_times, owners = sort_by_owner(
+                np.concatenate([spike_times, noise_spikes]), owners, self.trial_duration + 1.0
+            )
+            offsets = ragged_offsets(owners, self.n_neurons)
+        
+        return spike_times, offsets
+    
+    def _generate_beta_oscillation(self, frequency, power, rng=None):
         """Generate beta oscillation for Parkinsonian patterns"""
-        t = self.time_bins
+        rng = self._rng(rng)
+        n_bins = len(self.time_bins)
         # Mix of beta frequencies (characteristic of Parkinson's)
-        beta_signal = (np.sin(2 * np.pi * frequency * t) + 
-                      0.3 * np.sin(2 * np.pi * (frequency * 1.2) * t) +
-                      0.2 * np.sin(2 * np.pi * (frequency * 0.8) * t))
+        beta_signal = sine_mixture(self.dt, n_bins, BETA_MIXTURE_RATIOS * frequency, BETA_MIXTURE_WEIGHTS)
         
         # Add some phase noise for realism
-        phase_noise = 0.1 * np.random.randn(len(t))
+        phase_noise = 0.1 * rng.standard_normal(n_bins)
         beta_signal += phase_noise
         
         # Normalize and apply power scaling
         beta_signal = beta_signal / np.max(np.abs(beta_signal)) * power
         return beta_signal
     
-    def _generate_synchrony_signal(self, synchrony_level):
+    def _generate_synchrony_signal(self, synchrony_level, rng=None):
         """Generate population synchrony signal for epileptic patterns"""
+        rng = self._rng(rng)
         t = self.time_bins
         
-        # Multiple frequency components for complex synchrony
-        sync_signal = 0
-        frequencies = [4, 8, 15, 30, 60]  # Multiple bands
-        weights = [0.3, 0.25, 0.2, 0.15, 0.1]
-        
-        for freq, weight in zip(frequencies, weights):
-            sync_signal += weight * np.sin(2 * np.pi * freq * t + 
-                                         np.random.uniform(0, 2*np.pi))
+        # Multiple frequency components for complex synchrony, random phases
+        phases = rng.uniform(0, 2*np.pi, len(SYNCHRONY_FREQUENCIES))
+        sync_signal = sine_mixture(self.dt, len(t), SYNCHRONY_FREQUENCIES, SYNCHRONY_WEIGHTS, phases)
         
         # Add sharp transients (interictal-like spikes)
         if synchrony_level > 0.6:
-            n_spikes = np.random.poisson(3 * synchrony_level)
-            spike_times = np.random.uniform(0.5, self.trial_duration - 0.5, n_spikes)
+            n_spikes = rng.poisson(3 * synchrony_level)
+            spike_times = rng.uniform(0.5, self.trial_duration - 0.5, n_spikes)
             for spike_time in spike_times:
                 spike_idx = int(spike_time / self.dt)
                 if spike_idx < len(t) - 50:
@@ -197,10 +662,74 @@ class NeuralPatternGenerator:
         
         return sync_signal * synchrony_level
     
+    def _continuous_beta_oscillation(self, start, n_bins, frequency, power, rng=None):
+        """_generate_beta_oscillation for n_bins bins starting at absolute time start
+        
+        Normalized by the peak of the deterministic mixture instead of the
+        stretch's own maximum, so consecutive blocks join without steps.
+        """
+        rng = self._rng(rng)
+        frequencies = BETA_MIXTURE_RATIOS * frequency
+        beta_signal = sine_mixture(self.dt, n_bins, frequencies, BETA_MIXTURE_WEIGHTS,
+                                   2 * np.pi * frequencies * start)
+        beta_signal += 0.1 * rng.standard_normal(n_bins)
+        return np.clip(beta_signal / 1.5, -1, 1) * power
+    
+    def _continuous_synchrony_signal(self, start, n_bins, synchrony_level, phases, transient_tail,
+                                     rng=None):
+        """_generate_synchrony_signal for n_bins bins starting at absolute time start
+        
+        The component phases are fixed for the recording. Transients occur at
+        the same average rate as in a trial, and the part of a transient's
+        decay that runs past the stretch is returned for the next one.
+        
+        Returns:
+        --------
+        sync_signal : np.ndarray
+        transient_tail : np.ndarray
+        """
+        rng = self._rng(rng)
+        sync_signal = sine_mixture(self.dt, n_bins, SYNCHRONY_FREQUENCIES, SYNCHRONY_WEIGHTS,
+                                   2 * np.pi * SYNCHRONY_FREQUENCIES * start + phases)
+        
+        # Sharp transients (interictal-like spikes), decaying over 50 bins
+        transients = np.zeros(n_bins + 50)
+        transients[:len(transient_tail)] += transient_tail
+        if synchrony_level > 0.6:
+            n_spikes = rng.poisson(3 * synchrony_level * n_bins * self.dt / self.trial_duration)
+            spike_idx = rng.integers(0, n_bins, n_spikes)
+            decay = synchrony_level * np.exp(-np.arange(50) * 0.1)
+            np.add.at(transients, (spike_idx[:, None] + np.arange(50)).ravel(), np.tile(decay, n_spikes))
+        
+        return (sync_signal + transients[:n_bins]) * synchrony_level, transients[n_bins:]
+    
     def _generate_neuron_spikes(self, firing_rate, regularity, bursting,
-                               burst_duration, interburst_interval, refractory_period):
+                               burst_duration, interburst_interval, refractory_period, rng=None):
         """Generate spikes for individual neuron with pathological patterns"""
         
+        rng = self._rng(rng)
+        
+        if self.engine == 'loop':
+            return self._generate_neuron_spikes_loop(
+                firing_rate, regularity, bursting,
+                burst_duration, interburst_interval, refractory_period, rng
+            )
+        
+        return generate_spike_train(
+            firing_rate, self.dt, self.trial_duration,
+            regularity=regularity,
+            bursting=bursting,
+            burst_duration=burst_duration,
+            interburst_interval=interburst_interval,
+            refractory_period=refractory_period,
+            rng=rng
+        )
+    
+    def _generate_neuron_spikes_loop(self, firing_rate, regularity, bursting,
+                                    burst_duration, interburst_interval, refractory_period, rng=None):
+        """Reference per-spike implementation of _generate_neuron_spikes"""
+        
+        rng = self._rng(rng)
         spike_times = []
         t = 0
         
@@ -210,7 +739,7 @@ class NeuralPatternGenerator:
             current_rate = max(0, firing_rate[time_idx])
             
             # Determine if we're in a burst
-            in_burst = np.random.rand() < bursting
+            in_burst = rng.random() < bursting
             
             if in_burst:
                 # Generate burst of spikes
@@ -220,9 +749,9 @@ class NeuralPatternGenerator:
                 while t < burst_end:
                     # More regular timing in bursts
                     if regularity > 0.5:
-                        isi = 1.0 / burst_rate + np.random.normal(0, (1-regularity) * 0.01)
+                        isi = 1.0 / burst_rate + rng.normal(0, (1-regularity) * 0.01)
                     else:
-                        isi = np.random.exponential(1.0 / burst_rate)
+                        isi = rng.exponential(1.0 / burst_rate)
                     
                     isi = max(isi, refractory_period)
                     t += isi
@@ -231,7 +760,7 @@ class NeuralPatternGenerator:
                         spike_times.append(t)
                 
                 # Inter-burst interval
-                t += interburst_interval * (0.5 + np.random.rand())
+                t += interburst_interval * (0.5 + rng.random())
                 
             else:
                 # Normal spike generation
@@ -239,10 +768,10 @@ class NeuralPatternGenerator:
                     if regularity > 0.5:
                         # More regular firing
                         mean_isi = 1.0 / current_rate
-                        isi = mean_isi + np.random.normal(0, (1-regularity) * mean_isi * 0.5)
+                        isi = mean_isi + rng.normal(0, (1-regularity) * mean_isi * 0.5)
                     else:
                         # Poisson-like irregular firing  
-                        isi = np.random.exponential(1.0 / current_rate)
+                        isi = rng.exponential(1.0 / current_rate)
                     
                     isi = max(isi, refractory_period)
                     t += isi
@@ -254,83 +783,113 @@ class NeuralPatternGenerator:
         
         return np.array(spike_times)
     
-    def generate_multiclass_dataset(self, n_trials_per_class=50):
-        """Generate balanced dataset for multi-class classification"""
+    def generate_multiclass_dataset(self, n_trials_per_class=50, n_jobs=1, seed=None):
+        """
+        Generate balanced dataset for multi-class classification
         
-        dataset = []
-        labels = []
+        Parameters:
+        -----------
+        n_jobs : int or None
+            Worker processes (1: serial, -1: all cores)
+        seed : int, SeedSequence or None
+            Root seed; each trial gets its own child SeedSequence, so the
+            dataset is identical for any n_jobs. None draws the root seed
+            from the generator's own rng.
+        """
         
         print("Generating multi-class neural pattern dataset...")
         
-        # Class 0: Healthy Rate Coding
-        print("  Generating Healthy Rate patterns...")
-        for _ in range(n_trials_per_class):
-            data = self.generate_synthetic_spikes(
-                coding_type='rate',
-                oscillatory_power=0.0,
-                population_synchrony=0.15,  # Minimal natural synchrony
-                spike_regularity=0.8,
-                pathological_bursting=0.0
-            )
-            dataset.append(data)
-            labels.append('Healthy_Rate')
-        
-        # Class 1: Healthy Temporal Coding
-        print("  Generating Healthy Temporal patterns...")
-        for _ in range(n_trials_per_class):
-            data = self.generate_synthetic_spikes(
-                coding_type='temporal',
-                oscillatory_power=0.0,
-                population_synchrony=0.15,
-                spike_regularity=0.8,
-                pathological_bursting=0.0
-            )
-            dataset.append(data)
-            labels.append('Healthy_Temporal')
-        
-        # Class 2: Parkinsonian Patterns
-        print("  Generating Parkinsonian patterns...")
-        for _ in range(n_trials_per_class):
-            data = self.generate_synthetic_spikes(
-                coding_type=np.random.choice(['rate', 'temporal']),
-                oscillatory_power=np.random.uniform(0.5, 0.9),  # Strong beta
-                population_synchrony=np.random.uniform(0.6, 0.9),  # High sync
-                spike_regularity=np.random.uniform(0.2, 0.5),  # Irregular
-                pathological_bursting=np.random.uniform(0.1, 0.4)  # Some bursting
-            )
-            dataset.append(data)
-            labels.append('Parkinsonian')
-        
-        # Class 3: Epileptiform Patterns  
-        print("  Generating Epileptiform patterns...")
-        for _ in range(n_trials_per_class):
-            data = self.generate_synthetic_spikes(
-                coding_type=np.random.choice(['rate', 'temporal']),
-                oscillatory_power=np.random.uniform(0.3, 0.7),  # Mixed oscillations
-                population_synchrony=np.random.uniform(0.7, 1.0),  # Very high sync
-                spike_regularity=np.random.uniform(0.3, 0.7),  # Variable
-                pathological_bursting=np.random.uniform(0.4, 0.8)  # High bursting
-            )
-            dataset.append(data)
-            labels.append('Epileptiform')
-        
-        # Class 4: Mixed Pathology
-        print("  Generating Mixed Pathological patterns...")
-        for _ in range(n_trials_per_class):
-            data = self.generate_synthetic_spikes(
-                coding_type=np.random.choice(['rate', 'temporal', 'mixed']),
-                oscillatory_power=np.random.uniform(0.4, 0.8),
-                population_synchrony=np.random.uniform(0.5, 0.8),
-                spike_regularity=np.random.uniform(0.2, 0.6),
-                pathological_bursting=np.random.uniform(0.2, 0.6)
-            )
-            dataset.append(data)
-            labels.append('Mixed_Pathology')
+        class_names = list(CLASS_CONFIGS)
+        jobs = class_jobs(class_names, n_trials_per_class, self.rng if seed is None else seed)
+        dataset = map_jobs(_multiclass_job, jobs, n_jobs,
+                           initializer=_init_generator_worker, initargs=(self,))
+        labels = [class_name for class_name, _ in jobs]
         
-        print(f"Dataset generation complete: {len(dataset)} trials across 5 classes")
+        print(f"Dataset generation complete: {len(dataset)} trials across {len(class_names)} classes")
         
         return dataset, labels
 
+class SpikeDataLoader:
+    """
+    Loads spike recordings and cuts them into event-aligned trials.
+    """
+    
+    def __init__(self, pre_time=1.0, post_time=3.0):
+        """
+        Parameters:
+        -----------
+        pre_time : float
+            Default time before each event included in its trial (s)
+        post_time : float
+            Default time after each event included in its trial (s)
+        """
+        self.pre_time = pre_time
+        self.post_time = post_time
+        self._index = None
+        self._index_source = None
+    
+    def load_spike_data(self, path, mmap_mode='r'):
+        """
+        Load a recording from data/ (columnar directory, .npz, .pkl or .csv).
+        
+        Returns:
+        --------
+        dict : 'spike_times', 'unit_ids', 'event_times', 'event_labels', 'metadata'
+        """
+        return load_recording(path, mmap_mode=mmap_mode)
+    
+    def build_index(self, spike_times, unit_ids):
+        """
+        Per-unit sorted index of a recording, built once and reused.
+        
+        The index of the most recent (spike_times, unit_ids) pair is cached,
+        so repeated create_trials calls on the same arrays (e.g. with other
+        windows) skip the sort.
+        """
+        source = self._index_source
+        if source is None or source[0] is not spike_times or source[1] is not unit_ids:
+            self._index = UnitSpikeIndex(spike_times, unit_ids)
+            self._index_source = (spike_times, unit_ids)
+        return self._index
+    
+    def create_trials(self, spike_times, unit_ids, event_times, event_labels,
+                      pre_time=None, post_time=None):
+        """
+        Cut a recording into one trial per event.
+        
+        Each unit's spikes around every event are located with np.searchsorted
+        on the per-unit index (O(log n) per unit and event) and gathered in
+        one pass into a (trial, unit) table. Trial dicts are only built when
+        a trial is accessed, and their spike arrays are views into the table.
+        
+        Parameters:
+        -----------
+        spike_times, unit_ids : np.ndarray
+            Flat recording columns
+        event_times : np.ndarray
+            Event (stimulus onset) times (s)
+        event_labels : np.ndarray
+            Label of each event
+        pre_time, post_time : float or None
+            Trial window [event - pre_time, event + post_time) (default: the
+            loader's)
+            
+        Returns:
+        --------
+        TrialData : the (trial, unit) table, which reads as a list of
+            per-trial dicts with 'trial_id', 'event_time', 'event_label',
+            'pre_time', 'post_time', 'units' (a list of {'unit_id',
+            'spike_times'} with spike times relative to the event) and
+            'unit_index' (unit id -> position in 'units')
+        """
+        pre_time = self.pre_time if pre_time is None else pre_time
+        post_time = self.post_time if post_time is None else post_time
+        
+        index = self.build_index(spike_times, unit_ids)
+        aligned = index.align(event_times, pre_time, post_time)
+        return TrialData(aligned, index.units, event_times, np.asarray(event_labels).astype(str),
+                         pre_time, post_time)
+
 # Convenience function for backward compatibility
 def load_spike_data(coding_type='rate', n_stimuli=20, **kwargs):
     """Backward compatible function for existing code"""
@@ -0,0 +1,632 @@
+"""
+Spike Generation Engine
+=======================
+
+Vectorized kernels for drawing spike trains from time-varying firing rates.
+
+Tonic firing is generated by time-rescaling: unit-mean inter-spike intervals
+are drawn in operational time (the integrated rate) and mapped back to real
+time, so a whole run of spikes costs a handful of array operations instead of
+one Python iteration per spike. Burst episodes are drawn as blocks of ISIs,
+and only the episode boundaries are stepped through sequentially.
+"""
+
+import bisect
+import numpy as np
+
+from random_streams import make_rng
+
+# Bump whenever a change alters the spikes drawn for a given seed, so cached
+# datasets generated by older versions are not reused
+ENGINE_VERSION = 1
+
+
+def cumulative_intensity(firing_rate, dt):
+    """Integrated firing rate sampled at the bin edges (len(firing_rate) + 1 values)"""
+    intensity = np.empty(len(firing_rate) + 1)
+    intensity[0] = 0.0
+    np.cumsum(np.maximum(firing_rate, 0) * dt, out=intensity[1:])
+    return intensity
+
+
+def rescale_to_time(operational_times, intensity, dt):
+    """Map operational times back to real time (inverse of the integrated rate).
+
+    Operational times beyond the end of the intensity table map to np.inf.
+    """
+    operational_times = np.asarray(operational_times, dtype=float)
+    n_bins = len(intensity) - 1
+
+    bin_idx = np.searchsorted(intensity, operational_times, side='right') - 1
+    np.clip(bin_idx, 0, n_bins - 1, out=bin_idx)
+
+    lower = intensity[bin_idx]
+    width = intensity[bin_idx + 1] - lower
+    width[width <= 0] = np.inf  # Zero-rate bins are never landed in
+
+    times = (bin_idx + (operational_times - lower) / width) * dt
+    times[operational_times >= intensity[-1]] = np.inf
+    return times
+
+
+def draw_unit_isis(n, regularity, rng):
+    """Draw unit-mean ISIs for the renewal process behind `spike_regularity`.
+
+    Regular firing (regularity > 0.5) uses a Gaussian jitter around the mean ISI
+    whose relative width shrinks as regularity grows; otherwise ISIs are
+    exponential (Poisson firing).
+    """
+    if regularity > 0.5:
+        return 1.0 + rng.normal(0, (1 - regularity) * 0.5, n)
+    return rng.standard_exponential(n)
+
+
+def apply_refractory(spike_times, refractory_period):
+    """Enforce a dead time between consecutive spikes of a sorted train.
+
+    Each spike is delayed to at least one refractory period after the
+    (possibly delayed) previous spike, via t'_k = max_j<=k(t_j - j*r) + k*r.
+    """
+    if refractory_period <= 0 or len(spike_times) < 2:
+        return spike_times
+    steps = np.arange(len(spike_times)) * refractory_period
+    return np.maximum.accumulate(spike_times - steps) + steps
+
+
+class _ScalarPool:
+    """Random numbers drawn in blocks and handed out one Python float at a time"""
+
+    def __init__(self, draw, block_size):
+        self._draw = draw
+        self._block_size = block_size
+        self._values = draw(block_size).tolist()
+        self._pos = 0
+
+    def next(self):
+        if self._pos == len(self._values):
+            self._values = self._draw(self._block_size).tolist()
+            self._pos = 0
+        value = self._values[self._pos]
+        self._pos += 1
+        return value
+
+
+def _tonic_run(t_start, intensity, dt, duration, regularity, refractory_period, rng):
+    """Generate ordinary spikes from `t_start` until the end of the trial"""
+    edges = np.arange(len(intensity)) * dt
+    total_intensity = intensity[-1]
+    spikes = []
+    t = t_start
+
+    while t < duration:
+        position = np.interp(t, edges, intensity)
+        expected = total_intensity - position
+        block = int(expected + 3 * np.sqrt(expected) + 10)
+
+        operational = position + np.cumsum(draw_unit_isis(block, regularity, rng))
+        finished = operational[-1] >= total_intensity
+        if finished:
+            operational = operational[operational < total_intensity]
+        times = rescale_to_time(operational, intensity, dt)
+        spikes.append(times)
+
+        if finished or len(times) == 0:
+            break
+        t = times[-1]
+
+    spikes = np.concatenate(spikes) if spikes else np.array([])
+    spikes = apply_refractory(spikes, refractory_period)
+    return spikes[spikes < duration]
+
+
+def generate_spike_train(firing_rate, dt, duration, regularity=0.8, bursting=0.0,
+                         burst_duration=0.05, interburst_interval=0.2,
+                         refractory_period=0.002, rng=None):
+    """
+    Generate one spike train from a firing-rate profile.
+
+    Alternates tonic runs and burst episodes: each ordinary spike is followed
+    by a burst episode with probability `bursting`, so the length of a tonic
+    run is geometric and can be drawn up front. Within a burst the rate is
+    raised to `(2 + 3 * bursting)` times the rate at burst onset, and each
+    burst is followed by an inter-burst interval of
+    `interburst_interval * U(0.5, 1.5)`.
+
+    Parameters:
+    -----------
+    firing_rate : np.ndarray
+        Firing rate (Hz) per time bin of width `dt`
+    regularity : float (0-1)
+        Regularity of spike timing (1=regular, 0=irregular)
+    bursting : float (0-1)
+        Probability of entering a burst episode at each event
+    rng : np.random.Generator, int or None
+        Source of randomness (see random_streams.make_rng)
+
+    Returns:
+    --------
+    np.ndarray : Sorted spike times in seconds
+    """
+    rng = make_rng(rng)
+    intensity = cumulative_intensity(firing_rate, dt)
+
+    if bursting <= 0:
+        return _tonic_run(0.0, intensity, dt, duration, regularity,
+                          refractory_period, rng)
+
+    total_intensity = float(intensity[-1])
+    n_bins = len(firing_rate)
+    regular = regularity > 0.5
+
+    # All randomness is drawn in blocks; the episode loop below only steps
+    # through episode boundaries and consumes the pre-drawn values
+    next_tonic_isi = _ScalarPool(lambda n: draw_unit_isis(n, regularity, rng),
+                                 int(total_intensity) + 16).next
+    next_run_length = _ScalarPool(lambda n: rng.geometric(bursting, n) - 1, 32).next
+    next_gap = _ScalarPool(rng.random, 32).next
+    if regular:
+        next_burst_draw = _ScalarPool(lambda n: rng.normal(0, (1 - regularity) * 0.01, n), 128).next
+    else:
+        next_burst_draw = _ScalarPool(rng.standard_exponential, 128).next
+
+    tonic_positions = []
+    burst_spikes = []
+    t = 0.0
+
+    while t < duration:
+        # Tonic run: ordinary spikes before the next burst episode, kept as
+        # operational times and mapped to real time in one pass at the end
+        n_tonic = next_run_length()
+        if n_tonic > 0:
+            bin_idx = min(int(t / dt), n_bins - 1)
+            lower = float(intensity[bin_idx])
+            position = lower + (t / dt - bin_idx) * (float(intensity[bin_idx + 1]) - lower)
+
+            for _ in range(n_tonic):
+                position += next_tonic_isi()
+                tonic_positions.append(position)
+
+            if position >= total_intensity:
+                break
+            end_idx = bisect.bisect_right(intensity, position) - 1
+            lower = float(intensity[end_idx])
+            t = (end_idx + (position - lower) / (float(intensity[end_idx + 1]) - lower)) * dt
+
+        # Burst episode at the current rate
+        current_rate = max(0.0, float(firing_rate[min(int(t / dt), n_bins - 1)]))
+        burst_window = min(t + burst_duration, duration) - t
+        burst_rate = current_rate * (2 + 3 * bursting)  # Higher rate in burst
+
+        elapsed = 0.0
+        if burst_rate > 0:
+            mean_isi = 1.0 / burst_rate
+            while True:
+                if regular:
+                    isi = mean_isi + next_burst_draw()
+                else:
+                    isi = next_burst_draw() * mean_isi
+                elapsed += max(isi, refractory_period)
+                if elapsed >= burst_window:
+                    break
+                burst_spikes.append(t + elapsed)
+        else:
+            elapsed = burst_window
+
+        # Inter-burst interval
+        t += elapsed + interburst_interval * (0.5 + next_gap())
+
+    tonic_spikes = rescale_to_time(tonic_positions, intensity, dt)
+    spikes = np.concatenate([tonic_spikes, burst_spikes])
+    spikes.sort()
+    spikes = apply_refractory(spikes, refractory_period)
+    return spikes[spikes < duration]
+
+
+# ---------------------------------------------------------------------------
+# Population-level generation
+# ---------------------------------------------------------------------------
+
+def ragged_offsets(owners, n_rows):
+    """Offsets (n_rows + 1) of a ragged layout from the sorted owner of each item"""
+    offsets = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners, minlength=n_rows), out=offsets[1:])
+    return offsets
+
+
+def sort_by_owner(times, owners, span):
+    """Order items by (owner, time); `span` must exceed the range of `times`"""
+    order = np.argsort(times + owners * span, kind='stable')
+    return times[order], owners[order]
+
+
+def apply_refractory_segments(spike_times, owners, refractory_period, span):
+    """apply_refractory on every train of a flat (owner, time)-sorted layout at once.
+
+    A per-owner shift larger than any value of t - j*r keeps the running
+    maximum from leaking across trains, so one maximum.accumulate covers
+    the whole population.
+    """
+    n = len(spike_times)
+    if refractory_period <= 0 or n < 2:
+        return spike_times
+    starts = ragged_offsets(owners, owners[-1] + 1)[:-1]
+    steps = (np.arange(n) - starts[owners]) * refractory_period
+    shift = owners * (span + steps.max() + 1.0)
+    return np.maximum.accumulate(spike_times - steps + shift) - shift + steps
+
+
+class _PopulationIntensity:
+    """Integrated rate of several rate profiles, stacked into one searchable table"""
+
+    def __init__(self, rates, rows, dt):
+        self.rates = np.maximum(rates, 0)
+        self.rows = rows
+        self.dt = dt
+        self.n_bins = rates.shape[1]
+
+        table = np.zeros((rates.shape[0], self.n_bins + 1))
+        np.cumsum(self.rates * dt, axis=1, out=table[:, 1:])
+        self.table = table
+        self.totals = table[:, -1]
+
+        # Row r of the flat table is shifted past the end of row r - 1, so it
+        # stays sorted and one searchsorted call rescales every neuron
+        self.row_shift = np.concatenate([[0.0], np.cumsum(self.totals + 1.0)[:-1]])
+        self.flat = (table + self.row_shift[:, None]).ravel()
+
+    def at(self, times, neurons):
+        """Integrated rate of each neuron at the given times"""
+        rows = self.rows[neurons]
+        scaled = times / self.dt
+        bin_idx = np.minimum(scaled.astype(np.int64), self.n_bins - 1)
+        lower = self.table[rows, bin_idx]
+        upper = self.table[rows, bin_idx + 1]
+        return lower + (scaled - bin_idx) * (upper - lower)
+
+    def rate_at(self, times, neurons):
+        """Firing rate of each neuron in the bin containing the given times"""
+        bin_idx = np.minimum((times / self.dt).astype(np.int64), self.n_bins - 1)
+        return self.rates[self.rows[neurons], bin_idx]
+
+    def to_time(self, positions, neurons):
+        """rescale_to_time for positions below each neuron's total intensity"""
+        rows = self.rows[neurons]
+        stride = self.n_bins + 1
+        flat_idx = np.searchsorted(self.flat, positions + self.row_shift[rows], side='right') - 1
+        bin_idx = np.minimum(flat_idx - rows * stride, self.n_bins - 1)
+
+        lower = self.table[rows, bin_idx]
+        width = self.table[rows, bin_idx + 1] - lower
+        width[width <= 0] = np.inf
+        return (bin_idx + (positions - lower) / width) * self.dt
+
+
+def _population_tonic(intensity, neurons, start_positions, regularity, rng):
+    """Tonic spikes from each start position to the end of its neuron's trial.
+
+    Unit ISIs are drawn as one (n_neurons, block) matrix; the rare rows that
+    do not reach their total intensity are topped up with further blocks.
+    Returns operational positions and their owners, and for every neuron how
+    far past its total intensity the first spike beyond the end falls.
+    """
+    totals = intensity.totals[intensity.rows[neurons]]
+    positions, owners = [], []
+    overshoot = np.zeros(len(neurons))
+    pending = np.arange(len(neurons))
+
+    while len(neurons):
+        remaining = totals - start_positions
+        expected = remaining.max()
+        block = int(expected + 4 * np.sqrt(expected) + 10)
+
+        run = start_positions[:, None] + np.cumsum(draw_unit_isis((len(neurons), block), regularity, rng), axis=1)
+        keep = run < totals[:, None]
+        positions.append(run[keep])
+        owners.append(np.broadcast_to(neurons[:, None], run.shape)[keep])
+
+        unfinished = keep[:, -1]
+        finished = np.flatnonzero(~unfinished)
+        overshoot[pending[finished]] = run[finished, keep[finished].sum(axis=1)] - totals[finished]
+        neurons = neurons[unfinished]
+        pending = pending[unfinished]
+        start_positions = run[unfinished, -1]
+        totals = totals[unfinished]
+
+    return positions, owners, overshoot
+
+
+def _population_bursts(t, windows, burst_rates, neurons, regularity, refractory_period, rng):
+    """Burst episodes for a set of neurons, all drawn in one pass.
+
+    Mirrors the burst loop of generate_spike_train: ISIs at `burst_rates`
+    (clipped at the refractory period) are accumulated until they pass each
+    neuron's window. Returns spike times, owners and each episode's length.
+    """
+    elapsed = np.where(burst_rates > 0, 0.0, windows)
+    spikes, owners = [], []
+    active = np.flatnonzero(burst_rates > 0)
+
+    while len(active):
+        mean_isi = 1.0 / burst_rates[active]
+        expected = (windows[active] * burst_rates[active]).max()
+        block = int(expected + 4 * np.sqrt(expected) + 5)
+        if refractory_period > 0:
+            block = min(block, int(windows[active].max() / refractory_period) + 2)
+
+        shape = (len(active), block)
+        if regularity > 0.5:
+            isis = mean_isi[:, None] + rng.normal(0, (1 - regularity) * 0.01, shape)
+        else:
+            isis = rng.standard_exponential(shape) * mean_isi[:, None]
+        offsets = elapsed[active, None] + np.cumsum(np.maximum(isis, refractory_period), axis=1)
+
+        inside = offsets < windows[active, None]
+        spikes.append((t[active, None] + offsets)[inside])
+        owners.append(np.broadcast_to(neurons[active, None], shape)[inside])
+
+        # Episode length: the first accumulated ISI that crosses the window
+        n_inside = inside.sum(axis=1)
+        done = n_inside < block
+        elapsed[active[done]] = offsets[done, n_inside[done]]
+        elapsed[active[~done]] = offsets[~done, -1]
+        active = active[~done]
+
+    return spikes, owners, elapsed
+
+
+def generate_population_spikes(rates, dt, duration, rows=None, regularity=0.8, bursting=0.0,
+                               burst_duration=0.05, interburst_interval=0.2,
+                               refractory_period=0.002, rng=None):
+    """
+    Generate spike trains for a whole population in one vectorized pass.
+
+    Same process as generate_spike_train, but every neuron advances through
+    its tonic runs and burst episodes in lockstep, so the number of Python
+    iterations scales with the number of episodes per trial rather than with
+    the number of neurons or spikes.
+
+    Parameters:
+    -----------
+    rates : np.ndarray
+        Firing-rate matrix (Hz), shape (n_profiles, n_time_bins)
+    rows : np.ndarray or None
+        Rate profile (row of `rates`) of each neuron. None means one row per
+        neuron, i.e. `rates` is the full (n_neurons, n_time_bins) matrix.
+        Neurons that share a profile share its integrated-rate table.
+    regularity : float (0-1)
+        Regularity of spike timing (1=regular, 0=irregular)
+    bursting : float (0-1)
+        Probability of entering a burst episode at each event
+    rng : np.random.Generator, int or None
+        Source of randomness (see random_streams.make_rng)
+
+    Returns:
+    --------
+    spike_times : np.ndarray
+        Spike times of all neurons, neuron by neuron, each train sorted
+    offsets : np.ndarray
+        Neuron i owns spike_times[offsets[i]:offsets[i + 1]]
+    """
+    rng = make_rng(rng)
+    rates = np.atleast_2d(np.asarray(rates, dtype=float))
+    rows = np.arange(len(rates)) if rows is None else np.asarray(rows)
+    n_neurons = len(rows)
+    intensity = _PopulationIntensity(rates, rows, dt)
+
+    all_neurons = np.arange(n_neurons)
+    if bursting <= 0:
+        positions, owners, _ = _population_tonic(intensity, all_neurons, np.zeros(n_neurons), regularity, rng)
+        burst_spikes, burst_owners = [], []
+    else:
+        positions, owners, burst_spikes, burst_owners, _, _ = _population_episodes(
+            intensity, duration, regularity, bursting, burst_duration,
+            interburst_interval, refractory_period, rng
+        )
+
+    positions = np.concatenate(positions + [np.empty(0)])
+    owners = np.concatenate(owners + [np.empty(0, dtype=np.int64)])
+    spike_times = np.concatenate([intensity.to_time(positions, owners)] + burst_spikes)
+    owners = np.concatenate([owners] + burst_owners)
+
+    spike_times, owners = sort_by_owner(spike_times, owners, duration + 1.0)
+    spike_times = apply_refractory_segments(spike_times, owners, refractory_period, duration)
+
+    keep = spike_times < duration
+    spike_times, owners = spike_times[keep], owners[keep]
+    return spike_times, ragged_offsets(owners, n_neurons)
+
+
+class PopulationBlockState:
+    """What a continuous population recording carries from one block to the next.
+
+    All times are relative to the start of the next block.
+    """
+
+    def __init__(self, resume_times, last_spikes, pending_times, pending_owners, tonic_next):
+        self.resume_times = resume_times  # Where each neuron's episodes continue
+        self.last_spikes = last_spikes  # Last emitted spike (-inf: none), for the dead time
+        self.pending_times = pending_times  # Burst spikes that spilled past the block end
+        self.pending_owners = pending_owners
+        self.tonic_next = tonic_next  # Integrated rate to the next tonic spike (NaN: not in a tonic run)
+
+    @classmethod
+    def initial(cls, n_neurons):
+        return cls(np.zeros(n_neurons), np.full(n_neurons, -np.inf),
+                   np.empty(0), np.empty(0, dtype=np.int64), np.full(n_neurons, np.nan))
+
+
+def generate_population_block(rates, dt, duration, rows=None, regularity=0.8, bursting=0.0,
+                              burst_duration=0.05, interburst_interval=0.2,
+                              refractory_period=0.002, state=None, rng=None):
+    """
+    Generate one block of a continuous population recording.
+
+    The same process as generate_population_spikes over [0, duration), but
+    consecutive blocks join seamlessly: burst episodes run on past the block
+    end (their late spikes are emitted by the next block), neurons inside an
+    inter-burst interval resume where it ends, tonic runs continue with the
+    spike their last ISI reaches into the block (the run length itself is
+    redrawn, which leaves its geometric distribution unchanged), and the
+    refractory dead time counts from the previous block's last spike.
+
+    Parameters:
+    -----------
+    rates, dt, rows, regularity, bursting, burst_duration, interburst_interval,
+    refractory_period :
+        As in generate_population_spikes, for this block only
+    duration : float
+        Block length (s)
+    state : PopulationBlockState or None
+        State returned by the previous block (None: start of the recording)
+
+    Returns:
+    --------
+    spike_times : np.ndarray
+        Block-relative spike times, neuron by neuron, each train sorted
+    offsets : np.ndarray
+        Neuron i owns spike_times[offsets[i]:offsets[i + 1]]
+    state : PopulationBlockState
+        State for the next block
+    """
+    rng = make_rng(rng)
+    rates = np.atleast_2d(np.asarray(rates, dtype=float))
+    rows = np.arange(len(rates)) if rows is None else np.asarray(rows)
+    n_neurons = len(rows)
+    intensity = _PopulationIntensity(rates, rows, dt)
+    if state is None:
+        state = PopulationBlockState.initial(n_neurons)
+
+    # A tonic run that reached the previous block's end continues with its next
+    # spike, unless that spike lies beyond this block as well
+    totals = intensity.totals[rows]
+    carried = ~np.isnan(state.tonic_next)
+    fits = carried & (state.tonic_next < totals)
+    deferred = carried & ~fits
+    carried_owners = np.flatnonzero(fits)
+    carried_positions = state.tonic_next[fits]
+
+    if bursting <= 0:
+        active = np.flatnonzero(~deferred)
+        start_positions = np.where(fits, state.tonic_next, 0.0)[active]
+        positions, owners, active_next = _population_tonic(intensity, active, start_positions, regularity, rng)
+        burst_spikes, burst_owners = [], []
+        resume = np.full(n_neurons, float(duration))
+        tonic_next = np.full(n_neurons, np.nan)
+        tonic_next[active] = active_next
+    else:
+        start_times = np.array(state.resume_times, dtype=float)
+        start_times[fits] = intensity.to_time(carried_positions, carried_owners)
+        start_times[deferred] = duration
+        positions, owners, burst_spikes, burst_owners, resume, tonic_next = _population_episodes(
+            intensity, duration, regularity, bursting, burst_duration,
+            interburst_interval, refractory_period, rng,
+            start_times=start_times, clip_bursts=False
+        )
+    tonic_next[deferred] = state.tonic_next[deferred] - totals[deferred]
+    positions = positions + [carried_positions]
+    owners = owners + [carried_owners]
+
+    # Previous spikes still inside the dead time enter as sentinels and are dropped again
+    sentinels = np.flatnonzero(state.last_spikes > -refractory_period)
+    positions = np.concatenate(positions + [np.empty(0)])
+    owners = np.concatenate(owners + [np.empty(0, dtype=np.int64)])
+    spike_times = np.concatenate([intensity.to_time(positions, owners)] + burst_spikes +
+                                 [state.pending_times, state.last_spikes[sentinels]])
+    owners = np.concatenate([owners] + burst_owners + [state.pending_owners, sentinels])
+    is_sentinel = np.zeros(len(spike_times), dtype=bool)
+    is_sentinel[len(spike_times) - len(sentinels):] = True
+
+    # Shift by the dead time so every time is non-negative for the (owner, time) sort
+    span = duration + burst_duration + 2 * refractory_period + 1.0
+    order = np.argsort(spike_times + refractory_period + owners * span, kind='stable')
+    spike_times, owners, is_sentinel = spike_times[order], owners[order], is_sentinel[order]
+    spike_times = apply_refractory_segments(spike_times + refractory_period, owners,
+                                            refractory_period, span) - refractory_period
+    spike_times, owners = spike_times[~is_sentinel], owners[~is_sentinel]
+
+    in_block = spike_times < duration
+    block_times, block_owners = spike_times[in_block], owners[in_block]
+
+    offsets = ragged_offsets(block_owners, n_neurons)
+    last_spikes = np.full(n_neurons, -np.inf)
+    has_spikes = offsets[1:] > offsets[:-1]
+    last_spikes[has_spikes] = block_times[offsets[1:][has_spikes] - 1] - duration
+    next_state = PopulationBlockState(resume - duration, last_spikes,
+                                      spike_times[~in_block] - duration, owners[~in_block], tonic_next)
+    return block_times, offsets, next_state
+
+
+def _population_episodes(intensity, duration, regularity, bursting, burst_duration,
+                         interburst_interval, refractory_period, rng,
+                         start_times=None, clip_bursts=True):
+    """Alternate tonic runs and burst episodes for every neuron in lockstep.
+
+    Each neuron starts at start_times (default 0). With clip_bursts=False
+    burst episodes may run past `duration`. Also returns the time (>= duration)
+    at which each neuron would resume: `duration` when a tonic run reached
+    the end, later when it is inside an inter-burst interval. For neurons
+    whose tonic run reached the end, also returns how far past their total
+    intensity the run's next spike falls (NaN for the others).
+    """
+    n_neurons = len(intensity.rows)
+    totals = intensity.totals[intensity.rows]
+
+    positions, owners, burst_spikes, burst_owners = [], [], [], []
+    neurons = np.arange(n_neurons)
+    resume = np.full(n_neurons, float(duration))
+    overshoot = np.full(n_neurons, np.nan)
+    if start_times is None:
+        t = np.zeros(n_neurons)
+    else:
+        t = np.array(start_times, dtype=float)
+        late = t >= duration
+        resume[late] = t[late]
+        neurons, t = neurons[~late], t[~late]
+
+    while len(neurons):
+        # Tonic runs: geometric numbers of ordinary spikes, one flat draw
+        run_lengths = rng.geometric(bursting, len(neurons)) - 1
+        ends = np.cumsum(run_lengths)
+        starts = ends - run_lengths
+        start_positions = intensity.at(t, neurons)
+
+        cumulative = np.concatenate([[0.0], np.cumsum(draw_unit_isis(ends[-1], regularity, rng))])
+        run_owners = np.repeat(np.arange(len(neurons)), run_lengths)
+        run_positions = start_positions[run_owners] + cumulative[1:] - cumulative[starts][run_owners]
+        end_positions = start_positions + cumulative[ends] - cumulative[starts]
+
+        in_trial = run_positions < totals[neurons][run_owners]
+        positions.append(run_positions[in_trial])
+        owners.append(neurons[run_owners[in_trial]])
+
+        # Neurons whose tonic run passes the end of the trial are done
+        running = end_positions < totals[neurons]
+        beyond = np.flatnonzero(~in_trial)
+        if len(beyond):
+            done, first = np.unique(run_owners[beyond], return_index=True)
+            overshoot[neurons[done]] = run_positions[beyond[first]] - totals[neurons[done]]
+        neurons, t = neurons[running], t[running]
+        moved = run_lengths[running] > 0
+        t[moved] = intensity.to_time(end_positions[running][moved], neurons[moved])
+        if not len(neurons):
+            break
+
+        # Burst episodes at the current rate
+        if clip_bursts:
+            windows = np.minimum(t + burst_duration, duration) - t
+        else:
+            windows = np.full(len(t), float(burst_duration))
+        burst_rates = intensity.rate_at(t, neurons) * (2 + 3 * bursting)  # Higher rate in burst
+        spikes, spike_owners, elapsed = _population_bursts(
+            t, windows, burst_rates, neurons, regularity, refractory_period, rng
+        )
+        burst_spikes += spikes
+        burst_owners += spike_owners
+
+        # Inter-burst interval
+        t = t + elapsed + interburst_interval * (0.5 + rng.random(len(neurons)))
+        running = t < duration
+        resume[neurons[~running]] = t[~running]
+        neurons, t = neurons[running], t[running]
+
+    return positions, owners, burst_spikes, burst_owners, resume, overshoot
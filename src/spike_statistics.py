@@ -0,0 +1,188 @@
+"""
+Spike Train Statistics
+======================
+
+Per-neuron firing statistics of every trial of a SpikeTrainSet.
+
+Each statistic is a segment reduction (np.bincount over the owning train)
+over the flat ISI array, so all neurons of all trials are scored in a fixed
+number of array passes. Results are (n_trials, n_neurons) float arrays, NaN
+where a train has too few spikes for the statistic to be defined; callers
+apply their own spike-count criteria through SpikeTrainSet.counts.
+"""
+
+import numpy as np
+
+from spike_train_set import as_spike_train_set
+
+
+def _train_table(values, spike_trains):
+    """Reshape one value per flat train index to (n_trials, n_neurons)"""
+    return values.reshape(spike_trains.shape)
+
+
+def segment_means(values, segment_ids, n_segments):
+    """Mean of values per segment (NaN for empty segments) and the segment sizes"""
+    sizes = np.bincount(segment_ids, minlength=n_segments)
+    sums = np.bincount(segment_ids, values, minlength=n_segments)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / sizes, sizes
+
+
+def segment_histograms(values, segment_ids, n_segments, n_bins):
+    """
+    np.histogram(segment, bins=n_bins)[0] of every segment of a flat array
+
+    Each segment is binned over its own range, exactly as np.histogram does.
+
+    Returns:
+    --------
+    np.ndarray : int64, shape (n_segments, n_bins); all zero for empty segments
+    """
+    values = np.asarray(values, dtype=float)
+    segment_ids = np.asarray(segment_ids, dtype=np.int64)
+    first = np.full(n_segments, np.inf)
+    last = np.full(n_segments, -np.inf)
+    np.minimum.at(first, segment_ids, values)
+    np.maximum.at(last, segment_ids, values)
+    empty = np.isinf(first)
+    first[empty], last[empty] = 0.0, 1.0
+    flat = first == last
+    first[flat] -= 0.5
+    last[flat] += 0.5
+    edges = np.linspace(first, last, n_bins + 1, axis=1)
+
+    # Same bin assignment (and edge corrections) as np.histogram's uniform-bin path
+    first, width = first[segment_ids], (last - first)[segment_ids]
+    indices = ((values - first) / width * n_bins).astype(np.intp)
+    indices[indices == n_bins] -= 1
+    indices -= values < edges[segment_ids, indices]
+    indices += (values >= edges[segment_ids, indices + 1]) & (indices != n_bins - 1)
+
+    return np.bincount(segment_ids * n_bins + indices,
+                       minlength=n_segments * n_bins).reshape(n_segments, n_bins)
+
+
+def isi_moments(spike_trains):
+    """
+    Number, mean and (population) standard deviation of each train's ISIs
+
+    Returns:
+    --------
+    n_isis, mean_isi, isi_std : np.ndarray
+        Shape (n_trials, n_neurons); mean and std are NaN without ISIs
+    """
+    spike_trains = as_spike_train_set(spike_trains)
+    n_trains = spike_trains.counts.size
+    isis, train_ids = spike_trains.isis()
+    means, n_isis = segment_means(isis, train_ids, n_trains)
+    squares, _ = segment_means((isis - means[train_ids])**2, train_ids, n_trains)
+    return (_train_table(n_isis, spike_trains), _train_table(means, spike_trains),
+            _train_table(np.sqrt(squares), spike_trains))
+
+
+def isi_cv(spike_trains, offset=0.0):
+    """
+    ISI coefficient of variation, std / (mean + offset), of each train
+
+    NaN for trains with fewer than 2 ISIs or a zero denominator.
+    """
+    n_isis, means, stds = isi_moments(spike_trains)
+    denominator = means + offset
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where((n_isis > 1) & (denominator != 0), stds / denominator, np.nan)
+
+
+def _consecutive_isi_pairs(spike_trains):
+    """Consecutive ISI pairs of the same train and the train of each pair"""
+    isis, train_ids = as_spike_train_set(spike_trains).isis()
+    same_train = train_ids[1:] == train_ids[:-1]
+    return isis[:-1][same_train], isis[1:][same_train], train_ids[1:][same_train]
+
+
+def local_variation(spike_trains):
+    """
+    Local variation LV (Shinomoto et al.) of each train
+
+    Mean of 3 (I_k - I_k+1)^2 / (I_k + I_k+1)^2 over consecutive ISI pairs
+    with a positive sum; NaN for trains without such pairs.
+    """
+    spike_trains = as_spike_train_set(spike_trains)
+    first, second, train_ids = _consecutive_isi_pairs(spike_trains)
+    total = first + second
+    positive = total > 0
+    terms = 3 * (first - second)[positive]**2 / total[positive]**2
+    lv, _ = segment_means(terms, train_ids[positive], spike_trains.counts.size)
+    return _train_table(lv, spike_trains)
+
+
+def cv2(spike_trains):
+    """
+    CV2 (Holt et al.) of each train
+
+    Mean of 2 |I_k+1 - I_k| / (I_k+1 + I_k) over consecutive ISI pairs with
+    a positive sum; NaN for trains without such pairs.
+    """
+    spike_trains = as_spike_train_set(spike_trains)
+    first, second, train_ids = _consecutive_isi_pairs(spike_trains)
+    total = first + second
+    positive = total > 0
+    terms = 2 * np.abs(second - first)[positive] / total[positive]
+    values, _ = segment_means(terms, train_ids[positive], spike_trains.counts.size)
+    return _train_table(values, spike_trains)
+
+
+def window_counts(spike_trains, window_size, duration):
+    """
+    Spike counts of each train in consecutive windows of window_size
+
+    Windows start at 0; int(duration / window_size) full windows are counted.
+
+    Returns:
+    --------
+    np.ndarray : shape (n_trials, n_neurons, n_windows)
+    """
+    n_windows = int(duration / window_size)
+    return as_spike_train_set(spike_trains).bin_counts(np.arange(n_windows + 1) * window_size)
+
+
+def fano_factor(counts):
+    """
+    Fano factor (variance / mean of counts over the last axis)
+
+    Parameters:
+    -----------
+    counts : np.ndarray
+        Window counts, e.g. from window_counts or a BinnedCounts grid
+
+    Returns:
+    --------
+    np.ndarray : counts.shape[:-1]; NaN with fewer than 2 windows or a zero mean
+    """
+    counts = np.asarray(counts, dtype=float)
+    if counts.shape[-1] < 2:
+        return np.full(counts.shape[:-1], np.nan)
+    means = counts.mean(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(means > 0, counts.var(axis=-1) / means, np.nan)
+
+
+def isi_entropy(spike_trains, n_bins=10):
+    """
+    Entropy (nats) of each train's ISI histogram over its own ISI range
+
+    Probabilities get 1e-10 added before normalization, as in the analyzer's
+    stats.entropy(prob + 1e-10). NaN for trains without ISIs.
+    """
+    spike_trains = as_spike_train_set(spike_trains)
+    n_trains = spike_trains.counts.size
+    isis, train_ids = spike_trains.isis()
+    hist = segment_histograms(isis, train_ids, n_trains, n_bins).astype(float)
+
+    totals = hist.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prob = hist / totals + 1e-10
+    prob /= prob.sum(axis=1, keepdims=True)
+    entropy = -np.sum(prob * np.log(prob), axis=1)
+    entropy[totals[:, 0] == 0] = np.nan
+    return _train_table(entropy, spike_trains)
@@ -0,0 +1,471 @@
+"""
+Columnar Spike Store
+====================
+
+On-disk format for spike recordings: one directory per recording holding a
+raw .npy file per column (spike_times, unit_ids, event_times, event_labels,
+...) and a metadata.json sidecar. Opening a recording memory-maps the columns,
+so even multi-GB recordings open instantly and only the pages that are
+actually touched are read from disk.
+
+    data/neural_data_mixed_coding/
+        spike_times.npy
+        unit_ids.npy
+        event_times.npy
+        event_labels.npy
+        metadata.json
+"""
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+from dataset_cache import _to_json
+from spike_codec import CODEC_COLUMNS, decode_time_columns, encode_time_columns
+
+STORE_FORMAT = 'columnar-spikes'
+STORE_VERSION = 1
+
+# Columns every recording has; any other array in the data dict is stored too
+RECORDING_COLUMNS = ('spike_times', 'unit_ids', 'event_times', 'event_labels')
+
+# Rows parsed per block when streaming CSV files (~16 MB of parsed columns)
+CSV_CHUNK_ROWS = 1_000_000
+
+
+def _restore_int_keys(value):
+    """Undo JSON's conversion of integer dict keys (e.g. unit ids) to strings"""
+    if isinstance(value, dict):
+        if value and all(isinstance(key, str) and key.lstrip('-').isdigit() for key in value):
+            return {int(key): _restore_int_keys(item) for key, item in value.items()}
+        return {key: _restore_int_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_restore_int_keys(item) for item in value]
+    return value
+
+
+def is_columnar_recording(path):
+    """True if `path` is a recording directory written by write_recording"""
+    return (Path(path) / 'metadata.json').is_file()
+
+
+def _npy_header(dtype, length, header_bytes):
+    """npy v1.0 header for a 1-D array, space-padded to exactly header_bytes"""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+        np.lib.format.dtype_to_descr(dtype), length)
+    padding = header_bytes - len(np.lib.format.MAGIC_PREFIX) - 4 - len(header) - 1
+    if padding < 0:
+        raise ValueError("npy header does not fit the reserved space")
+    header = (header + ' ' * padding + '\n').encode('latin1')
+    return np.lib.format.MAGIC_PREFIX + bytes([1, 0]) + len(header).to_bytes(2, 'little') + header
+
+
+class ColumnWriter:
+    """Append-only writer of a 1-D .npy file whose final length is not known up front"""
+
+    # Room for the header of any 1-D shape; npy headers are padded to 64 bytes
+    HEADER_BYTES = 128
+
+    def __init__(self, path, dtype):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        if self.dtype.hasobject:
+            raise ValueError("object columns cannot be stored")
+        self.length = 0
+        self._file = open(self.path, 'wb')
+        self._file.write(_npy_header(self.dtype, 2**63 - 1, self.HEADER_BYTES))
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype).ravel()
+        values.tofile(self._file)
+        self.length += len(values)
+
+    def close(self):
+        """Write the final shape into the header"""
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self.length, self.HEADER_BYTES))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordingWriter:
+    """
+    Build a columnar recording incrementally, chunk by chunk.
+
+    Columns are written to a temporary directory next to the target and the
+    finished recording is renamed into place by close(), so readers never see
+    a partial store and the data never has to fit in memory at once.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+        -----------
+        path : str or Path
+            Recording directory; an existing recording there is replaced on close
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_dir = Path(tempfile.mkdtemp(prefix=f".{self.path.name}-", dir=self.path.parent))
+        self._columns = {}
+
+    def append(self, **columns):
+        """Append a chunk to each named column (created with the chunk's dtype)"""
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if values.dtype == object:
+                values = values.astype(str)
+            if name not in self._columns:
+                self._columns[name] = ColumnWriter(self._tmp_dir / f"{name}.npy", values.dtype)
+            self._columns[name].append(values)
+
+    def close(self, metadata=None, time_encoding=None):
+        """
+        Finish all columns, write metadata.json and move the recording into place.
+
+        time_encoding is the codec description from encode_time_columns when
+        the spike times were stored as ticks.
+        """
+        codec = time_encoding['codec'] if time_encoding else None
+        required = CODEC_COLUMNS[codec] + tuple(name for name in RECORDING_COLUMNS
+                                                if name not in CODEC_COLUMNS[None])
+        missing = [name for name in required if name not in self._columns]
+        if missing:
+            self.abort()
+            raise ValueError(f"Recording is missing columns: {missing}")
+
+        for writer in self._columns.values():
+            writer.close()
+        sidecar = {
+            'format': STORE_FORMAT,
+            'version': STORE_VERSION,
+            'columns': {name: {'dtype': writer.dtype.str, 'shape': [writer.length]}
+                        for name, writer in self._columns.items()},
+            'metadata': metadata or {},
+        }
+        if time_encoding:
+            sidecar['time_encoding'] = time_encoding
+        with open(self._tmp_dir / 'metadata.json', 'w') as f:
+            json.dump(sidecar, f, indent=2, default=_to_json)
+
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(self._tmp_dir, self.path)
+        return self.path
+
+    def abort(self):
+        for writer in self._columns.values():
+            writer.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None:
+            self.abort()
+
+
+def write_recording(data, path, time_encoding=None, allow_rounding=False):
+    """
+    Write a recording dict as a columnar store directory.
+
+    Parameters:
+    -----------
+    data : dict
+        'spike_times', 'unit_ids', 'event_times', 'event_labels' arrays (plus
+        any other 1-D arrays) and an optional 'metadata' dict
+    path : str or Path
+        Recording directory; an existing recording there is replaced
+    time_encoding : str or None
+        Store spike times as float64 seconds (None), int sample 'ticks' or
+        per-unit 'delta-varint' streams (see spike_codec); the tick codecs
+        need metadata['sampling_rate'] and store unit_ids in the smallest
+        integer dtype that fits
+    allow_rounding : bool
+        Let the tick codecs round spike times that are not on the sampling
+        grid to the nearest tick (the largest error is recorded in the
+        sidecar). Without it such recordings raise a ValueError instead of
+        being stored lossily.
+
+    Returns:
+    --------
+    Path : the recording directory
+    """
+    columns = {name: value for name, value in data.items() if name != 'metadata'}
+    metadata = data.get('metadata') or {}
+    encoding = None
+    if time_encoding is not None:
+        columns, encoding = encode_time_columns(columns, time_encoding, metadata.get('sampling_rate'),
+                                                allow_rounding)
+
+    with RecordingWriter(path) as writer:
+        writer.append(**columns)
+        return writer.close(metadata, time_encoding=encoding)
+
+
+def open_recording(path, mmap_mode='r', columns=None, decode_times=True):
+    """
+    Open a columnar recording without reading the spike data.
+
+    Parameters:
+    -----------
+    path : str or Path
+        Recording directory
+    mmap_mode : str or None
+        np.load memory-map mode ('r' read-only, 'c' copy-on-write, None to
+        read the columns into memory)
+    columns : list of str or None
+        Stored columns to open (default: all)
+    decode_times : bool
+        For tick-encoded recordings, also return float64 'spike_times' (read
+        into memory); 'spike_ticks' is always returned
+
+    Returns:
+    --------
+    dict : the same layout as the data dicts of generate_synthetic_data -- one
+        array per column plus 'metadata'
+    """
+    path = Path(path)
+    with open(path / 'metadata.json') as f:
+        sidecar = json.load(f)
+    if sidecar.get('format') != STORE_FORMAT:
+        raise ValueError(f"{path} is not a columnar spike recording")
+    if sidecar.get('version', 0) > STORE_VERSION:
+        raise ValueError(f"{path} was written by a newer store version ({sidecar['version']})")
+
+    names = list(sidecar['columns']) if columns is None else list(columns)
+    recording = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+                 for name in names}
+    if 'time_encoding' in sidecar and set(CODEC_COLUMNS[sidecar['time_encoding']['codec']]) <= set(names):
+        recording = decode_time_columns(recording, sidecar['time_encoding'], decode_times)
+    recording['metadata'] = _restore_int_keys(sidecar['metadata'])
+    return recording
+
+
+def _events_csv_path(csv_path):
+    return csv_path.with_name(f"{csv_path.stem}_events.csv")
+
+
+def _read_events_csv(csv_path):
+    """Event columns of the `<name>_events.csv` written next to a spike CSV (empty if absent)"""
+    import pandas as pd
+    events_path = _events_csv_path(Path(csv_path))
+    if not events_path.exists():
+        return {'event_times': np.empty(0), 'event_labels': np.empty(0, dtype='<U1')}
+    events_df = pd.read_csv(events_path, float_precision='round_trip')
+    return {'event_times': events_df['event_times'].to_numpy(dtype=float),
+            'event_labels': events_df['event_labels'].to_numpy().astype(str)}
+
+
+def iter_csv_chunks(path, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Parse a `spike_times,unit_ids` CSV in blocks of at most chunk_rows rows.
+
+    Yields:
+    -------
+    (spike_times, unit_ids) : float64 and int64 arrays of one block
+    """
+    import pandas as pd
+    reader = pd.read_csv(path, usecols=['spike_times', 'unit_ids'],
+                         dtype={'spike_times': np.float64, 'unit_ids': np.int64},
+                         chunksize=chunk_rows, engine='c',
+                         float_precision='round_trip')  # Exact float64 back from repr() text
+    with reader:
+        for chunk in reader:
+            yield chunk['spike_times'].to_numpy(), chunk['unit_ids'].to_numpy()
+
+
+class _IngestStats:
+    """Row count, time-order check and throughput of a streamed CSV"""
+
+    def __init__(self):
+        self.rows = 0
+        self.is_sorted = True
+        self._last_time = -np.inf
+        self._start = time.perf_counter()
+
+    def update(self, spike_times):
+        if len(spike_times):
+            self.is_sorted = self.is_sorted and bool(
+                spike_times[0] >= self._last_time and np.all(spike_times[1:] >= spike_times[:-1]))
+            self._last_time = spike_times[-1]
+        self.rows += len(spike_times)
+
+    def summary(self):
+        seconds = time.perf_counter() - self._start
+        return {'rows': self.rows, 'seconds': seconds,
+                'rows_per_second': self.rows / seconds if seconds > 0 else float('inf'),
+                'sorted_input': self.is_sorted}
+
+    def report(self, path):
+        stats = self.summary()
+        print(f"   📥 {path}: {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_second']:,.0f} rows/s)")
+        return stats
+
+
+def read_spike_csv(path, chunk_rows=CSV_CHUNK_ROWS, verbose=False):
+    """
+    Read a spike CSV (and its _events.csv) into memory, block by block.
+
+    Spikes are returned sorted by time. The result has to fit in memory; use
+    csv_to_recording to ingest files larger than RAM with bounded memory.
+
+    Returns:
+    --------
+    dict : 'spike_times', 'unit_ids', 'event_times', 'event_labels' and
+        'metadata' (with the ingest throughput under 'ingest')
+    """
+    path = Path(path)
+    stats = _IngestStats()
+    time_chunks, unit_chunks = [], []
+    for spike_times, unit_ids in iter_csv_chunks(path, chunk_rows):
+        stats.update(spike_times)
+        time_chunks.append(spike_times)
+        unit_chunks.append(unit_ids)
+
+    spike_times = np.concatenate(time_chunks) if time_chunks else np.empty(0)
+    unit_ids = np.concatenate(unit_chunks) if unit_chunks else np.empty(0, dtype=np.int64)
+    del time_chunks, unit_chunks
+    if not stats.is_sorted:
+        order = np.argsort(spike_times, kind='stable')
+        spike_times, unit_ids = spike_times[order], unit_ids[order]
+
+    summary = stats.report(path) if verbose else stats.summary()
+    data = {'spike_times': spike_times, 'unit_ids': unit_ids, **_read_events_csv(path)}
+    data['metadata'] = {'source': str(path), 'ingest': summary}
+    return data
+
+
+def csv_to_recording(csv_path, destination=None, chunk_rows=CSV_CHUNK_ROWS,
+                     metadata=None, verbose=True):
+    """
+    Convert a spike CSV into a columnar recording in one streaming pass.
+
+    Blocks are appended to the store as they are parsed, so the CSV may be
+    larger than RAM. Files that are not sorted by spike time (the generator
+    always writes them sorted) get one extra pass that reorders the stored
+    columns; that pass holds an int64 permutation of all rows in memory.
+
+    Parameters:
+    -----------
+    csv_path : str or Path
+        `spike_times,unit_ids` CSV; a `<name>_events.csv` next to it is included
+    destination : str or Path or None
+        Recording directory (default: the CSV path without its suffix)
+    chunk_rows : int
+        Rows parsed per block
+    metadata : dict or None
+        Recording metadata (e.g. sampling_rate) stored in the sidecar
+    verbose : bool
+        Print the ingest throughput
+
+    Returns:
+    --------
+    Path : the recording directory
+    """
+    csv_path = Path(csv_path)
+    destination = Path(destination) if destination is not None else csv_path.with_suffix('')
+    metadata = {**(metadata or {}), 'source': str(csv_path)}
+
+    stats = _IngestStats()
+    with RecordingWriter(destination) as writer:
+        writer.append(spike_times=np.empty(0), unit_ids=np.empty(0, dtype=np.int64))
+        for spike_times, unit_ids in iter_csv_chunks(csv_path, chunk_rows):
+            stats.update(spike_times)
+            writer.append(spike_times=spike_times, unit_ids=unit_ids)
+        writer.append(**_read_events_csv(csv_path))
+        metadata['ingest'] = stats.report(csv_path) if verbose else stats.summary()
+        writer.close(metadata)
+
+    if not stats.is_sorted:
+        _sort_recording(destination, chunk_rows)
+    return destination
+
+
+def _sort_recording(path, chunk_rows=CSV_CHUNK_ROWS):
+    """Rewrite a recording with its spike columns ordered by spike time"""
+    recording = open_recording(path)
+    order = np.argsort(recording['spike_times'], kind='stable')
+    spike_columns = [name for name, column in recording.items()
+                     if name != 'metadata' and len(column) == len(order)
+                     and not name.startswith('event_')]
+
+    with RecordingWriter(path) as writer:
+        for start in range(0, len(order), chunk_rows):
+            block = order[start:start + chunk_rows]
+            writer.append(**{name: recording[name][block] for name in spike_columns})
+        writer.append(**{name: recording[name] for name in recording
+                         if name != 'metadata' and name not in spike_columns})
+        return writer.close(recording['metadata'])
+
+
+def load_recording(path, mmap_mode='r'):
+    """
+    Load a recording saved in any of the data/ formats.
+
+    Columnar directories are memory-mapped; .npz and .pkl files are read into
+    memory as before and .csv files are parsed block by block.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return open_recording(path, mmap_mode=mmap_mode)
+
+    suffix = path.suffix.lower()
+    if suffix == '.npz':
+        with np.load(path, allow_pickle=True) as npz:
+            data = {name: npz[name] for name in npz.files}
+        if 'metadata' in data:
+            data['metadata'] = data['metadata'].item()
+        return data
+    if suffix == '.pkl':
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    if suffix == '.csv':
+        return read_spike_csv(path)
+    raise ValueError(f"Unknown recording format: {path}")
+
+
+def convert_recording(source, destination=None, time_encoding=None, allow_rounding=False):
+    """
+    Convert an .npz/.pkl/.csv recording to a columnar store (default: next to it)
+
+    time_encoding and allow_rounding are passed to write_recording.
+    """
+    source = Path(source)
+    if destination is None:
+        destination = source.with_suffix('')
+    if source.suffix.lower() == '.csv' and time_encoding is None:
+        return csv_to_recording(source, destination)
+    return write_recording(load_recording(source, mmap_mode=None), destination, time_encoding,
+                           allow_rounding)
+
+
+def convert_data_folder(data_dir="data"):
+    """Convert every .npz recording in data_dir that has no columnar store yet"""
+    converted = []
+    for source in sorted(Path(data_dir).glob("*.npz")):
+        destination = source.with_suffix('')
+        if is_columnar_recording(destination):
+            continue
+        converted.append(convert_recording(source, destination))
+        print(f"   💾 Converted: {source} -> {destination}/")
+    return converted
+
+
+if __name__ == "__main__":
+    import sys
+    convert_data_folder(sys.argv[1] if len(sys.argv) > 1 else "data")
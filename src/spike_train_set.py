@@ -0,0 +1,651 @@
+"""
+Spike Train Container
+=====================
+
+Ragged (CSR-style) storage for spike data: the spike times of every trial and
+neuron live in one contiguous float array, indexed by an (n_trials,
+n_neurons + 1) offsets table. Per-trial and per-neuron accessors return views
+into that array, and the container indexes and iterates like the older
+`spike_trains[trial][neuron] -> np.ndarray` nested lists, so existing code
+keeps working while analysis code can reduce over the flat array directly.
+
+UnitSpikeIndex groups a flat recording (spike_times, unit_ids) by unit once,
+so event-aligned trials are cut by binary search.
+
+BinnedCounts bins a SpikeTrainSet once on a fine base grid; coarser grids
+are reshape-sums of that cube rather than fresh passes over the spikes.
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+
+# Aligned spikes gathered per pass in UnitSpikeIndex.align
+ALIGN_CHUNK_SPIKES = 1 << 22
+
+
+def bin_indices(spike_times, edges):
+    """Histogram bin of each spike (np.histogram semantics), -1 when outside the edges"""
+    bin_idx = np.searchsorted(edges, spike_times, side='right') - 1
+    n_bins = len(edges) - 1
+    bin_idx[spike_times == edges[-1]] = n_bins - 1  # Last bin is closed
+    bin_idx[(bin_idx < 0) | (bin_idx >= n_bins)] = -1
+    return bin_idx
+
+
+class TrialSpikes:
+    """Spike trains of one trial: a list-like view of per-neuron spike arrays"""
+
+    def __init__(self, spike_times, offsets):
+        """
+        Parameters:
+        -----------
+        spike_times : np.ndarray
+            Spike times of all neurons, neuron by neuron
+        offsets : np.ndarray
+            Neuron i owns spike_times[offsets[i]:offsets[i + 1]], offsets[0] == 0
+        """
+        self.spike_times = spike_times
+        self.offsets = offsets
+
+    @property
+    def n_neurons(self):
+        return len(self.offsets) - 1
+
+    @property
+    def counts(self):
+        """Spike count of each neuron"""
+        return np.diff(self.offsets)
+
+    @property
+    def neuron_ids(self):
+        """Owning neuron of each spike in spike_times"""
+        return np.repeat(np.arange(self.n_neurons), self.counts)
+
+    def neuron(self, neuron_idx):
+        """Spike times of one neuron (a view)"""
+        return self.spike_times[self.offsets[neuron_idx]:self.offsets[neuron_idx + 1]]
+
+    def isis(self):
+        """Inter-spike intervals of all neurons, neuron by neuron, and their owners"""
+        if len(self.spike_times) < 2:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        neuron_ids = self.neuron_ids
+        within_train = neuron_ids[1:] == neuron_ids[:-1]
+        return np.diff(self.spike_times)[within_train], neuron_ids[1:][within_train]
+
+    def bin_counts(self, edges, dtype=np.int64):
+        """Spike counts per neuron and time bin, shape (n_neurons, len(edges) - 1)"""
+        n_bins = len(edges) - 1
+        bin_idx = bin_indices(self.spike_times, edges)
+        inside = bin_idx >= 0
+        flat_idx = self.neuron_ids[inside] * n_bins + bin_idx[inside]
+        counts = np.bincount(flat_idx, minlength=self.n_neurons * n_bins)
+        return counts.reshape(self.n_neurons, n_bins).astype(dtype, copy=False)
+
+    def to_list(self):
+        """Per-neuron spike arrays as a plain list (views)"""
+        return np.split(self.spike_times, self.offsets[1:-1])
+
+    def __len__(self):
+        return self.n_neurons
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.neuron(i) for i in range(*idx.indices(self.n_neurons))]
+        if idx < 0:
+            idx += self.n_neurons
+        if not 0 <= idx < self.n_neurons:
+            raise IndexError("neuron index out of range")
+        return self.neuron(idx)
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __repr__(self):
+        return f"TrialSpikes(n_neurons={self.n_neurons}, n_spikes={len(self.spike_times)})"
+
+
+class SpikeTrainSet:
+    """Spike trains of all trials and neurons in one contiguous array"""
+
+    def __init__(self, spike_times, offsets):
+        """
+        Parameters:
+        -----------
+        spike_times : np.ndarray
+            All spike times, trial by trial and neuron by neuron
+        offsets : np.ndarray
+            Shape (n_trials, n_neurons + 1): neuron j of trial i owns
+            spike_times[offsets[i, j]:offsets[i, j + 1]]
+        """
+        self.spike_times = np.asarray(spike_times, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if self.offsets.ndim != 2:
+            raise ValueError("offsets must have shape (n_trials, n_neurons + 1)")
+
+    @classmethod
+    def from_trials(cls, trials):
+        """Build from per-trial (spike_times, offsets) layouts with equal neuron counts"""
+        trials = list(trials)
+        if not trials:
+            return cls(np.empty(0), np.zeros((0, 1), dtype=np.int64))
+
+        n_neurons = {len(offsets) - 1 for _, offsets in trials}
+        if len(n_neurons) > 1:
+            raise ValueError("All trials must have the same number of neurons")
+
+        trial_sizes = [offsets[-1] for _, offsets in trials]
+        trial_starts = np.concatenate([[0], np.cumsum(trial_sizes)[:-1]])
+        offsets = np.vstack([offsets for _, offsets in trials]) + trial_starts[:, None]
+        spike_times = np.concatenate([times[:offs[-1]] for times, offs in trials])
+        return cls(spike_times, offsets)
+
+    @classmethod
+    def from_nested(cls, spike_trains):
+        """Build from the nested spike_trains[trial][neuron] -> array layout"""
+        if isinstance(spike_trains, SpikeTrainSet):
+            return spike_trains
+        return cls.from_trials(ragged_layout(trial_spikes) for trial_spikes in spike_trains)
+
+    @property
+    def n_trials(self):
+        return self.offsets.shape[0]
+
+    @property
+    def n_neurons(self):
+        return self.offsets.shape[1] - 1
+
+    @property
+    def shape(self):
+        return (self.n_trials, self.n_neurons)
+
+    @property
+    def counts(self):
+        """Spike count of each (trial, neuron), shape (n_trials, n_neurons)"""
+        return np.diff(self.offsets, axis=1)
+
+    def trial(self, trial_idx):
+        """Spike trains of one trial (views into the flat array)"""
+        offsets = self.offsets[trial_idx]
+        start = offsets[0]
+        return TrialSpikes(self.spike_times[start:offsets[-1]], offsets - start)
+
+    def neuron(self, trial_idx, neuron_idx):
+        """Spike times of one neuron in one trial (a view)"""
+        offsets = self.offsets[trial_idx]
+        return self.spike_times[offsets[neuron_idx]:offsets[neuron_idx + 1]]
+
+    @property
+    def is_compact(self):
+        """True when the trials tile spike_times exactly, in order"""
+        if self.n_trials == 0:
+            return len(self.spike_times) == 0
+        return (self.offsets[0, 0] == 0 and self.offsets[-1, -1] == len(self.spike_times) and
+                np.array_equal(self.offsets[1:, 0], self.offsets[:-1, -1]))
+
+    def compact(self):
+        """Set whose spike_times holds exactly its own spikes (copies only if needed)"""
+        if self.is_compact:
+            return self
+        if self.n_trials == 0:
+            return SpikeTrainSet(np.empty(0), self.offsets)
+        return SpikeTrainSet.from_trials(
+            (self.spike_times[offsets[0]:offsets[-1]], offsets - offsets[0]) for offsets in self.offsets
+        )
+
+    def train_ids(self):
+        """Flat (trial * n_neurons + neuron) index of each spike of a compact set"""
+        counts = self.counts.ravel()
+        return np.repeat(np.arange(len(counts)), counts)
+
+    def owners(self):
+        """Trial and neuron index of each spike of a compact set"""
+        return np.divmod(self.train_ids(), max(self.n_neurons, 1))
+
+    def isis(self):
+        """Inter-spike intervals of every train, concatenated, and their flat train index"""
+        compact = self.compact()
+        if len(compact.spike_times) < 2:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        train_ids = compact.train_ids()
+        within_train = train_ids[1:] == train_ids[:-1]
+        return np.diff(compact.spike_times)[within_train], train_ids[1:][within_train]
+
+    def bin_counts(self, edges, dtype=np.int64):
+        """Spike counts per trial, neuron and time bin, shape (n_trials, n_neurons, len(edges) - 1)"""
+        compact = self.compact()
+        n_bins = len(edges) - 1
+        bin_idx = bin_indices(compact.spike_times, edges)
+        inside = bin_idx >= 0
+        counts = self.counts.ravel()
+        flat_idx = compact.train_ids()[inside] * n_bins + bin_idx[inside]
+        cube = np.bincount(flat_idx, minlength=len(counts) * n_bins)
+        return cube.reshape(self.n_trials, self.n_neurons, n_bins).astype(dtype, copy=False)
+
+    def select_neurons(self, neuron_idx):
+        """
+        Compact set of the given neurons in every trial, gathered in one pass.
+
+        Returns:
+        --------
+        SpikeTrainSet : shape (n_trials, len(neuron_idx))
+        """
+        neuron_idx = np.atleast_1d(np.asarray(neuron_idx, dtype=np.int64))
+        starts = self.offsets[:, neuron_idx]
+        stops = self.offsets[:, neuron_idx + 1]
+        return SpikeTrainSet(self.spike_times[ragged_ranges(starts, stops)],
+                             offsets_from_counts(stops - starts))
+
+    def to_nested(self):
+        """Plain nested lists of per-neuron arrays (views)"""
+        return [self.trial(i).to_list() for i in range(self.n_trials)]
+
+    def __len__(self):
+        return self.n_trials
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return SpikeTrainSet(self.spike_times, self.offsets[idx])
+        if idx < 0:
+            idx += self.n_trials
+        if not 0 <= idx < self.n_trials:
+            raise IndexError("trial index out of range")
+        return self.trial(idx)
+
+    def __iter__(self):
+        for trial_idx in range(self.n_trials):
+            yield self.trial(trial_idx)
+
+    def __repr__(self):
+        return (f"SpikeTrainSet(n_trials={self.n_trials}, n_neurons={self.n_neurons}, "
+                f"n_spikes={int(self.counts.sum())})")
+
+
+def ragged_layout(trial_spikes):
+    """(spike_times, offsets) layout of one trial's spike trains"""
+    if isinstance(trial_spikes, TrialSpikes):
+        return trial_spikes.spike_times, trial_spikes.offsets
+    trial_spikes = [np.asarray(spikes, dtype=float).ravel() for spikes in trial_spikes]
+    offsets = np.zeros(len(trial_spikes) + 1, dtype=np.int64)
+    np.cumsum([len(spikes) for spikes in trial_spikes], out=offsets[1:])
+    spike_times = np.concatenate(trial_spikes) if trial_spikes else np.empty(0)
+    return spike_times, offsets
+
+
+def ragged_ranges(starts, stops):
+    """Flat indices of the concatenated ranges [starts[i], stops[i])"""
+    starts = np.asarray(starts, dtype=np.int64).ravel()
+    counts = np.asarray(stops, dtype=np.int64).ravel() - starts
+    range_starts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) + np.repeat(starts - range_starts, counts)
+
+
+def offsets_from_counts(counts):
+    """(n_rows, n_cols + 1) SpikeTrainSet offsets for a row-major table of counts"""
+    counts = np.asarray(counts, dtype=np.int64)
+    n_rows, n_cols = counts.shape
+    flat = np.zeros(counts.size + 1, dtype=np.int64)
+    np.cumsum(counts.ravel(), out=flat[1:])
+    return flat[np.arange(n_rows)[:, None] * n_cols + np.arange(n_cols + 1)]
+
+
+class UnitSpikeIndex:
+    """
+    Spike times of a recording grouped by unit, each unit sorted in time.
+
+    Built once from the flat (spike_times, unit_ids) columns of a recording;
+    afterwards the spikes of any unit in any time window are found by binary
+    search instead of scanning the recording.
+    """
+
+    def __init__(self, spike_times, unit_ids):
+        """
+        Parameters:
+        -----------
+        spike_times : np.ndarray
+            Spike times of all units (s), any order
+        unit_ids : np.ndarray
+            Unit of each spike
+        """
+        spike_times = np.asarray(spike_times, dtype=float)
+        unit_ids = np.asarray(unit_ids)
+        if len(spike_times) != len(unit_ids):
+            raise ValueError("spike_times and unit_ids must have the same length")
+
+        # Recordings are stored in time order, so usually only a stable
+        # sort by unit is needed (a linear-time radix sort for small id ranges)
+        order = None
+        if np.any(spike_times[1:] < spike_times[:-1]):
+            order = np.argsort(spike_times, kind='stable')
+            spike_times, unit_ids = spike_times[order], unit_ids[order]
+
+        if len(unit_ids) and unit_ids.dtype.kind in 'iu' and unit_ids.max() - unit_ids.min() < 2**16:
+            # Wrapping casts give unit_ids - min_id without an int64 temporary
+            min_id = unit_ids.min()
+            codes = unit_ids.astype(np.uint16)
+            codes -= np.uint16(min_id % 2**16)
+            unit_counts = np.bincount(codes)
+            self.units = np.flatnonzero(unit_counts) + min_id
+            counts = unit_counts[unit_counts > 0]
+        else:
+            self.units, codes, counts = np.unique(unit_ids, return_inverse=True, return_counts=True)
+
+        unit_order = np.argsort(codes, kind='stable')
+        self.spike_times = spike_times[unit_order]
+        self.offsets = np.zeros(len(self.units) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.columns = {unit_id.item(): col for col, unit_id in enumerate(self.units)}
+
+    @property
+    def n_units(self):
+        return len(self.units)
+
+    @property
+    def counts(self):
+        """Spike count of each unit"""
+        return np.diff(self.offsets)
+
+    def unit(self, unit_id):
+        """All spike times of one unit (a view)"""
+        col = self.columns[unit_id]
+        return self.spike_times[self.offsets[col]:self.offsets[col + 1]]
+
+    def window_bounds(self, event_times, pre_time, post_time):
+        """
+        Index range of every unit's spikes in [event - pre_time, event + post_time).
+
+        Returns:
+        --------
+        starts, stops : np.ndarray
+            Shape (n_events, n_units), positions in self.spike_times
+        """
+        event_times = np.asarray(event_times, dtype=float)
+        starts = np.empty((len(event_times), self.n_units), dtype=np.int64)
+        stops = np.empty_like(starts)
+        for col in range(self.n_units):
+            first, last = self.offsets[col], self.offsets[col + 1]
+            unit_times = self.spike_times[first:last]
+            starts[:, col] = first + np.searchsorted(unit_times, event_times - pre_time, side='left')
+            stops[:, col] = first + np.searchsorted(unit_times, event_times + post_time, side='left')
+        return starts, stops
+
+    def align(self, event_times, pre_time, post_time):
+        """
+        Event-aligned spikes of all units as a (n_events, n_units) SpikeTrainSet.
+
+        Spike times are relative to their event. They are gathered into one
+        new buffer, a block of events at a time, and every trial and unit
+        accessor of the result is a view into it.
+        """
+        event_times = np.asarray(event_times, dtype=float)
+        starts, stops = self.window_bounds(event_times, pre_time, post_time)
+        counts = stops - starts
+        offsets = offsets_from_counts(counts)
+        trial_sizes = counts.sum(axis=1)
+
+        # Gather blocks of events of about ALIGN_CHUNK_SPIKES spikes, so the
+        # index temporaries stay bounded however often windows overlap
+        trial_ends = np.cumsum(trial_sizes)
+        n_aligned = trial_ends[-1] if len(trial_ends) else 0
+        spike_times = np.empty(n_aligned)
+        chunk_ends = np.searchsorted(trial_ends, np.arange(ALIGN_CHUNK_SPIKES, n_aligned, ALIGN_CHUNK_SPIKES),
+                                     side='right')
+        bounds = np.unique(np.concatenate([[0], chunk_ends, [len(event_times)]]))
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            block = spike_times[offsets[first, 0]:offsets[last - 1, -1]]
+            block[:] = self.spike_times[ragged_ranges(starts[first:last], stops[first:last])]
+            block -= np.repeat(event_times[first:last], trial_sizes[first:last])
+        return SpikeTrainSet(spike_times, offsets)
+
+    def __repr__(self):
+        return f"UnitSpikeIndex(n_units={self.n_units}, n_spikes={len(self.spike_times)})"
+
+
+class TrialData(Sequence):
+    """
+    Event-aligned trials, unit-keyed.
+
+    A dense (trial, unit) ragged table of event-relative spike times with a
+    unit id -> column index, which also reads as a list of trial dicts
+    ('trial_id', 'event_time', 'event_label', 'pre_time', 'post_time',
+    'units', 'unit_index') as produced by SpikeDataLoader.create_trials.
+    The dicts are built from the table when a trial is accessed, with spike
+    arrays that are views into it, so cutting trials costs no Python work
+    per trial or unit. Per-unit extraction across all trials is a single
+    gather instead of a scan through every trial's unit list.
+    """
+
+    def __init__(self, spikes, unit_ids, event_times, event_labels, pre_time=None, post_time=None,
+                 present=None):
+        """
+        Parameters:
+        -----------
+        spikes : SpikeTrainSet
+            Shape (n_trials, n_units): spike times relative to each event
+        unit_ids : np.ndarray
+            Unit id of each column
+        event_times : np.ndarray
+            Event time of each trial (s)
+        event_labels : np.ndarray
+            Label of each trial
+        pre_time, post_time : float or None
+            Trial window around the events (s)
+        present : np.ndarray or None
+            (n_trials, n_units) bool, False where a trial had no entry for a
+            unit (default: all present)
+        """
+        self.spikes = spikes
+        self.unit_ids = np.asarray(unit_ids)
+        self.unit_index = {unit_id.item(): col for col, unit_id in enumerate(self.unit_ids)}
+        self.present = np.ones(spikes.shape, dtype=bool) if present is None else present
+        self.event_times = np.asarray(event_times, dtype=float)
+        self.event_labels = np.asarray(event_labels)
+        self.pre_time = pre_time
+        self.post_time = post_time
+        self._trials = None  # Trial dicts given to from_trials, returned as they are
+
+    @classmethod
+    def from_trials(cls, trials):
+        """Build from a plain list of trial dicts (returned unchanged if already TrialData)"""
+        if isinstance(trials, TrialData):
+            return trials
+        trials = list(trials)
+        unit_ids = sorted({unit['unit_id'] for trial in trials for unit in trial['units']})
+        unit_index = {unit_id: col for col, unit_id in enumerate(unit_ids)}
+
+        present = np.zeros((len(trials), len(unit_ids)), dtype=bool)
+        nested = []
+        for trial_idx, trial in enumerate(trials):
+            row = [np.empty(0)] * len(unit_ids)
+            for unit in trial['units']:
+                col = unit_index[unit['unit_id']]
+                row[col] = np.sort(np.asarray(unit['spike_times'], dtype=float))
+                present[trial_idx, col] = True
+            nested.append(row)
+        spikes = SpikeTrainSet.from_nested(nested) if nested else \
+            SpikeTrainSet(np.empty(0), np.zeros((0, len(unit_ids) + 1), dtype=np.int64))
+        trial_data = cls(spikes, unit_ids, [trial.get('event_time', np.nan) for trial in trials],
+                         [trial['event_label'] for trial in trials], present=present)
+        trial_data._trials = trials
+        return trial_data
+
+    def trial(self, trial_idx):
+        """Trial dict of one trial; its spike arrays are views into the table"""
+        if self._trials is not None:
+            return self._trials[trial_idx]
+        offsets = self.spikes.offsets[trial_idx]
+        spike_times = self.spikes.spike_times
+        return {
+            'trial_id': trial_idx,
+            'event_time': float(self.event_times[trial_idx]),
+            'event_label': str(self.event_labels[trial_idx]),
+            'pre_time': self.pre_time,
+            'post_time': self.post_time,
+            'units': [{'unit_id': unit_id, 'spike_times': spike_times[offsets[col]:offsets[col + 1]]}
+                      for col, unit_id in enumerate(self.unit_ids.tolist())],
+            'unit_index': self.unit_index,
+        }
+
+    def __len__(self):
+        return self.spikes.n_trials
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.trial(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("trial index out of range")
+        return self.trial(idx)
+
+    def __iter__(self):
+        for trial_idx in range(len(self)):
+            yield self.trial(trial_idx)
+
+    def __repr__(self):
+        return f"TrialData(n_trials={len(self)}, n_units={self.n_units})"
+
+    @property
+    def n_units(self):
+        return len(self.unit_ids)
+
+    def column(self, unit_id):
+        """Column of a unit in the (trial, unit) table"""
+        return self.unit_index[unit_id]
+
+    def unit_trains(self, unit_id):
+        """Spikes of one unit in every trial, as a compact (n_trials, 1) SpikeTrainSet"""
+        return self.spikes.select_neurons([self.column(unit_id)])
+
+    def unit_spikes(self, unit_id):
+        """
+        Every spike of one unit, trial by trial, and the trial of each spike
+
+        Units without an entry in any trial give empty arrays.
+
+        Returns:
+        --------
+        spike_times : np.ndarray
+        trial_idx : np.ndarray
+        """
+        if unit_id not in self.unit_index:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        trains = self.unit_trains(unit_id)
+        return trains.spike_times, trains.train_ids()
+
+
+def count_dtype(max_count):
+    """Smallest unsigned integer dtype that holds max_count"""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_count <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+class BinnedCounts:
+    """
+    Spike counts of a SpikeTrainSet on a base time grid, binned once.
+
+    The (n_trials, n_neurons, n_bins) cube covers [0, duration] (last bin
+    closed) in the smallest unsigned dtype that holds the largest train's
+    spike count. Coarser grids are reshape-sums of the base cube, cached per
+    bin size, so every consumer shares one pass over the spikes.
+    """
+
+    # Cells binned per pass, bounding the int64 scratch space of bin_counts
+    chunk_cells = 2**22
+
+    def __init__(self, spike_trains, duration, bin_size=0.001):
+        """
+        Parameters:
+        -----------
+        spike_trains : SpikeTrainSet or nested spike_trains[trial][neuron]
+        duration : float
+            Trial duration (s); spikes outside [0, duration] are not counted
+        bin_size : float
+            Base bin width (s); coarser bin sizes must be whole multiples
+        """
+        spike_trains = as_spike_train_set(spike_trains)
+        self.duration = duration
+        self.bin_size = bin_size
+        self.n_bins = max(1, int(round(duration / bin_size)))
+
+        counts = spike_trains.counts
+        self.dtype = count_dtype(counts.max() if counts.size else 0)
+        edges = np.arange(self.n_bins + 1) * bin_size
+        edges[-1] = duration
+
+        n_trials, n_neurons = spike_trains.shape
+        self.base = np.zeros((n_trials, n_neurons, self.n_bins), dtype=self.dtype)
+        chunk = max(1, self.chunk_cells // max(n_neurons * self.n_bins, 1))
+        for start in range(0, n_trials, chunk):
+            self.base[start:start + chunk] = spike_trains[start:start + chunk].bin_counts(edges, self.dtype)
+        self.base.flags.writeable = False
+        self._resampled = {1: self.base}
+        self._population = {}
+
+    @property
+    def shape(self):
+        return self.base.shape
+
+    def factor(self, bin_size):
+        """Number of base bins per bin of width bin_size"""
+        factor = int(round(bin_size / self.bin_size))
+        if factor < 1 or not np.isclose(factor * self.bin_size, bin_size):
+            raise ValueError(f"bin_size {bin_size} is not a multiple of the base bin {self.bin_size}")
+        return factor
+
+    def counts(self, bin_size=None):
+        """
+        Counts per trial, neuron and bin of width bin_size (default: base grid)
+
+        The last bin is partial when bin_size does not divide the duration.
+
+        Returns:
+        --------
+        np.ndarray : shape (n_trials, n_neurons, ceil(n_bins / factor)), read-only
+        """
+        factor = 1 if bin_size is None else self.factor(bin_size)
+        if factor not in self._resampled:
+            n_trials, n_neurons, n_bins = self.base.shape
+            n_coarse = -(-n_bins // factor)
+            padded = self.base
+            if n_coarse * factor != n_bins:
+                padded = np.zeros((n_trials, n_neurons, n_coarse * factor), dtype=self.dtype)
+                padded[..., :n_bins] = self.base
+            coarse = padded.reshape(n_trials, n_neurons, n_coarse, factor).sum(axis=-1, dtype=self.dtype)
+            coarse.flags.writeable = False
+            self._resampled[factor] = coarse
+        return self._resampled[factor]
+
+    def population(self, bin_size=None):
+        """Spike counts summed over neurons, shape (n_trials, n_coarse_bins), read-only"""
+        factor = 1 if bin_size is None else self.factor(bin_size)
+        if factor not in self._population:
+            population = self.counts(bin_size).sum(axis=1, dtype=np.int64)
+            population.flags.writeable = False
+            self._population[factor] = population
+        return self._population[factor]
+
+    def __repr__(self):
+        n_trials, n_neurons, n_bins = self.base.shape
+        return (f"BinnedCounts(n_trials={n_trials}, n_neurons={n_neurons}, n_bins={n_bins}, "
+                f"bin_size={self.bin_size}, dtype={np.dtype(self.dtype).name})")
+
+
+def as_trial_data(trials_data):
+    """Return trials_data as TrialData, indexing a plain list of trial dicts if needed"""
+    return TrialData.from_trials(trials_data)
+
+
+def as_spike_train_set(spike_trains):
+    """Return spike_trains as a SpikeTrainSet, converting nested lists if needed"""
+    return SpikeTrainSet.from_nested(spike_trains)
+
+
+def as_trial_spikes(trial_spikes):
+    """Return one trial's spike trains as TrialSpikes, converting a list if needed"""
+    if isinstance(trial_spikes, TrialSpikes):
+        return trial_spikes
+    return TrialSpikes(*ragged_layout(trial_spikes))
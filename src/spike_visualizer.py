@@ -17,6 +17,10 @@ from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from correlogram import unit_correlogram
+from neuron_features import NEURON_FEATURES
+from spike_train_set import as_trial_data
+
 class SpikeVisualizer:
     """
     Class for creating advanced visualizations of neural spike data.
@@ -66,6 +70,39 @@ class SpikeVisualizer:
             'lines.linewidth': 2,
         })
 
+    def _condition_rasters(self, trials_data, unit_id: int) -> Dict:
+        """
+        Raster rows of one unit split into ON and OFF trials.
+        
+        Returns:
+        --------
+        dict : for 'ON' and 'OFF', (spike_times, rows, n_trials) -- every
+            spike of the unit in those trials with its raster row (ON trials
+            first, OFF trials after a one-row gap) and the trial count
+        """
+        trials = as_trial_data(trials_data)
+        if unit_id not in trials.unit_index:
+            empty = (np.empty(0), np.empty(0, dtype=int), 0)
+            return {'ON': empty, 'OFF': empty}
+        
+        spike_times, spike_trial = trials.unit_spikes(unit_id)
+        has_unit = trials.present[:, trials.column(unit_id)]
+        is_on = trials.event_labels == 'ON'
+        on_idx = np.flatnonzero(has_unit & is_on)
+        off_idx = np.flatnonzero(has_unit & ~is_on)
+        
+        rows = np.full(len(trials), -1)
+        rows[on_idx] = np.arange(len(on_idx))
+        rows[off_idx] = len(on_idx) + 1 + np.arange(len(off_idx))
+        spike_rows = rows[spike_trial]
+        
+        rasters = {}
+        for label, condition in (('ON', is_on), ('OFF', ~is_on)):
+            keep = condition[spike_trial] & (spike_rows >= 0)
+            n_trials = len(on_idx) if label == 'ON' else len(off_idx)
+            rasters[label] = (spike_times[keep], spike_rows[keep], n_trials)
+        return rasters
+    
     def plot_raster_psth(self, trials_data: List[Dict], unit_id: int, 
                         bin_size: float = 0.05, smooth_sigma: float = 2.0,
                         figsize: Tuple[int, int] = (14, 10)) -> plt.Figure:
@@ -92,41 +129,21 @@ class SpikeVisualizer:
         fig = plt.figure(figsize=figsize, facecolor=self.bg_color)
         gs = GridSpec(3, 1, height_ratios=[2, 1, 0.3], hspace=0.3)
         
-        # Extract data for this unit
-        on_trials, off_trials = [], []
-        all_spikes_on, all_spikes_off = [], []
-        
-        for i, trial in enumerate(trials_data):
-            unit_data = next((u for u in trial['units'] if u['unit_id'] == unit_id), None)
-            if unit_data is None:
-                continue
-                
-            spikes = unit_data['spike_times']
-            if trial['event_label'] == 'ON':
-                on_trials.append((i, spikes))
-                all_spikes_on.extend(spikes)
-            else:
-                off_trials.append((i, spikes))
-                all_spikes_off.extend(spikes)
+        # Extract data for this unit (one gather across all trials)
+        rasters = self._condition_rasters(trials_data, unit_id)
+        spikes_on, rows_on, n_on = rasters['ON']
+        spikes_off, rows_off, n_off = rasters['OFF']
         
         # Raster plot
         ax_raster = fig.add_subplot(gs[0])
         
-        # Plot ON trials
-        on_y_positions = []
-        for idx, (trial_idx, spikes) in enumerate(on_trials):
-            y_pos = idx
-            on_y_positions.append(y_pos)
-            ax_raster.vlines(spikes, y_pos - 0.4, y_pos + 0.4, 
-                           colors=self.colors['on'], alpha=0.8, linewidth=1.5)
-        
-        # Plot OFF trials  
-        off_y_positions = []
-        for idx, (trial_idx, spikes) in enumerate(off_trials):
-            y_pos = len(on_trials) + idx + 1
-            off_y_positions.append(y_pos)
-            ax_raster.vlines(spikes, y_pos - 0.4, y_pos + 0.4,
-                           colors=self.colors['off'], alpha=0.8, linewidth=1.5)
+        # Plot ON and OFF trials, one vlines call per condition
+        ax_raster.vlines(spikes_on, rows_on - 0.4, rows_on + 0.4, 
+                       colors=self.colors['on'], alpha=0.8, linewidth=1.5)
+        ax_raster.vlines(spikes_off, rows_off - 0.4, rows_off + 0.4,
+                       colors=self.colors['off'], alpha=0.8, linewidth=1.5)
+        on_y_positions = np.arange(n_on)
+        off_y_positions = n_on + 1 + np.arange(n_off)
         
         # Add stimulus onset line
         ax_raster.axvline(0, color='yellow', linewidth=3, alpha=0.8, 
@@ -139,11 +156,11 @@ class SpikeVisualizer:
                           fontsize=16, fontweight='bold', pad=20)
         
         # Add trial type labels
-        if on_y_positions:
+        if n_on:
             ax_raster.text(-0.9, np.mean(on_y_positions), 'ON', 
                           color=self.colors['on'], fontweight='bold', 
                           fontsize=12, va='center')
-        if off_y_positions:
+        if n_off:
             ax_raster.text(-0.9, np.mean(off_y_positions), 'OFF',
                           color=self.colors['off'], fontweight='bold',
                           fontsize=12, va='center')
@@ -158,24 +175,24 @@ class SpikeVisualizer:
         time_centers = time_bins[:-1] + bin_size/2
         
         # ON condition PSTH
-        if all_spikes_on:
-            hist_on, _ = np.histogram(all_spikes_on, bins=time_bins)
-            psth_on = hist_on / (len(on_trials) * bin_size)  # Convert to Hz
+        if len(spikes_on):
+            hist_on, _ = np.histogram(spikes_on, bins=time_bins)
+            psth_on = hist_on / (n_on * bin_size)  # Convert to Hz
             psth_on_smooth = gaussian_filter1d(psth_on, smooth_sigma)
             
             ax_psth.fill_between(time_centers, 0, psth_on_smooth, 
                                alpha=0.7, color=self.colors['on'], 
-                               label=f'ON (n={len(on_trials)})')
+                               label=f'ON (n={n_on})')
         
         # OFF condition PSTH  
-        if all_spikes_off:
-            hist_off, _ = np.histogram(all_spikes_off, bins=time_bins)
-            psth_off = hist_off / (len(off_trials) * bin_size)
+        if len(spikes_off):
+            hist_off, _ = np.histogram(spikes_off, bins=time_bins)
+            psth_off = hist_off / (n_off * bin_size)
             psth_off_smooth = gaussian_filter1d(psth_off, smooth_sigma)
             
             ax_psth.fill_between(time_centers, 0, psth_off_smooth,
                                alpha=0.7, color=self.colors['off'],
-                               label=f'OFF (n={len(off_trials)})')
+                               label=f'OFF (n={n_off})')
         
         # Style PSTH
         ax_psth.axvline(0, color='yellow', linewidth=3, alpha=0.8, linestyle='--')
@@ -293,16 +310,12 @@ class SpikeVisualizer:
         fig.suptitle(f'⚡ Unit {unit_id}: Inter-Spike Interval Analysis', 
                     fontsize=16, fontweight='bold')
         
-        # Extract all ISIs for this unit
-        all_isis = []
-        for trial in trials_data:
-            unit_data = next((u for u in trial['units'] if u['unit_id'] == unit_id), None)
-            if unit_data and len(unit_data['spike_times']) > 1:
-                spikes = np.sort(unit_data['spike_times'])
-                isis = np.diff(spikes)
-                all_isis.extend(isis)
-        
-        all_isis = np.array(all_isis)
+        # Extract all ISIs for this unit (within-trial intervals, all trials at once)
+        trials = as_trial_data(trials_data)
+        if unit_id in trials.unit_index:
+            all_isis, _ = trials.unit_trains(unit_id).isis()
+        else:
+            all_isis = np.empty(0)
         
         if len(all_isis) == 0:
             ax1.text(0.5, 0.5, 'No ISI data available', ha='center', va='center',
@@ -355,17 +368,15 @@ class SpikeVisualizer:
 
     def plot_cross_correlation(self, trials_data: List[Dict], unit1_id: int, 
                              unit2_id: int, max_lag: float = 0.1,
-                             figsize: Tuple[int, int] = (12, 6)) -> plt.Figure:
+                             figsize: Tuple[int, int] = (12, 6),
+                             bin_size: float = 0.001) -> plt.Figure:
         """
         Plot cross-correlation between two units.
         """
-        from spike_analyzer import SpikeAnalyzer
-        analyzer = SpikeAnalyzer()
-        
-        # Calculate cross-correlation
-        lags, xcorr = analyzer.calculate_cross_correlation(trials_data, unit1_id, unit2_id, max_lag)
+        # Cross-correlogram from spike-time lags, summed over trials
+        lags, xcorr = unit_correlogram(trials_data, unit1_id, unit2_id, max_lag, bin_size)
         
-        if len(lags) == 0:
+        if xcorr.sum() == 0:
             fig, ax = plt.subplots(figsize=figsize, facecolor=self.bg_color)
             ax.text(0.5, 0.5, 'No cross-correlation data available', 
                    ha='center', va='center', transform=ax.transAxes, fontsize=14)
@@ -383,7 +394,7 @@ class SpikeVisualizer:
         
         # Style
         ax.set_xlabel('Lag (s)', fontweight='bold')
-        ax.set_ylabel('Cross-Correlation', fontweight='bold')
+        ax.set_ylabel('Spike Pairs', fontweight='bold')
         ax.set_title(f'🔗 Cross-Correlation: Unit {unit1_id} vs Unit {unit2_id}', 
                     fontweight='bold', fontsize=14)
         ax.grid(True, alpha=0.3)
@@ -401,6 +412,62 @@ class SpikeVisualizer:
         plt.tight_layout()
         return fig
 
+    def plot_neuron_features(self, neuron_features: np.ndarray, feature: str = 'firing_rate',
+                             trial: Optional[int] = None,
+                             figsize: Tuple[int, int] = (14, 6)) -> plt.Figure:
+        """
+        Drill down into a per-neuron feature matrix (see neuron_features).
+        
+        Parameters:
+        -----------
+        neuron_features : np.ndarray
+            (n_trials, n_neurons, n_features) matrix, e.g. from
+            EnhancedSpikeAnalyzer.extract_neuron_features (may be memory-mapped)
+        feature : str
+            Feature shown per neuron in the right panel
+        trial : int or None
+            Show one trial instead of the mean over trials
+        figsize : tuple
+            Figure size
+        """
+        matrix = np.asarray(neuron_features, dtype=float)
+        if trial is not None:
+            matrix = matrix[trial:trial + 1]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            means = np.nanmean(matrix, axis=0)
+            errors = np.nanstd(matrix, axis=0) / np.sqrt(np.maximum(np.sum(~np.isnan(matrix), axis=0), 1))
+            # Each feature z-scored across neurons, so all share one color scale
+            scores = (means - np.nanmean(means, axis=0)) / np.nanstd(means, axis=0)
+        
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=figsize, facecolor=self.bg_color,
+                                       gridspec_kw={'width_ratios': [3, 2]})
+        scope = 'All Trials' if trial is None else f'Trial {trial}'
+        fig.suptitle(f'🔬 Per-Neuron Features ({scope})', fontsize=16, fontweight='bold')
+        
+        # 1. Neuron x feature map
+        im = ax1.imshow(np.nan_to_num(scores).T, aspect='auto', cmap='coolwarm', vmin=-3, vmax=3,
+                        interpolation='nearest')
+        ax1.set_yticks(range(len(NEURON_FEATURES)))
+        ax1.set_yticklabels(NEURON_FEATURES)
+        ax1.set_xlabel('Neuron', fontweight='bold')
+        ax1.set_title('📊 Feature z-scores across neurons')
+        ax1.grid(False)
+        plt.colorbar(im, ax=ax1, label='z-score')
+        
+        # 2. One feature per neuron
+        column = NEURON_FEATURES.index(feature)
+        ax2.bar(np.arange(means.shape[0]), np.nan_to_num(means[:, column]),
+                yerr=np.nan_to_num(errors[:, column]), color=self.colors['neural'], alpha=0.8,
+                edgecolor='white', linewidth=0.5, ecolor=self.text_color)
+        ax2.set_xlabel('Neuron', fontweight='bold')
+        ax2.set_ylabel(feature.replace('_', ' ').title(), fontweight='bold')
+        ax2.set_title(f'🎯 {feature}')
+        ax2.grid(True, alpha=0.3)
+        
+        plt.tight_layout()
+        return fig
+
     def plot_response_statistics(self, response_stats: Dict,
                                figsize: Tuple[int, int] = (14, 10)) -> plt.Figure:
         """
@@ -657,29 +724,20 @@ class SpikeVisualizer:
         ax3 = fig.add_subplot(gs[1:3, :2])
         if good_units:
             example_unit = good_units[0]
-            # Mini raster plot
-            on_trials, off_trials = [], []
-            
-            for i, trial in enumerate(trials_data):
-                unit_data = next((u for u in trial['units'] if u['unit_id'] == example_unit), None)
-                if unit_data is None:
-                    continue
-                    
-                spikes = unit_data['spike_times']
-                if trial['event_label'] == 'ON':
-                    on_trials.append((i, spikes))
-                else:
-                    off_trials.append((i, spikes))
+            # Mini raster plot (first 20 trials of each condition)
+            rasters = self._condition_rasters(trials_data, example_unit)
+            spikes_on, rows_on, n_on = rasters['ON']
+            spikes_off, rows_off, _ = rasters['OFF']
             
-            # Plot spikes
-            for idx, (trial_idx, spikes) in enumerate(on_trials[:20]):  # Limit display
-                ax3.vlines(spikes, idx - 0.4, idx + 0.4, 
-                          colors=self.colors['on'], alpha=0.8, linewidth=1)
+            shown_on = rows_on < 20  # Limit display
+            ax3.vlines(spikes_on[shown_on], rows_on[shown_on] - 0.4, rows_on[shown_on] + 0.4, 
+                      colors=self.colors['on'], alpha=0.8, linewidth=1)
             
-            for idx, (trial_idx, spikes) in enumerate(off_trials[:20]):
-                y_pos = len(on_trials[:20]) + idx
-                ax3.vlines(spikes, y_pos - 0.4, y_pos + 0.4,
-                          colors=self.colors['off'], alpha=0.8, linewidth=1)
+            off_rows = rows_off - (n_on + 1)
+            shown_off = off_rows < 20
+            y_pos = min(n_on, 20) + off_rows[shown_off]
+            ax3.vlines(spikes_off[shown_off], y_pos - 0.4, y_pos + 0.4,
+                      colors=self.colors['off'], alpha=0.8, linewidth=1)
             
             ax3.axvline(0, color='yellow', linewidth=2, alpha=0.8, linestyle='--')
             ax3.set_xlim(-1, 3)
@@ -0,0 +1,135 @@
+import numpy as np
+
+from burst_detection import detect_bursts, interburst_intervals
+from spike_analyzer import EnhancedSpikeAnalyzer
+
+RULES = [
+    {'max_isi': 0.01, 'end_isi': None, 'min_spikes': 3, 'min_duration': None},  # EnhancedSpikeAnalyzer
+    {'max_isi': 0.01, 'end_isi': None, 'min_spikes': 2, 'min_duration': 0.005},
+    {'max_isi': 0.01, 'end_isi': 0.05, 'min_spikes': 2, 'min_duration': 0.01},  # decoder batch features
+    {'max_isi': 0.02, 'end_isi': 0.1, 'min_spikes': 4, 'min_duration': None},
+]
+
+
+def _loop_bursts(spikes, max_isi=0.01, end_isi=None, min_spikes=3, min_duration=None):
+    """(start, end, size) of each burst of one train, stepping through its ISIs"""
+    bursts = []
+    opened = None
+    for i, isi in enumerate(np.diff(spikes)):
+        if end_isi is None:
+            if isi <= max_isi:
+                opened = i if opened is None else opened
+            elif opened is not None:
+                bursts.append((opened, i))
+                opened = None
+        elif isi <= max_isi and opened is None:
+            opened = i
+        elif isi > end_isi and opened is not None:
+            bursts.append((opened, i))
+            opened = None
+    # A max-ISI burst may run to the last spike; an inter-burst one never closes there
+    if opened is not None and end_isi is None:
+        bursts.append((opened, len(spikes) - 1))
+
+    return [(spikes[first], spikes[last], last - first + 1) for first, last in bursts
+            if last - first + 1 >= min_spikes
+            and (min_duration is None or spikes[last] - spikes[first] > min_duration)]
+
+
+def _spike_trains(rng, n_trains=40):
+    """Poisson trains with bursts spliced in, plus empty and single-spike trains"""
+    trains = []
+    for _ in range(n_trains):
+        spikes = rng.uniform(0, 2, rng.poisson(20))
+        for start in rng.uniform(0, 2, rng.integers(0, 4)):
+            spikes = np.concatenate([spikes, start + np.cumsum(rng.uniform(0.001, 0.015, rng.integers(2, 7)))])
+        trains.append(np.sort(spikes))
+    trains[:4] = [np.empty(0), np.array([0.7]), np.array([0.1, 0.105]), np.array([0.3, 0.3, 0.3, 0.9])]
+    return trains
+
+
+def _flat(trains):
+    return (np.concatenate(trains),
+            np.repeat(np.arange(len(trains)), [len(spikes) for spikes in trains]))
+
+
+def test_detect_bursts_matches_loop():
+    """All trains at once give the bursts of the per-train loop, in spike order"""
+
+    trains = _spike_trains(np.random.default_rng(0))
+    spike_times, train_ids = _flat(trains)
+    for rule in RULES:
+        expected = [(train, *burst) for train, spikes in enumerate(trains)
+                    for burst in _loop_bursts(spikes, **rule)]
+        burst_trains, starts, ends, sizes = detect_bursts(spike_times, train_ids, **rule)
+        assert len(expected) > 0, rule
+        assert list(zip(burst_trains.tolist(), starts.tolist(), ends.tolist(), sizes.tolist())) == expected, rule
+
+
+def test_burst_edges():
+    """Bursts at the first and last spike, hysteresis, minimum duration and train boundaries"""
+
+    spikes = np.array([0.0, 0.005, 0.01, 0.5, 0.9, 0.905, 0.91])
+    train_ids = np.zeros(len(spikes), dtype=np.int64)
+    _, starts, ends, sizes = detect_bursts(spikes, train_ids)
+    assert starts.tolist() == [0.0, 0.9] and ends.tolist() == [0.01, 0.91] and sizes.tolist() == [3, 3]
+    # The inter-burst rule drops the burst still open at the last spike
+    _, starts, ends, sizes = detect_bursts(spikes, train_ids, end_isi=0.05)
+    assert starts.tolist() == [0.0] and ends.tolist() == [0.01] and sizes.tolist() == [3]
+
+    # ISIs between max_isi and end_isi keep an inter-burst burst open
+    spikes = np.array([0.0, 0.005, 0.03, 0.06, 0.3])
+    train_ids = np.zeros(len(spikes), dtype=np.int64)
+    assert len(detect_bursts(spikes, train_ids, min_spikes=2)[0]) == 1
+    assert detect_bursts(spikes, train_ids, min_spikes=2)[2].tolist() == [0.005]
+    _, starts, ends, sizes = detect_bursts(spikes, train_ids, end_isi=0.05, min_spikes=2)
+    assert starts.tolist() == [0.0] and ends.tolist() == [0.06] and sizes.tolist() == [4]
+    # ... while another short ISI before the closing one does not open a second burst
+    spikes = np.array([0.0, 0.005, 0.03, 0.035, 0.3, 0.305, 0.4])
+    _, starts, ends, sizes = detect_bursts(spikes, np.zeros(7, dtype=np.int64), end_isi=0.05, min_spikes=2)
+    assert starts.tolist() == [0.0, 0.3] and ends.tolist() == [0.035, 0.305] and sizes.tolist() == [4, 2]
+
+    # min_duration is exclusive
+    spikes = np.array([0.0, 0.005, 0.01, 0.5, 0.505, 0.512])
+    train_ids = np.zeros(len(spikes), dtype=np.int64)
+    assert detect_bursts(spikes, train_ids, min_duration=0.01)[1].tolist() == [0.5]
+    assert len(detect_bursts(spikes, train_ids, min_duration=0.02)[0]) == 0
+
+    # Close spikes of neighbouring trains are not a burst
+    spikes = np.array([0.5, 1.0, 1.005, 0.0, 0.003, 0.5])
+    train_ids = np.array([0, 0, 0, 1, 1, 1])
+    assert len(detect_bursts(spikes, train_ids, min_spikes=3)[0]) == 0
+    assert detect_bursts(spikes, train_ids, min_spikes=2)[0].tolist() == [0, 1]
+
+
+def test_empty_and_single_spike():
+    """Trains with fewer than two spikes have no bursts under either rule"""
+
+    for spikes in (np.empty(0), np.array([0.4])):
+        train_ids = np.zeros(len(spikes), dtype=np.int64)
+        for rule in RULES:
+            burst_trains, starts, ends, sizes = detect_bursts(spikes, train_ids, **rule)
+            assert len(burst_trains) == len(starts) == len(ends) == len(sizes) == 0
+        assert EnhancedSpikeAnalyzer()._detect_bursts(spikes) == []
+    gaps, gap_trains = interburst_intervals(*detect_bursts(np.empty(0), np.empty(0, dtype=np.int64))[:3])
+    assert len(gaps) == len(gap_trains) == 0
+
+
+def test_interburst_intervals():
+    """Gaps are taken between consecutive bursts of the same train only"""
+
+    trains = _spike_trains(np.random.default_rng(1))
+    burst_trains, starts, ends, _ = detect_bursts(*_flat(trains))
+    gaps, gap_trains = interburst_intervals(burst_trains, starts, ends)
+    expected = [(train, bursts[i + 1][0] - bursts[i][1]) for train, spikes in enumerate(trains)
+                for bursts in [_loop_bursts(spikes)] for i in range(len(bursts) - 1)]
+    assert len(expected) > 0
+    assert list(zip(gap_trains.tolist(), gaps.tolist())) == expected
+
+
+if __name__ == "__main__":
+    test_detect_bursts_matches_loop()
+    test_burst_edges()
+    test_empty_and_single_spike()
+    test_interburst_intervals()
+    print("All burst detection tests passed")
@@ -0,0 +1,91 @@
+import numpy as np
+
+from correlation_engine import PairwiseCorrelationStats, binned_csr, stratified_pairs
+
+
+def _unordered_pairs(first, second):
+    return {(min(i, j), max(i, j)) for i, j in zip(first, second)}
+
+
+def test_stratified_pairs():
+    """Pair samples are capped at max_pairs, distinct, deterministic and balanced"""
+
+    for n_neurons, max_pairs in [(100, 50), (100, 1), (100, 0), (2, 0), (3, 1), (40, 200), (101, 1000)]:
+        first, second = stratified_pairs(n_neurons, max_pairs, seed=3)
+        assert len(first) <= max_pairs
+        assert np.all(first != second)
+        assert len(_unordered_pairs(first, second)) == len(first)
+        assert np.all((first >= 0) & (first < n_neurons) & (second >= 0) & (second < n_neurons))
+
+        again = stratified_pairs(n_neurons, max_pairs, seed=3)
+        assert np.array_equal(first, again[0]) and np.array_equal(second, again[1])
+
+    # Fewer pairs allowed than neurons: exactly max_pairs pairs
+    first, second = stratified_pairs(100, 50)
+    assert len(first) == 50
+
+    # Every neuron in the same number of pairs
+    first, second = stratified_pairs(40, 200)
+    assert np.all(np.bincount(np.concatenate([first, second]), minlength=40) == 10)
+
+    # Small populations: all pairs
+    first, second = stratified_pairs(10, 45)
+    assert _unordered_pairs(first, second) == _unordered_pairs(*np.triu_indices(10, k=1))
+
+
+def _corrcoef_pairs(binned):
+    """Upper-triangle np.corrcoef values of the rows with varying counts"""
+    varying = binned[binned.std(axis=1) > 0]
+    return np.corrcoef(varying)[np.triu_indices(len(varying), k=1)]
+
+
+def test_pairwise_stats_match_corrcoef():
+    """Tiled running statistics match np.corrcoef over all pairs of all updates"""
+
+    rng = np.random.default_rng(0)
+    common = rng.poisson(0.5, (3, 60))
+    matrices = []
+    for trial in range(3):
+        binned = rng.poisson(0.3, (23, 60)) + (rng.random((23, 1)) < 0.5) * common[trial]
+        binned[4] = 0  # silent
+        binned[9] = 2  # constant
+        matrices.append(binned)
+
+    expected = np.concatenate([_corrcoef_pairs(binned) for binned in matrices])
+    for tile_size in (5, 23, 1024):
+        stats = PairwiseCorrelationStats(tile_size=tile_size, top_k=10)
+        for binned in matrices:
+            stats.update(binned)
+        assert stats.n_pairs == len(expected) == 3 * 21 * 20 // 2
+        assert np.isclose(stats.mean, expected.mean())
+        assert np.isclose(stats.variance, expected.var())
+        assert np.isclose(stats.max, expected.max())
+
+        values, pairs = stats.top_pairs
+        assert np.allclose(values, np.sort(expected)[::-1][:10])
+        for value, (update, i, j) in zip(values, pairs):
+            assert i < j and np.isclose(value, np.corrcoef(matrices[update][i], matrices[update][j])[0, 1])
+
+    # Sparse input and single-neuron or empty matrices
+    stats = PairwiseCorrelationStats().update(binned_csr([rng.uniform(0, 1, 30) for _ in range(8)],
+                                                         np.linspace(0, 1, 21)))
+    assert stats.n_pairs == 28
+    assert PairwiseCorrelationStats().update(np.ones((1, 5))).n_pairs == 0
+    assert PairwiseCorrelationStats().update(np.empty((4, 0))).variance == 0.0
+
+
+def test_binned_csr():
+    """Sparse binning matches np.histogram per neuron"""
+
+    rng = np.random.default_rng(1)
+    trial_spikes = [np.sort(rng.uniform(-0.1, 1.1, 40)) for _ in range(6)] + [np.array([1.0])]
+    edges = np.linspace(0, 1, 11)
+    expected = [np.histogram(spikes, edges)[0] for spikes in trial_spikes]
+    assert np.array_equal(binned_csr(trial_spikes, edges).toarray(), expected)
+
+
+if __name__ == "__main__":
+    test_stratified_pairs()
+    test_pairwise_stats_match_corrcoef()
+    test_binned_csr()
+    print("All correlation engine tests passed")
@@ -0,0 +1,115 @@
+import numpy as np
+
+from correlogram import all_pair_correlograms, jitter_correlogram, lag_bins, unit_correlogram
+from spike_train_set import as_trial_data
+
+MAX_LAG = 0.02
+BIN_SIZE = 0.002
+
+
+def _trials(rng, n_trials=6, unit_ids=(2, 5, 11)):
+    """Trials with correlated units, a unit missing from one trial and an empty train"""
+    trials = []
+    for trial in range(n_trials):
+        driver = np.sort(rng.uniform(0, 1.0, 40))
+        units = []
+        for unit_id in unit_ids:
+            if unit_id == 11 and trial == 1:
+                continue
+            follow = driver[rng.random(len(driver)) < 0.5] + rng.normal(0.004, 0.002)
+            spikes = [] if unit_id == 5 and trial == 2 else \
+                np.sort(np.concatenate([follow, rng.uniform(0, 1.0, 20)]))
+            units.append({'unit_id': unit_id, 'spike_times': spikes})
+        trials.append({'event_label': 'ON' if trial % 2 else 'OFF', 'units': units})
+    return trials
+
+
+def _brute_force(trials, unit1_id, unit2_id):
+    """Lag histogram from every spike pair of every trial"""
+    n_side = int(round(MAX_LAG / BIN_SIZE))
+    counts = np.zeros(2 * n_side + 1, dtype=np.int64)
+    for trial in trials:
+        spikes = {unit['unit_id']: np.sort(np.asarray(unit['spike_times'], dtype=float))
+                  for unit in trial['units']}
+        ref, target = spikes.get(unit1_id, np.empty(0)), spikes.get(unit2_id, np.empty(0))
+        for i, ref_time in enumerate(ref):
+            for j, target_time in enumerate(target):
+                if unit1_id == unit2_id and i == j:
+                    continue
+                bin_idx = int(np.floor((target_time - ref_time) / BIN_SIZE + n_side + 0.5))
+                if 0 <= bin_idx <= 2 * n_side:
+                    counts[bin_idx] += 1
+    return counts
+
+
+def test_unit_correlogram_brute_force():
+    """Cross- and autocorrelograms count the same pairs as a double loop over spikes"""
+
+    trials = _trials(np.random.default_rng(0))
+    for unit1_id, unit2_id in [(2, 5), (5, 2), (2, 11), (2, 2), (11, 11), (2, 99)]:
+        lags, counts = unit_correlogram(trials, unit1_id, unit2_id, MAX_LAG, BIN_SIZE)
+        assert np.allclose(lags, lag_bins(MAX_LAG, BIN_SIZE))
+        assert np.array_equal(counts, _brute_force(trials, unit1_id, unit2_id)), (unit1_id, unit2_id)
+
+    # Autocorrelograms are symmetric; units following the same driver peak at zero lag
+    _, auto = unit_correlogram(trials, 2, 2, MAX_LAG, BIN_SIZE)
+    assert np.array_equal(auto, auto[::-1])
+    _, cross = unit_correlogram(trials, 2, 5, MAX_LAG, BIN_SIZE)
+    assert np.argmax(cross) == len(cross) // 2
+
+
+def test_all_pair_correlograms():
+    """The all-pairs batch matches the correlogram of each pair"""
+
+    trials = as_trial_data(_trials(np.random.default_rng(1)))
+    lags, counts = all_pair_correlograms(trials, max_lag=MAX_LAG, bin_size=BIN_SIZE)
+    unit_ids = list(trials.unit_ids)
+    assert counts.shape == (3, 3, len(lags))
+    for a, unit1_id in enumerate(unit_ids):
+        for b, unit2_id in enumerate(unit_ids):
+            assert np.array_equal(counts[a, b], _brute_force(trials, unit1_id, unit2_id))
+
+    # A subset in another order, with an unknown unit left empty
+    _, subset = all_pair_correlograms(trials, [11, 99, 2], MAX_LAG, BIN_SIZE)
+    assert np.array_equal(subset[0, 2], counts[2, 0])
+    assert not subset[1].any() and not subset[:, 1].any()
+
+
+def test_jitter_correlogram():
+    """Observed counts match the plain correlogram; surrogates match a per-surrogate loop"""
+
+    trials = _trials(np.random.default_rng(2))
+    n_surrogates, jitter_window = 4, 0.01
+    lags, counts, baseline, baseline_std = jitter_correlogram(
+        trials, 2, 5, MAX_LAG, BIN_SIZE, jitter_window, n_surrogates, rng=7
+    )
+    assert np.array_equal(counts, unit_correlogram(trials, 2, 5, MAX_LAG, BIN_SIZE)[1])
+
+    # Replay the draws: one uniform offset per unit-5 spike and surrogate, trial by trial
+    rng = np.random.default_rng(7)
+    target = [np.sort(np.asarray(unit['spike_times'], dtype=float)) for trial in trials
+              for unit in trial['units'] if unit['unit_id'] == 5]
+    n_target = sum(len(spikes) for spikes in target)
+    offsets = rng.uniform(0, jitter_window, (n_surrogates, n_target))
+    surrogate_counts = []
+    for surrogate in range(n_surrogates):
+        jittered, start = [], 0
+        for trial, spikes in zip(trials, target):
+            intervals = np.floor(spikes / jitter_window) * jitter_window
+            moved = intervals + offsets[surrogate, start:start + len(spikes)]
+            start += len(spikes)
+            units = [unit for unit in trial['units'] if unit['unit_id'] == 2]
+            jittered.append(dict(trial, units=units + [{'unit_id': 5, 'spike_times': moved}]))
+        surrogate_counts.append(_brute_force(jittered, 2, 5))
+    assert np.allclose(baseline, np.mean(surrogate_counts, axis=0))
+    assert np.allclose(baseline_std, np.std(surrogate_counts, axis=0))
+
+    again = jitter_correlogram(trials, 2, 5, MAX_LAG, BIN_SIZE, jitter_window, n_surrogates, rng=7)
+    assert np.array_equal(again[2], baseline)
+
+
+if __name__ == "__main__":
+    test_unit_correlogram_brute_force()
+    test_all_pair_correlograms()
+    test_jitter_correlogram()
+    print("All correlogram tests passed")
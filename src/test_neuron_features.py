@@ -0,0 +1,77 @@
+import numpy as np
+
+from neuron_features import (NEURON_FEATURE_DTYPE, NEURON_FEATURES, as_records, feature_column,
+                             open_neuron_features, population_summary)
+from spike_analyzer import EnhancedSpikeAnalyzer
+from spike_data_loader import NeuralPatternGenerator
+
+FAMILIES = ('rate_features', 'temporal_features', 'burst_features', 'regularity_features')
+
+# Analyzer features that are not reductions of per-neuron values, so population_summary leaves them out
+NOT_REDUCED = {'stimulus_modulation', 'max_rate_change', 'rate_entropy', 'isi_entropy',
+               'mean_interburst_interval'}
+
+
+def _datasets():
+    generator = NeuralPatternGenerator(n_neurons=30, trial_duration=2.0)
+    for bursting, regularity in [(0.0, 0.8), (0.4, 0.3)]:
+        data = generator.generate_synthetic_spikes(n_stimuli=4, n_trials_per_stimulus=3, spike_regularity=regularity,
+                                                   pathological_bursting=bursting, rng=1)
+        # Silent and coincident-spike trains
+        data['spike_trains'] = [list(trial) for trial in data['spike_trains']]
+        data['spike_trains'][0][0] = np.empty(0)
+        data['spike_trains'][0][1] = np.full(4, 0.7)
+        yield data
+
+
+def test_population_summary_matches_analyzer():
+    """Reductions over the feature matrix match the analyzer's population features"""
+
+    analyzer = EnhancedSpikeAnalyzer()
+    for data in _datasets():
+        expected = analyzer.analyze_spike_data(data, FAMILIES)
+        summary = population_summary(analyzer.extract_neuron_features(data), analyzer.trial_duration)
+        assert set(summary) == set(FAMILIES)
+        for family in FAMILIES:
+            assert set(summary[family]) | NOT_REDUCED >= set(expected[family]), family
+            assert set(summary[family]) <= set(expected[family]), family
+            for name, value in summary[family].items():
+                assert np.isclose(value, expected[family][name], rtol=1e-5, atol=1e-9), (family, name)
+
+
+def test_neuron_features_memmap(tmp_path):
+    """Matrices written with path= reopen memory-mapped with the same values and summary"""
+
+    analyzer = EnhancedSpikeAnalyzer()
+    data = next(_datasets())
+    matrix = analyzer.extract_neuron_features(data)
+    assert matrix.shape == (12, 30, len(NEURON_FEATURES)) and matrix.dtype == np.float32
+
+    path = tmp_path / "features.npy"
+    written = analyzer.extract_neuron_features(data, path=path)
+    opened = open_neuron_features(path)
+    assert isinstance(opened.base, np.memmap) or isinstance(opened, np.memmap)
+    for other in (written, opened):
+        assert np.array_equal(other, matrix, equal_nan=True)
+    assert np.load(path).dtype == NEURON_FEATURE_DTYPE
+    assert np.array_equal(as_records(matrix)['isi_cv'], feature_column(matrix, 'isi_cv'), equal_nan=True)
+    assert population_summary(opened) == population_summary(matrix)
+
+    # Files of another layout are refused
+    np.save(tmp_path / "other.npy", np.zeros((2, 3), dtype=np.float32))
+    try:
+        open_neuron_features(tmp_path / "other.npy")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("matrix of another layout opened")
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    test_population_summary_matches_analyzer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_neuron_features_memmap(Path(tmp_dir))
+    print("All neuron feature tests passed")
@@ -0,0 +1,79 @@
+import numpy as np
+from scipy import signal
+
+from spectral_engine import FREQUENCY_BANDS, band_powers, band_table, peak_frequencies, welch_psd
+
+FS = 1000.0
+
+# Besides the feature bands: a band between two bins, a single-bin band, limits on bins, the full range
+EXTRA_BANDS = [(2, 3), (19, 21), (40, 80), (0, FS / 2)]
+
+
+def _loop_band_features(signals, fs, nperseg, bands):
+    """Per-trial Welch PSD, trapezoid band power and peak frequency as the analyzer computed them"""
+    freqs, powers, peaks = None, [], []
+    for trial_signal in signals:
+        freqs, psd = signal.welch(trial_signal, fs=fs, nperseg=nperseg)
+        trial_powers, trial_peaks = [], []
+        for low, high in bands:
+            mask = (freqs >= low) & (freqs <= high)
+            trial_powers.append(np.trapz(psd[mask], freqs[mask]) if np.any(mask) else 0)
+            trial_peaks.append(freqs[mask][np.argmax(psd[mask])] if np.any(mask) else 0)
+        powers.append(trial_powers)
+        peaks.append(trial_peaks)
+    return freqs, np.array(powers), np.array(peaks)
+
+
+def test_band_features_match_loop():
+    """Batched band powers and peaks equal those of the per-trial loop, empty bands included"""
+
+    rng = np.random.default_rng(0)
+    bands = tuple(FREQUENCY_BANDS.values()) + tuple(EXTRA_BANDS)
+    for n_samples, nperseg in [(200, 50), (200, 128), (2000, 256)]:
+        signals = rng.poisson(3, (12, n_samples)).astype(float)
+        signals += np.sin(2 * np.pi * 20 * np.arange(n_samples) / FS)
+
+        freqs, powers, peaks = _loop_band_features(signals, FS, nperseg, bands)
+        batch_freqs, psds = welch_psd(signals, FS, nperseg)
+        assert np.array_equal(batch_freqs, freqs)
+        assert np.array_equal(batch_freqs, np.fft.rfftfreq(nperseg, 1 / FS))
+        assert np.allclose(band_powers(psds, FS, nperseg, bands), powers, rtol=1e-10, atol=0)
+        assert np.array_equal(peak_frequencies(psds, FS, nperseg, bands), peaks)
+
+        # One PSD (the analyzer's trial mean) gives one value per band
+        assert band_powers(psds[0], FS, nperseg, bands).shape == (len(bands),)
+        assert np.array_equal(peak_frequencies(psds[0], FS, nperseg, bands), peaks[0])
+
+    # (2, 3) has no bins at 1000 / 50 = 20 Hz resolution, and (19, 21) only one
+    masks, _ = band_table(FS, 50, bands)
+    assert masks[len(FREQUENCY_BANDS)].sum() == 0 and masks[len(FREQUENCY_BANDS) + 1].sum() == 1
+
+
+def test_band_table_weights():
+    """psd @ weights.T is np.trapz over each band's bins, for any PSD"""
+
+    rng = np.random.default_rng(1)
+    bands = tuple(FREQUENCY_BANDS.values()) + tuple(EXTRA_BANDS)
+    for nperseg in (50, 128, 255):
+        freqs = np.fft.rfftfreq(nperseg, 1 / FS)
+        masks, weights = band_table(FS, nperseg, bands)
+        assert masks.shape == weights.shape == (len(bands), len(freqs))
+        assert np.array_equal(masks, [(freqs >= low) & (freqs <= high) for low, high in bands])
+        assert not weights[~masks].any()
+
+        psd = rng.exponential(1, (5, len(freqs)))
+        expected = [[np.trapz(row[mask], freqs[mask]) for mask in masks] for row in psd]
+        assert np.allclose(psd @ weights.T, expected, rtol=1e-12, atol=0)
+
+        # Cached and read-only, so callers cannot corrupt it
+        assert band_table(FS, nperseg, bands)[1] is weights
+        assert not masks.flags.writeable and not weights.flags.writeable
+
+    masks, weights = band_table(FS, 50, ())
+    assert masks.shape == weights.shape == (0, 26)
+
+
+if __name__ == "__main__":
+    test_band_features_match_loop()
+    test_band_table_weights()
+    print("All spectral engine tests passed")
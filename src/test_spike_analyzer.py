@@ -0,0 +1,35 @@
+import numpy as np
+
+from spike_analyzer import EnhancedSpikeAnalyzer
+
+
+def _spike_data(rng, n_trials=3, n_neurons=8, rate=20.0):
+    spike_trains = [[np.sort(rng.uniform(0, 2.0, rng.poisson(rate * 2.0))) for _ in range(n_neurons)]
+                    for _ in range(n_trials)]
+    return {'spike_trains': spike_trains, 'stimulus_labels': list(range(n_trials)),
+            'stimulus_times': [0.5] * n_trials}
+
+
+def test_binned_counts_scoped_to_call():
+    """Binned counts are not kept after analyze_spike_data and follow in-place edits"""
+
+    rng = np.random.default_rng(0)
+    analyzer = EnhancedSpikeAnalyzer()
+    spike_data = _spike_data(rng)
+    families = ['spectral_features', 'synchrony_features', 'regularity_features']
+
+    first = analyzer.analyze_spike_data(spike_data, families)
+    assert analyzer._binned is None
+
+    # Same list object, new spikes: results must reflect the new data
+    for trial in spike_data['spike_trains']:
+        trial[:] = [np.sort(rng.uniform(0, 2.0, 200)) for _ in trial]
+    second = analyzer.analyze_spike_data(spike_data, families)
+    fresh = EnhancedSpikeAnalyzer().analyze_spike_data(spike_data, families)
+    assert second == fresh
+    assert second != first
+
+
+if __name__ == "__main__":
+    test_binned_counts_scoped_to_call()
+    print("All analyzer tests passed")
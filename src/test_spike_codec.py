@@ -0,0 +1,152 @@
+import json
+
+import numpy as np
+
+from spike_codec import (decode_unit_streams, encode_unit_streams, seconds_to_ticks, ticks_to_seconds,
+                         unit_id_dtype, varint_decode, varint_encode, zigzag_decode, zigzag_encode)
+from spike_store import open_recording, write_recording
+
+SAMPLING_RATE = 30000.0
+
+
+def _recording(rng, n_spikes=500, n_units=7, start=-2.0):
+    """Spikes on the sampling grid, negative times included, unsorted across units"""
+    ticks = rng.integers(int(start * SAMPLING_RATE), int(60 * SAMPLING_RATE), n_spikes)
+    ticks[:3] = ticks[0]  # simultaneous spikes
+    return {'spike_times': ticks / SAMPLING_RATE, 'unit_ids': rng.integers(0, n_units, n_spikes),
+            'event_times': np.array([1.0, 2.5]), 'event_labels': np.array(['ON', 'OFF']),
+            'metadata': {'sampling_rate': SAMPLING_RATE}}
+
+
+def test_zigzag_round_trip():
+    """Zig-zag codes round-trip all of int64 and keep small magnitudes small"""
+
+    values = np.array([0, -1, 1, -2, 2, -64, 63, np.iinfo(np.int64).min, np.iinfo(np.int64).max])
+    codes = zigzag_encode(values)
+    assert codes.dtype == np.uint64
+    assert codes[:5].tolist() == [0, 1, 2, 3, 4]
+    assert np.array_equal(zigzag_decode(codes), values)
+    assert len(zigzag_decode(zigzag_encode(np.empty(0, dtype=np.int64)))) == 0
+
+
+def test_varint_round_trip():
+    """Varints round-trip uint64 values, 7 bits per byte"""
+
+    values = np.array([0, 1, 127, 128, 300, 2**32, 2**63, 2**64 - 1], dtype=np.uint64)
+    buffer = varint_encode(values)
+    assert buffer.dtype == np.uint8
+    assert len(buffer) == 1 + 1 + 1 + 2 + 2 + 5 + 10 + 10
+    assert varint_encode([300]).tolist() == [0xAC, 0x02]
+    assert np.array_equal(varint_decode(buffer), values)
+
+    assert len(varint_encode([])) == 0
+    assert len(varint_decode(np.empty(0, dtype=np.uint8))) == 0
+    try:
+        varint_decode(buffer[:-1])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("truncated stream accepted")
+
+
+def test_unit_stream_round_trip():
+    """Per-unit delta streams decode to the ticks in time order, negative ticks included"""
+
+    rng = np.random.default_rng(0)
+    data = _recording(rng)
+    ticks = seconds_to_ticks(data['spike_times'], SAMPLING_RATE)
+    units, counts, buffer = encode_unit_streams(ticks, data['unit_ids'])
+    decoded_ticks, decoded_units = decode_unit_streams(units, counts, buffer)
+
+    order = np.lexsort((data['unit_ids'], ticks))
+    assert np.array_equal(decoded_ticks, ticks[order])
+    assert np.array_equal(decoded_units, data['unit_ids'][order])
+
+    empty = encode_unit_streams(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    assert all(len(column) == 0 for column in empty)
+    assert all(len(column) == 0 for column in decode_unit_streams(*empty))
+
+
+def test_tick_round_trip():
+    """Times on the sampling grid survive seconds -> ticks -> seconds exactly"""
+
+    ticks = np.array([-30000, -1, 0, 1, 29999, 2**31 - 1])
+    times = ticks / SAMPLING_RATE
+    assert seconds_to_ticks(times, SAMPLING_RATE).dtype == np.int32
+    assert np.array_equal(ticks_to_seconds(seconds_to_ticks(times, SAMPLING_RATE), SAMPLING_RATE), times)
+    assert seconds_to_ticks([2**31 / SAMPLING_RATE], SAMPLING_RATE).dtype == np.int64
+    assert len(seconds_to_ticks(np.empty(0), SAMPLING_RATE)) == 0
+
+
+def test_recording_codecs(tmp_path):
+    """Every time encoding stores the same spikes as float64 seconds"""
+
+    data = _recording(np.random.default_rng(1))
+    order = np.lexsort((data['unit_ids'], data['spike_times']))
+    for encoding in (None, 'ticks', 'delta-varint'):
+        recording = open_recording(write_recording(data, tmp_path / str(encoding), time_encoding=encoding))
+        if encoding == 'delta-varint':
+            # Streams come back in time order
+            assert np.array_equal(recording['spike_times'], data['spike_times'][order])
+            assert np.array_equal(recording['unit_ids'], data['unit_ids'][order])
+        else:
+            assert np.array_equal(recording['spike_times'], data['spike_times'])
+            assert np.array_equal(recording['unit_ids'], data['unit_ids'])
+        assert recording['unit_ids'].dtype == (np.int64 if encoding is None else np.uint8)
+        assert np.array_equal(recording['event_labels'], data['event_labels'])
+
+    empty = dict(data, spike_times=np.empty(0), unit_ids=np.empty(0, dtype=np.int64))
+    for encoding in (None, 'ticks', 'delta-varint'):
+        path = write_recording(empty, tmp_path / f"empty-{encoding}", time_encoding=encoding)
+        recording = open_recording(path)
+        assert len(recording['spike_times']) == 0 and len(recording['unit_ids']) == 0
+
+
+def test_unit_id_dtype():
+    """Unit ids narrow to the smallest integer dtype of their range"""
+
+    assert unit_id_dtype(np.array([0, 5, 255])) == np.uint8
+    assert unit_id_dtype(np.array([0, 300])) == np.uint16
+    assert unit_id_dtype(np.array([-1, 100])) == np.int8
+    assert unit_id_dtype(np.array([-200, 5])) == np.int16
+    assert unit_id_dtype(np.array([2**40])) == np.uint64
+    assert unit_id_dtype(np.empty(0, dtype=np.int64)) == np.uint8
+    assert unit_id_dtype(np.array(['a', 'b'])) == np.dtype('<U1')
+
+
+def test_off_grid_times(tmp_path):
+    """Times off the sampling grid are only rounded to ticks when allowed"""
+
+    data = _recording(np.random.default_rng(2))
+    data['spike_times'] = data['spike_times'] + 1e-6
+    for encoding in ('ticks', 'delta-varint'):
+        try:
+            write_recording(data, tmp_path / encoding, time_encoding=encoding)
+        except ValueError as error:
+            assert 'allow_rounding' in str(error)
+        else:
+            raise AssertionError("off-grid spike times were rounded silently")
+        assert not (tmp_path / encoding).exists()
+
+        path = write_recording(data, tmp_path / encoding, time_encoding=encoding, allow_rounding=True)
+        recording = open_recording(path)
+        error = np.abs(np.sort(recording['spike_times']) - np.sort(data['spike_times']))
+        assert error.max() < 0.5 / SAMPLING_RATE
+        with open(path / 'metadata.json') as f:
+            assert np.isclose(json.load(f)['time_encoding']['max_error'], 1e-6)
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    test_zigzag_round_trip()
+    test_varint_round_trip()
+    test_unit_stream_round_trip()
+    test_tick_round_trip()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_recording_codecs(Path(tmp_dir))
+    test_unit_id_dtype()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_off_grid_times(Path(tmp_dir))
+    print("All spike codec tests passed")
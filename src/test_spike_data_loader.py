@@ -0,0 +1,89 @@
+import numpy as np
+
+import spike_train_set
+from spike_data_loader import SpikeDataLoader
+from spike_train_set import UnitSpikeIndex
+
+DURATION = 50.0
+
+
+def _recording(rng, n_spikes=5000):
+    """Unsorted spikes of units with negative and sparse ids; unit 40 fires only near the end"""
+    spike_times = rng.uniform(0, DURATION, n_spikes)
+    unit_ids = rng.choice([-2, 0, 3, 7], n_spikes)
+    spike_times[:5], unit_ids[:5] = DURATION - 0.1 * np.arange(1, 6), 40
+    events = np.array([0.2, 3.0, 17.5, 17.5, 30.0, DURATION - 0.5, DURATION + 2.0])
+    labels = np.array(['ON', 'OFF', 'ON', 'OFF', 'ON', 'OFF', 'ON'])
+    return spike_times, unit_ids, events, labels
+
+
+def _mask_slice(spike_times, unit_ids, event_time, unit_id, pre_time, post_time):
+    """Reference: spikes of one unit in one window by scanning the whole recording"""
+    in_window = ((unit_ids == unit_id) & (spike_times >= event_time - pre_time) &
+                 (spike_times < event_time + post_time))
+    return np.sort(spike_times[in_window]) - event_time
+
+
+def test_align_matches_mask():
+    """Aligned spikes match a boolean-mask slice, also when gathered in small blocks"""
+
+    spike_times, unit_ids, events, _ = _recording(np.random.default_rng(0))
+    index = UnitSpikeIndex(spike_times, unit_ids)
+    assert index.units.tolist() == [-2, 0, 3, 7, 40]
+
+    default_chunk = spike_train_set.ALIGN_CHUNK_SPIKES
+    try:
+        for chunk in (default_chunk, 100):
+            spike_train_set.ALIGN_CHUNK_SPIKES = chunk
+            aligned = index.align(events, 1.0, 3.0)
+            assert aligned.shape == (len(events), 5) and aligned.is_compact
+            for trial_idx, event_time in enumerate(events):
+                for col, unit_id in enumerate(index.units):
+                    expected = _mask_slice(spike_times, unit_ids, event_time, unit_id, 1.0, 3.0)
+                    assert np.allclose(aligned.neuron(trial_idx, col), expected)
+    finally:
+        spike_train_set.ALIGN_CHUNK_SPIKES = default_chunk
+
+    # Windows past the recording and a unit silent in most windows
+    assert aligned.counts[-1].sum() == 0
+    assert aligned.counts[:5, 4].sum() == 0 and aligned.counts[5, 4] == 5
+
+
+def test_create_trials_matches_mask():
+    """Trial dicts match a mask-based slice, with the loader's or overridden windows"""
+
+    spike_times, unit_ids, events, labels = _recording(np.random.default_rng(1))
+    loader = SpikeDataLoader(pre_time=0.5, post_time=1.5)
+    for pre_time, post_time in [(None, None), (2.0, None), (0.0, 0.25)]:
+        trials = loader.create_trials(spike_times, unit_ids, events, labels, pre_time, post_time)
+        pre_time = 0.5 if pre_time is None else pre_time
+        post_time = 1.5 if post_time is None else post_time
+        assert len(trials) == len(events)
+        assert trials.event_labels.tolist() == labels.tolist()
+
+        for trial_idx, trial in enumerate(trials):
+            assert trial['trial_id'] == trial_idx
+            assert trial['event_time'] == events[trial_idx] and trial['event_label'] == labels[trial_idx]
+            assert (trial['pre_time'], trial['post_time']) == (pre_time, post_time)
+            assert [unit['unit_id'] for unit in trial['units']] == [-2, 0, 3, 7, 40]
+            for unit in trial['units']:
+                assert trial['units'][trial['unit_index'][unit['unit_id']]] is unit
+                expected = _mask_slice(spike_times, unit_ids, events[trial_idx], unit['unit_id'],
+                                       pre_time, post_time)
+                assert np.allclose(unit['spike_times'], expected)
+                # Views into the (trial, unit) table
+                assert unit['spike_times'].base is not None
+
+        # The index is built once for the same recording arrays
+        assert loader.build_index(spike_times, unit_ids) is loader._index
+
+    assert trials[-1]['trial_id'] == len(trials) - 1
+    assert [trial['trial_id'] for trial in trials[1:3]] == [1, 2]
+    spike_times_7, trial_idx = trials.unit_spikes(7)
+    assert len(spike_times_7) == trials.spikes.counts[:, 3].sum()
+
+
+if __name__ == "__main__":
+    test_align_matches_mask()
+    test_create_trials_matches_mask()
+    print("All spike data loader tests passed")
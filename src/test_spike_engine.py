@@ -0,0 +1,70 @@
+import numpy as np
+
+from spike_data_loader import NeuralPatternGenerator
+from spike_engine import generate_population_spikes, generate_spike_train
+
+# (spike_regularity, pathological_bursting) settings, tonic and burst-heavy
+SETTINGS = [(0.8, 0.0), (0.3, 0.0), (0.3, 0.2), (0.5, 0.6), (0.8, 0.2)]
+N_TRAINS = 300
+DURATION = 2.0
+DT = 0.001
+
+
+def _rate_and_cv(spike_trains):
+    """Mean firing rate and mean ISI CV of trains with more than 2 spikes"""
+    rate = np.mean([len(spikes) / DURATION for spikes in spike_trains])
+    isis = [np.diff(spikes) for spikes in spike_trains if len(spikes) > 2]
+    return rate, np.mean([np.std(isi) / np.mean(isi) for isi in isis])
+
+
+def _loop_trains(firing_rate, regularity, bursting):
+    generator = NeuralPatternGenerator(n_neurons=1, trial_duration=DURATION, dt=DT, engine='loop', rng=1)
+    return [generator._generate_neuron_spikes(firing_rate, regularity, bursting, 0.05, 0.2, 0.002)
+            for _ in range(N_TRAINS)]
+
+
+def test_engines_seeded():
+    """The same seed gives the same spikes, a different seed different ones"""
+
+    firing_rate = 40 * (1 + 0.5 * np.sin(2 * np.pi * 8 * np.arange(0, DURATION, DT)))
+    for regularity, bursting in SETTINGS:
+        trains = [generate_spike_train(firing_rate, DT, DURATION, regularity, bursting, rng=seed)
+                  for seed in (7, 7, 8)]
+        assert np.array_equal(trains[0], trains[1])
+        assert not np.array_equal(trains[0], trains[2])
+        assert np.all(np.diff(trains[0]) >= 0.002 - 1e-12)
+
+        rates = np.tile(firing_rate, (20, 1))
+        layouts = [generate_population_spikes(rates, DT, DURATION, regularity=regularity,
+                                              bursting=bursting, rng=seed) for seed in (7, 7, 8)]
+        assert all(np.array_equal(a, b) for a, b in zip(layouts[0], layouts[1]))
+        assert not np.array_equal(layouts[0][0], layouts[2][0])
+
+
+def test_engines_match_loop():
+    """Vectorized and batched engines match the reference loop's rate and ISI CV at constant rate"""
+
+    for base_rate in (20.0, 80.0):
+        firing_rate = np.full(int(DURATION / DT), base_rate)
+        for regularity, bursting in SETTINGS:
+            loop_rate, loop_cv = _rate_and_cv(_loop_trains(firing_rate, regularity, bursting))
+
+            rng = np.random.default_rng(2)
+            vectorized = [generate_spike_train(firing_rate, DT, DURATION, regularity, bursting, rng=rng)
+                          for _ in range(N_TRAINS)]
+            spike_times, offsets = generate_population_spikes(
+                firing_rate[None, :], DT, DURATION, rows=np.zeros(N_TRAINS, dtype=int),
+                regularity=regularity, bursting=bursting, rng=3
+            )
+            batched = np.split(spike_times, offsets[1:-1])
+
+            for spike_trains in (vectorized, batched):
+                rate, cv = _rate_and_cv(spike_trains)
+                assert abs(rate / loop_rate - 1) < 0.06, (base_rate, regularity, bursting, rate, loop_rate)
+                assert abs(cv / loop_cv - 1) < 0.06, (base_rate, regularity, bursting, cv, loop_cv)
+
+
+if __name__ == "__main__":
+    test_engines_seeded()
+    test_engines_match_loop()
+    print("All spike engine tests passed")
@@ -0,0 +1,72 @@
+import numpy as np
+
+from spike_statistics import cv2, fano_factor, isi_cv, isi_entropy, local_variation, window_counts
+
+DURATION = 2.0
+
+
+def _spike_trains(rng, n_trials=4, n_neurons=6):
+    """Poisson and bursty trains plus empty, single-spike and repeated-time trains"""
+    spike_trains = []
+    for _ in range(n_trials):
+        trial = [np.sort(rng.uniform(0, DURATION, rng.poisson(rate * DURATION)))
+                 for rate in rng.uniform(1, 40, n_neurons)]
+        trial[0] = np.sort(np.concatenate([trial[0], trial[0][:3] + 0.002]))
+        trial += [np.empty(0), np.array([0.7]), np.array([0.3, 0.3, 0.3, 0.9])]
+        spike_trains.append(trial)
+    return spike_trains
+
+
+def _loop_statistics(spike_trains):
+    """CV, LV, CV2, Fano factor and ISI entropy with list comprehensions over each train"""
+    cv, lv, cv_2, fano, entropy = [], [], [], [], []
+    for trial_spikes in spike_trains:
+        for spikes in trial_spikes:
+            isis = np.diff(spikes)
+            cv.append(np.std(isis) / np.mean(isis) if len(isis) > 1 and np.mean(isis) > 0 else np.nan)
+            pairs = [(isi1, isi2) for isi1, isi2 in zip(isis[:-1], isis[1:]) if isi1 + isi2 > 0]
+            lv.append(np.mean([3 * (isi1 - isi2)**2 / (isi1 + isi2)**2 for isi1, isi2 in pairs])
+                      if pairs else np.nan)
+            cv_2.append(np.mean([2 * abs(isi2 - isi1) / (isi1 + isi2) for isi1, isi2 in pairs])
+                        if pairs else np.nan)
+            counts = [np.sum((spikes >= w * 0.1) & (spikes < (w + 1) * 0.1))
+                      for w in range(int(DURATION / 0.1))]
+            fano.append(np.var(counts) / np.mean(counts) if np.mean(counts) > 0 else np.nan)
+            if len(isis):
+                hist, _ = np.histogram(isis, bins=10)
+                prob = hist / np.sum(hist) + 1e-10
+                prob /= prob.sum()
+                entropy.append(-np.sum(prob * np.log(prob)))
+            else:
+                entropy.append(np.nan)
+    return [np.array(values) for values in (cv, lv, cv_2, fano, entropy)]
+
+
+def test_train_statistics_match_loops():
+    """Segment-reduction kernels match the per-train formulas, NaN where undefined"""
+
+    spike_trains = _spike_trains(np.random.default_rng(0))
+    expected = _loop_statistics(spike_trains)
+    kernels = [isi_cv(spike_trains), local_variation(spike_trains), cv2(spike_trains),
+               fano_factor(window_counts(spike_trains, 0.1, DURATION)), isi_entropy(spike_trains)]
+    for name, reference, values in zip(['cv', 'lv', 'cv2', 'fano', 'entropy'], expected, kernels):
+        assert values.shape == (4, 9), name
+        assert np.allclose(values.ravel(), reference, equal_nan=True), name
+        assert np.array_equal(np.isnan(values.ravel()), np.isnan(reference)), name
+
+
+def test_train_statistics_empty():
+    """No trials or no spikes give empty or all-NaN tables"""
+
+    assert isi_cv([]).shape == (0, 0)
+    silent = [[np.empty(0)] * 3] * 2
+    for values in (isi_cv(silent), local_variation(silent), cv2(silent), isi_entropy(silent),
+                   fano_factor(window_counts(silent, 0.1, DURATION))):
+        assert values.shape == (2, 3) and np.isnan(values).all()
+    assert np.isnan(fano_factor(np.ones((2, 1)))).all()
+
+
+if __name__ == "__main__":
+    test_train_statistics_match_loops()
+    test_train_statistics_empty()
+    print("All spike statistics tests passed")
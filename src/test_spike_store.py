@@ -0,0 +1,196 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from spike_store import (ColumnWriter, RecordingWriter, csv_to_recording, is_columnar_recording,
+                         load_recording, open_recording, read_spike_csv, write_recording)
+
+
+def _recording(rng, n_spikes=1000):
+    """Time-sorted recording with an extra per-spike column and int-keyed metadata"""
+    return {
+        'spike_times': np.sort(rng.uniform(0, 30.0, n_spikes)),
+        'unit_ids': rng.integers(0, 8, n_spikes),
+        'amplitudes': rng.normal(50, 5, n_spikes).astype(np.float32),
+        'event_times': np.arange(1.0, 29.0, 2.0),
+        'event_labels': np.array(['ON', 'OFF'] * 7),
+        'metadata': {'sampling_rate': 30000, 'unit_info': {3: {'depth': 120}, -1: {'depth': 0}},
+                     'tags': ['a', 'b']},
+    }
+
+
+def _assert_same_recording(actual, expected, columns):
+    for name in columns:
+        assert np.array_equal(actual[name], expected[name]), name
+        assert actual[name].dtype == expected[name].dtype, name
+
+
+def test_round_trip(tmp_path):
+    """Columns, extra columns and int-keyed metadata survive write_recording -> open_recording"""
+
+    data = _recording(np.random.default_rng(0))
+    path = write_recording(data, tmp_path / "rec")
+    assert is_columnar_recording(path)
+
+    recording = open_recording(path)
+    assert isinstance(recording['spike_times'], np.memmap)
+    _assert_same_recording(recording, data, ['spike_times', 'unit_ids', 'amplitudes', 'event_times',
+                                              'event_labels'])
+    assert recording['metadata'] == data['metadata']
+
+    # Column headers are valid npy files of the final length
+    for name in ('spike_times', 'amplitudes'):
+        with open(path / f"{name}.npy", 'rb') as f:
+            assert np.lib.format.read_magic(f) == (1, 0)
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            assert f.tell() == ColumnWriter.HEADER_BYTES
+        assert shape == (len(data[name]),) and not fortran_order and dtype == data[name].dtype
+
+    subset = open_recording(path, mmap_mode=None, columns=['unit_ids'])
+    assert set(subset) == {'unit_ids', 'metadata'} and not isinstance(subset['unit_ids'], np.memmap)
+
+
+def test_chunked_writer_and_empty(tmp_path):
+    """Chunks append to one column; a recording without spikes opens as empty columns"""
+
+    data = _recording(np.random.default_rng(1))
+    with RecordingWriter(tmp_path / "chunked") as writer:
+        for start in range(0, 1000, 300):
+            writer.append(spike_times=data['spike_times'][start:start + 300],
+                          unit_ids=data['unit_ids'][start:start + 300])
+        writer.append(event_times=data['event_times'], event_labels=data['event_labels'].astype(object))
+        path = writer.close({'sampling_rate': 30000})
+    _assert_same_recording(open_recording(path), data, ['spike_times', 'unit_ids', 'event_times'])
+    assert open_recording(path)['event_labels'].tolist() == data['event_labels'].tolist()
+
+    empty = {'spike_times': np.empty(0), 'unit_ids': np.empty(0, dtype=np.int64),
+             'event_times': np.empty(0), 'event_labels': np.empty(0, dtype='<U1')}
+    recording = open_recording(write_recording(empty, tmp_path / "empty"))
+    _assert_same_recording(recording, empty, list(empty))
+    assert recording['metadata'] == {}
+
+
+def test_writer_abort(tmp_path):
+    """A failed or incomplete write leaves no temporary directory and the old recording intact"""
+
+    old = _recording(np.random.default_rng(2))
+    path = write_recording(old, tmp_path / "rec")
+    new = _recording(np.random.default_rng(3))
+
+    try:
+        with RecordingWriter(path) as writer:
+            writer.append(spike_times=new['spike_times'], unit_ids=new['unit_ids'])
+            raise RuntimeError("interrupted")
+    except RuntimeError:
+        pass
+    assert [entry.name for entry in tmp_path.iterdir()] == ["rec"]
+    _assert_same_recording(open_recording(path), old, ['spike_times', 'unit_ids', 'amplitudes'])
+
+    # Missing event columns
+    try:
+        write_recording({'spike_times': new['spike_times'], 'unit_ids': new['unit_ids']}, path)
+    except ValueError as error:
+        assert 'event_times' in str(error) and 'event_labels' in str(error)
+    else:
+        raise AssertionError("recording without event columns was written")
+    assert [entry.name for entry in tmp_path.iterdir()] == ["rec"]
+    _assert_same_recording(open_recording(path), old, ['spike_times', 'unit_ids', 'amplitudes'])
+
+    # A completed write replaces the old recording
+    write_recording(new, path)
+    _assert_same_recording(open_recording(path), new, ['spike_times', 'unit_ids', 'amplitudes'])
+
+
+def test_load_recording_formats(tmp_path):
+    """npz, pkl, csv and columnar copies (as written by save_data) load to the same columns"""
+
+    data = _recording(np.random.default_rng(4))
+    np.savez(tmp_path / "rec.npz", **data)
+    with open(tmp_path / "rec.pkl", 'wb') as f:
+        pickle.dump(data, f)
+    pd.DataFrame({name: data[name] for name in ('spike_times', 'unit_ids')}).to_csv(tmp_path / "rec.csv",
+                                                                                   index=False)
+    pd.DataFrame({name: data[name] for name in ('event_times', 'event_labels')}).to_csv(
+        tmp_path / "rec_events.csv", index=False)
+    write_recording(data, tmp_path / "rec")
+
+    columns = ['spike_times', 'unit_ids', 'event_times', 'event_labels']
+    for name in ("rec.npz", "rec.pkl", "rec.csv", "rec"):
+        recording = load_recording(tmp_path / name)
+        for column in columns:
+            assert np.array_equal(recording[column], data[column]), (name, column)
+        if name != "rec.csv":
+            assert recording['metadata'] == data['metadata'], name
+            assert np.array_equal(recording['amplitudes'], data['amplitudes'])
+    try:
+        load_recording(tmp_path / "rec.txt")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown format accepted")
+
+
+def _write_csv(path, spike_times, unit_ids, event_times, event_labels):
+    """Spike CSV and its _events.csv, as save_data writes them"""
+    pd.DataFrame({'spike_times': spike_times, 'unit_ids': unit_ids}).to_csv(path, index=False)
+    pd.DataFrame({'event_times': event_times, 'event_labels': event_labels}).to_csv(
+        path.with_name(f"{path.stem}_events.csv"), index=False)
+
+
+def test_csv_ingest_unsorted(tmp_path):
+    """Unsorted CSVs are ingested in small blocks into time-sorted columns, units kept in step"""
+
+    rng = np.random.default_rng(5)
+    n_spikes = 1037
+    spike_times = rng.uniform(0, 30.0, n_spikes)
+    spike_times[10:20] = spike_times[9]  # ties keep their file order
+    unit_ids = rng.integers(0, 8, n_spikes)
+    # As many events as spikes: event columns must not be reordered with the spikes
+    event_times = np.linspace(0, 30.0, n_spikes)[::-1].copy()
+    event_labels = np.where(np.arange(n_spikes) % 3, 'ON', 'OFF')
+    csv_path = tmp_path / "spikes.csv"
+    _write_csv(csv_path, spike_times, unit_ids, event_times, event_labels)
+
+    order = np.argsort(spike_times, kind='stable')
+    path = csv_to_recording(csv_path, chunk_rows=100, metadata={'sampling_rate': 30000}, verbose=False)
+    assert path == tmp_path / "spikes"
+    loaded = read_spike_csv(csv_path, chunk_rows=100)
+    for recording in (open_recording(path), loaded):
+        assert np.array_equal(recording['spike_times'], spike_times[order])
+        assert np.array_equal(recording['unit_ids'], unit_ids[order])
+        assert np.array_equal(recording['event_times'], event_times)
+        assert recording['event_labels'].tolist() == event_labels.tolist()
+        ingest = recording['metadata']['ingest']
+        assert ingest['rows'] == n_spikes and not ingest['sorted_input']
+    assert open_recording(path)['metadata']['sampling_rate'] == 30000
+    assert [entry.name for entry in tmp_path.iterdir() if entry.name.startswith('.')] == []
+
+
+def test_csv_ingest_sorted(tmp_path):
+    """Sorted CSVs are stored as they are; a CSV without events gets empty event columns"""
+
+    rng = np.random.default_rng(6)
+    spike_times = np.sort(rng.uniform(0, 5.0, 250))
+    unit_ids = rng.integers(0, 4, 250)
+    csv_path = tmp_path / "sorted.csv"
+    pd.DataFrame({'spike_times': spike_times, 'unit_ids': unit_ids}).to_csv(csv_path, index=False)
+
+    recording = open_recording(csv_to_recording(csv_path, tmp_path / "out", chunk_rows=64, verbose=False))
+    assert np.array_equal(recording['spike_times'], spike_times)
+    assert np.array_equal(recording['unit_ids'], unit_ids)
+    assert len(recording['event_times']) == 0 and len(recording['event_labels']) == 0
+    assert recording['metadata']['ingest']['rows'] == 250
+    assert recording['metadata']['ingest']['sorted_input']
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    tests = (test_round_trip, test_chunked_writer_and_empty, test_writer_abort, test_load_recording_formats,
+             test_csv_ingest_unsorted, test_csv_ingest_sorted)
+    for test in tests:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            test(Path(tmp_dir))
+    print("All spike store tests passed")
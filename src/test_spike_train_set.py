@@ -0,0 +1,119 @@
+import numpy as np
+
+from spike_train_set import SpikeTrainSet, as_trial_data
+
+
+def _trials():
+    return [
+        {'event_label': 'a', 'units': [{'unit_id': 3, 'spike_times': [0.3, 0.1]},
+                                       {'unit_id': 7, 'spike_times': [0.2]}]},
+        {'event_label': 'b', 'units': [{'unit_id': 7, 'spike_times': [0.5, 0.4]}]},
+        {'event_label': 'a', 'units': [{'unit_id': 3, 'spike_times': [0.05]}]},
+    ]
+
+
+def _nested(rng, n_trials=5, n_neurons=4):
+    """Sorted random trains, with some empty ones"""
+    return [[np.sort(rng.uniform(0, 1.0, rng.integers(0, 6))) for _ in range(n_neurons)]
+            for _ in range(n_trials)]
+
+
+def _assert_same_nested(actual, expected):
+    assert len(actual) == len(expected)
+    for actual_trial, expected_trial in zip(actual, expected):
+        assert len(actual_trial) == len(expected_trial)
+        for actual_train, expected_train in zip(actual_trial, expected_trial):
+            assert np.array_equal(actual_train, expected_train)
+
+
+def test_nested_round_trip():
+    """from_nested / to_nested keep every train, including empty trains and sets"""
+
+    nested = _nested(np.random.default_rng(0))
+    spikes = SpikeTrainSet.from_nested(nested)
+    assert spikes.shape == (5, 4)
+    assert spikes.is_compact
+    _assert_same_nested(spikes.to_nested(), nested)
+    assert spikes.counts.tolist() == [[len(train) for train in trial] for trial in nested]
+    assert SpikeTrainSet.from_nested(spikes) is spikes
+
+    empty = SpikeTrainSet.from_nested([])
+    assert empty.shape == (0, 0) and empty.to_nested() == []
+    silent = SpikeTrainSet.from_nested([[np.empty(0)] * 3] * 2)
+    assert silent.shape == (2, 3) and silent.counts.sum() == 0
+
+
+def test_slicing_and_compact():
+    """Slices are views until compacted, and compact keeps the same trains"""
+
+    nested = _nested(np.random.default_rng(1), n_trials=6)
+    spikes = SpikeTrainSet.from_nested(nested)
+    for idx in (slice(1, 4), slice(None, None, 2), slice(None, None, -1), slice(3, 3)):
+        view = spikes[idx]
+        assert view.spike_times is spikes.spike_times
+        compact = view.compact()
+        assert compact.is_compact
+        assert len(compact.spike_times) == view.counts.sum()
+        _assert_same_nested(view.to_nested(), nested[idx])
+        _assert_same_nested(compact.to_nested(), nested[idx])
+    assert spikes.compact() is spikes
+
+    # Trial and neuron access, negative indices included
+    assert np.array_equal(spikes[-1][2], nested[-1][2])
+    assert np.array_equal(spikes.neuron(2, 1), nested[2][1])
+    try:
+        spikes[6]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("out-of-range trial index")
+
+
+def test_flat_layout_queries():
+    """Owners, ISIs, bin counts and neuron selection match per-train loops"""
+
+    nested = _nested(np.random.default_rng(2))
+    spikes = SpikeTrainSet.from_nested(nested)[1:]
+    nested = nested[1:]
+
+    trial_idx, neuron_idx = spikes.compact().owners()
+    assert trial_idx.tolist() == [t for t, trial in enumerate(nested) for n, train in enumerate(trial)
+                                  for _ in train]
+    assert neuron_idx.tolist() == [n for trial in nested for n, train in enumerate(trial) for _ in train]
+
+    isis, train_ids = spikes.isis()
+    expected = [(t * 4 + n, isi) for t, trial in enumerate(nested) for n, train in enumerate(trial)
+                for isi in np.diff(train)]
+    assert train_ids.tolist() == [train for train, _ in expected]
+    assert np.allclose(isis, [isi for _, isi in expected])
+
+    edges = np.linspace(0, 1.0, 11)
+    expected = [[np.histogram(train, edges)[0] for train in trial] for trial in nested]
+    assert np.array_equal(spikes.bin_counts(edges), expected)
+
+    selected = spikes.select_neurons([3, 0])
+    _assert_same_nested(selected.to_nested(), [[trial[3], trial[0]] for trial in nested])
+
+
+def test_unit_spikes():
+    """Per-unit spikes match a scan through the trial dicts"""
+
+    trials = as_trial_data(_trials())
+    for unit_id in (3, 7):
+        spike_times, trial_idx = trials.unit_spikes(unit_id)
+        expected = [(trial, time) for trial, trial_dict in enumerate(trials)
+                    for unit in trial_dict['units'] if unit['unit_id'] == unit_id
+                    for time in sorted(unit['spike_times'])]
+        assert trial_idx.tolist() == [trial for trial, _ in expected]
+        assert spike_times.tolist() == [time for _, time in expected]
+
+    spike_times, trial_idx = trials.unit_spikes(99)
+    assert len(spike_times) == 0 and trial_idx.dtype == np.int64
+
+
+if __name__ == "__main__":
+    test_nested_round_trip()
+    test_slicing_and_compact()
+    test_flat_layout_queries()
+    test_unit_spikes()
+    print("All spike train set tests passed")
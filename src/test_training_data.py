@@ -0,0 +1,54 @@
+import numpy as np
+
+from decoding_analysis import OptimizedMultiClassDecoder
+from spike_data_loader import NeuralPatternGenerator
+
+
+def _decoder(bit_generator='pcg64', random_state=0):
+    decoder = OptimizedMultiClassDecoder(random_state=random_state)
+    decoder.data_generator = NeuralPatternGenerator(n_neurons=20, bit_generator=bit_generator)
+    return decoder
+
+
+def test_training_data_bit_generator():
+    """Training samples are drawn from the data generator's bit generator"""
+
+    X_pcg, y_pcg = _decoder('pcg64').generate_training_data(2, verbose=False, seed=5)
+    X_again, _ = _decoder('pcg64').generate_training_data(2, verbose=False, seed=5)
+    X_philox, y_philox = _decoder('philox').generate_training_data(2, verbose=False, seed=5)
+
+    assert np.array_equal(X_pcg, X_again)
+    assert np.array_equal(y_pcg, y_philox)
+    assert not np.array_equal(X_pcg, X_philox)
+
+
+def test_training_data_cache(tmp_path):
+    """Cached and uncached calls return the same data, also without an explicit seed"""
+
+    X, y = _decoder().generate_training_data(2, verbose=False)
+    X_cached, y_cached = _decoder().generate_training_data(2, verbose=False, cache=tmp_path)
+    X_warm, _ = _decoder().generate_training_data(2, verbose=False, cache=tmp_path)
+    assert np.array_equal(X, X_cached) and np.array_equal(y, y_cached)
+    assert np.array_equal(X, X_warm)
+
+    # Repeated calls on the same decoder reuse the entry instead of generating again
+    decoder = _decoder()
+    decoder.generate_training_data(2, verbose=False, cache=tmp_path / "same")
+    n_entries = len(list((tmp_path / "same").iterdir()))
+    X_again, _ = decoder.generate_training_data(2, verbose=False, cache=tmp_path / "same")
+    assert np.array_equal(X, X_again)
+    assert isinstance(X_again, np.memmap)
+    assert len(list((tmp_path / "same").iterdir())) == n_entries
+
+    # No deterministic seed: the cache is skipped instead of raising
+    X_random, _ = _decoder(random_state=None).generate_training_data(2, verbose=False, cache=tmp_path)
+    assert X_random.shape == X.shape
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_training_data_bit_generator()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_training_data_cache(Path(tmp_dir))
+    print("All training data tests passed")